@@ -3,6 +3,10 @@ ASGI config for controle project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+O stream dos dashboards (/eventos/) é uma view assíncrona: rode com um servidor
+ASGI (ex.: uvicorn controle.asgi:application) para que um worker segure milhares
+de conexões abertas.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -52,6 +52,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # /static/ servido do STATIC_ROOT com hash no nome e variantes .br/.gz (core/estaticos.py)
+    'core.estaticos.EstaticosMiddleware',
+    # Latência, status e queries por view para o /metrics (core/metricas.py)
+    'core.middleware.MetricasMiddleware',
+    # brotli/gzip nas respostas HTML, JSON e CSV, inclusive em streaming (core/compressao.py)
+    'core.compressao.CompressaoMiddleware',
+    # Conta queries/tempo de SQL, detecta N+1 e gera o header Server-Timing (core/middleware.py)
+    'core.middleware.InstrumentacaoSQLMiddleware',
+    # Prende ao primário, por alguns segundos, quem acabou de gravar (core/replica.py)
+    'core.replica.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,16 +95,109 @@ WSGI_APPLICATION = 'controle.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # django.db.backends.mysql + pool de conexões por processo (core/db/pool.py)
+        'ENGINE': 'core.db.mysql',
         'NAME': 'bd_operah',        
         'USER': os.getenv('DB_USER'),   
         'PASSWORD': os.getenv('DB_PASSWORD'),  
         'HOST': os.getenv('DB_HOST'),        
         'PORT': os.getenv('DB_PORT'),
+        'POOL': {
+            'MAX': int(os.getenv('DB_POOL_MAX', 10)),  # conexões por processo; 0 desliga o pool
+            'ESPERA': float(os.getenv('DB_POOL_ESPERA', 5)),  # segundos esperando uma livre antes do erro
+            'OCIOSO': float(os.getenv('DB_POOL_OCIOSO', 300)),  # ociosa há mais que isso é fechada
+            'VIDA': float(os.getenv('DB_POOL_VIDA', 3600)),  # idade máxima de uma conexão
+            'PING_APOS': float(os.getenv('DB_POOL_PING_APOS', 10)),  # ociosa há mais que isso leva ping antes do uso
+        },
     }
 }
 
 
+# Réplica de leitura (core/replica.py): com DB_REPLICA_HOST definido, as views
+# @somente_leitura (dashboards, listagens, exportação) leem dela. Usuário,
+# senha e porta são os do primário se não forem informados.
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT') or DATABASES['default']['PORT'],
+        'USER': os.getenv('DB_REPLICA_USER') or DATABASES['default']['USER'],
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD') or DATABASES['default']['PASSWORD'],
+        # Nos testes a réplica é o próprio banco de teste do primário
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.replica.RoteadorReplica']
+
+# Segundos que um navegador lê do primário depois de gravar (atraso máximo esperado da réplica)
+REPLICA_JANELA = float(os.getenv('DB_REPLICA_JANELA', 10))
+
+
+# Cache
+# Precisa ser compartilhado entre os processos (WSGI e ASGI): guarda as versões
+# dos models que alimentam o stream dos dashboards (core/versoes.py).
+
+CACHES = {
+    'default': {
+        # FileBasedCache do Django, contando hits/misses para o /metrics (core/cache.py)
+        'BACKEND': 'core.cache.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', os.path.join(BASE_DIR, '.cache')),
+        'NOME': 'default',
+    },
+    # Dados das telas e APIs, chaveados pela versão dos models (core/respostas.py).
+    # Local a cada processo; a invalidação vale para todos porque as versões
+    # ficam no 'default'. Dá para trocar por core.cache.FileBasedCache.
+    'respostas': {
+        'BACKEND': 'core.cache.LocMemCache',
+        'LOCATION': 'respostas',
+        'NOME': 'respostas',
+        'TIMEOUT': int(os.getenv('RESPOSTAS_TIMEOUT', 600)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('RESPOSTAS_MAX_ENTRADAS', 2000)),
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+# Stream dos dashboards (core/eventos.py)
+EVENTOS_INTERVALO = float(os.getenv('EVENTOS_INTERVALO', '1.0'))  # segundos entre checagens de versão
+EVENTOS_KEEPALIVE = 20  # segundos sem eventos até enviar um keepalive
+
+# Compressão das respostas (core/compressao.py)
+COMPRESSAO_MINIMA = int(os.getenv('COMPRESSAO_MINIMA', 1024))  # bytes; corpos menores saem como estão
+COMPRESSAO_NIVEL_GZIP = int(os.getenv('COMPRESSAO_NIVEL_GZIP', 6))  # 1 (rápido) a 9 (menor)
+COMPRESSAO_QUALIDADE_BROTLI = int(os.getenv('COMPRESSAO_QUALIDADE_BROTLI', 4))  # 0 a 11; acima de 5 pesa na CPU
+
+# Instrumentação de SQL por requisição (core/middleware.py)
+INSTRUMENTACAO_SQL = os.getenv('INSTRUMENTACAO_SQL', '1') == '1'
+SQL_REPETICOES_N1 = 5  # mesma forma de SQL repetida essa quantidade de vezes = N+1
+SQL_RESUMO_STAFF = True  # resumo das queries no canto da página para usuários staff
+
+# Métricas do /metrics (core/metricas.py): cada processo grava as suas neste diretório
+METRICAS_DIR = os.getenv('METRICAS_DIR', os.path.join(BASE_DIR, '.metricas'))
+METRICAS_INTERVALO = 5  # segundos entre gravações do arquivo de cada processo
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')  # se definido, o /metrics exige "Authorization: Bearer <token>"
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simples': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simples'},
+    },
+    'loggers': {
+        # Uma linha JSON por requisição; WARNING quando há N+1
+        'controle.sql': {
+            'handlers': ['console'],
+            'level': os.getenv('SQL_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -135,6 +238,18 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'assets'),
 ]
 
+# Destino do collectstatic; a própria aplicação serve daqui (core/estaticos.py)
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Nome com hash do conteúdo + variantes .gz/.br geradas no collectstatic
+    'staticfiles': {'BACKEND': 'core.estaticos.ArmazenamentoEstaticos'},
+}
+
+ESTATICOS_COMPRESSAO_MINIMA = 512  # bytes; arquivos menores não ganham variante comprimida
+ESTATICOS_MAX_AGE = 60  # segundos de cache dos arquivos sem hash no nome (os com hash: 1 ano, immutable)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 
 # Importamos a função home que definimos no arquivo acima
-from core.views import home 
+from core.views import home, eventos_dashboard, busca_global, historico_inventario, importar_dados, metricas_prometheus
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,6 +11,21 @@ urlpatterns = [
     # O name='home' é importante para o LOGIN_REDIRECT_URL funcionar
     path('', home, name='home'), 
 
+    # Stream (SSE) dos dashboards — servido pelo controle/asgi.py
+    path('eventos/', eventos_dashboard, name='eventos_dashboard'),
+
+    # Busca ranqueada (índice de trigramas) em dispositivos, funcionários e equipamentos
+    path('api/busca/', busca_global, name='busca_global'),
+
+    # Séries diárias do inventário por unidade/tipo/status (lidas dos snapshots)
+    path('api/inventario/historico/', historico_inventario, name='historico_inventario'),
+
+    # Importação em massa (CSV/XLSX) de funcionários, dispositivos e equipamentos
+    path('importar/', importar_dados, name='importar_dados'),
+
+    # Métricas para o Prometheus (sem login: protegido por METRICAS_TOKEN, se definido)
+    path('metrics', metricas_prometheus, name='metricas'),
+
     # Seus outros aplicativos
     path('contas/', include('contas.urls')), 
     path('dispositivos/', include('dispositivos.urls')), 
@@ -0,0 +1,414 @@
+"""
+Benchmark de ponta a ponta: todas as rotas do projeto, pelo test client, logado.
+
+Usado pelo comando `python manage.py benchmark` (que cria um banco de teste,
+popula com `popular()` e roda os `CENARIOS`). Cada cenário sabe montar a
+requisição da sua rota; rotas que apagam ou alteram dados recebem objetos
+novos a cada repetição, criados fora da medição.
+
+Ao criar uma rota nova, acrescente um cenário aqui (e um orçamento de queries):
+o benchmark falha se alguma rota do urls.py ficar sem cenário.
+"""
+import io
+import itertools
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from . import compressao
+
+ESCALAS = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+LOTE = 5000
+
+# Rotas que não dá para medir como requisição comum
+IGNORADAS = {
+    'eventos_dashboard': "stream SSE infinito (medir com carga de conexões, não latência)",
+    'equipamentos:equipamentos_funcionario': "template equipamentos/listar.html não existe (a rota responde 500)",
+}
+
+# Máximo de queries por requisição. Não depende da escala: se crescer com os dados, é N+1.
+ORCAMENTOS = {
+    'home': 3,
+    'busca_global': 12,
+    'historico_inventario': 3,
+    'importar_dados': 3,
+    'metricas': 0,
+    'importar_dados (POST 50 linhas)': 25,
+    'contas:login': 3,
+    'contas:logout': 4,
+    'dispositivos:listar_dispositivos': 8,
+    'dispositivos:listar_dispositivos (busca)': 8,
+    'dispositivos:listar_dispositivos (status)': 8,
+    'dispositivos:criar_dispositivo': 12,
+    'dispositivos:editar_dispositivo': 4,
+    'dispositivos:editar_dispositivo (POST)': 18,
+    'dispositivos:deletar_dispositivo': 16,
+    'dispositivos:desvincular_dispositivo': 14,
+    'dispositivos:exportar_csv': 60,
+    'dispositivos:dashboard_dispositivos': 6,
+    'dispositivos:api_dados_dashboard': 4,
+    'equipamentos:dashboard_estoque': 4,
+    'equipamentos:entrada_estoque': 5,
+    'equipamentos:listar_por_tipo': 5,
+    # sessão + usuário + item, e num atomic: upsert do lote, DELETE do item e, pelos
+    # receivers do post_delete, índice de busca e fim da atribuição no livro (9 no total)
+    'equipamentos:acao_manutencao': 10,
+    'equipamentos:acao_manutencao_lote': 6,
+    'equipamentos:acao_manutencao_lote (retornar)': 6,
+    'equipamentos:deletar_lote': 6,
+    'equipamentos:equipamentos_dispositivo': 6,
+    'equipamentos:equipamentos_dispositivo (POST)': 14,
+    'equipamentos:itens_por_dispositivo': 4,
+    'equipamentos:alocar_equipamento': 13,
+    'equipamentos:editar_equipamento': 10,
+    'equipamentos:deletar_equipamento': 10,
+    'equipamentos:desvincular_equipamento': 10,
+    'funcionarios:listar_funcionarios': 6,
+    'funcionarios:listar_demitidos': 4,
+    'funcionarios:criar_funcionario': 12,
+    'funcionarios:editar_funcionario': 10,
+    'funcionarios:demitir_funcionario': 20,
+    'funcionarios:demitir_em_lote': 20,
+    'funcionarios:reativar_funcionario': 12,
+    'funcionarios:get_funcionario_json': 4,
+    'funcionarios:autocompletar_funcionarios': 5,
+    'funcionarios:historico_funcionario': 8,
+    'funcionarios:historico_funcionario (304)': 5,
+}
+
+
+# ---------------------
+# DADOS
+# ---------------------
+
+def _em_lotes(iteravel, tamanho=LOTE):
+    iteravel = iter(iteravel)
+    while lote := list(itertools.islice(iteravel, tamanho)):
+        yield lote
+
+
+def popular(dispositivos, saida=None):
+    """
+    Gera a base do benchmark: `dispositivos` dispositivos, metade disso em
+    funcionários (10% demitidos) e o mesmo número de equipamentos auxiliares.
+    """
+    from dispositivos.models import Dispositivo, TIPO_DISPOSITIVO_CHOICES
+    from equipamentos.models import EquipamentoAuxiliar, LoteEstoque, TIPO_EQUIPAMENTO_AUX_CHOICES
+    from funcionarios.models import Funcionario, HistoricoFuncionario
+
+    def log(msg):
+        if saida:
+            saida.write(msg)
+
+    tipos = [codigo for codigo, _ in TIPO_DISPOSITIVO_CHOICES]
+    tipos_aux = [codigo for codigo, _ in TIPO_EQUIPAMENTO_AUX_CHOICES]
+    unidades = [codigo for codigo, _ in Funcionario.UNIDADE_CHOICES]
+    qtd_funcionarios = max(dispositivos // 2, 1)
+    hoje = timezone.now()
+
+    log(f"Criando {qtd_funcionarios} funcionários...")
+    for lote in _em_lotes(
+        Funcionario(
+            nome=f"Funcionario {i:07d}",
+            email=f"func{i}@benchmark.local",
+            unidade_trabalho=unidades[i % len(unidades)],
+            status='DEMITIDO' if i % 10 == 0 else 'ATIVO',
+            data_demissao=hoje.date() if i % 10 == 0 else None,
+        )
+        for i in range(qtd_funcionarios)
+    ):
+        Funcionario.objects.bulk_create(lote)
+
+    ativos = list(Funcionario.objects.filter(status='ATIVO').order_by('id').values_list('id', flat=True))
+    for lote in _em_lotes(Funcionario.objects.order_by('id').values_list('id', flat=True).iterator()):
+        HistoricoFuncionario.objects.bulk_create(
+            [HistoricoFuncionario(funcionario_id=pk, acao='CONTRATADO', data=hoje, descricao="Admitido.") for pk in lote]
+        )
+
+    log(f"Criando {dispositivos} dispositivos...")
+
+    def dispositivo(j):
+        # 60% com dono, 10% em manutenção, o resto disponível
+        resto = j % 10
+        if resto < 6 and ativos:
+            return Dispositivo(codigo=f"BEN{j:07d}", tipo_dispositivo=tipos[j % len(tipos)],
+                               funcionario_id=ativos[j % len(ativos)], status='ATIVO')
+        status = 'MANUTENCAO' if resto == 6 else 'DISPONIVEL'
+        return Dispositivo(codigo=f"BEN{j:07d}", tipo_dispositivo=tipos[j % len(tipos)], status=status)
+
+    for lote in _em_lotes(dispositivo(j) for j in range(dispositivos)):
+        Dispositivo.objects.bulk_create(lote)
+
+    log(f"Criando {dispositivos} equipamentos auxiliares...")
+    com_dono = Dispositivo.objects.filter(status='ATIVO').order_by('id').values_list('id', 'funcionario_id')
+    for lote in _em_lotes(com_dono.iterator()):
+        EquipamentoAuxiliar.objects.bulk_create([
+            EquipamentoAuxiliar(nome=f"Periferico {pk}", tipo_equipamento_aux=tipos_aux[pk % len(tipos_aux)],
+                                dispositivo_id=pk, funcionario_id=funcionario_id, status='ATIVO')
+            for pk, funcionario_id in lote
+        ])
+    # O resto é estoque sem dono: um lote por tipo (5% em manutenção)
+    restantes = max(dispositivos - Dispositivo.objects.filter(status='ATIVO').count(), 0)
+    por_tipo = restantes // len(tipos_aux)
+    LoteEstoque.objects.bulk_create([
+        LoteEstoque(nome=f"Estoque {tipo}", tipo_equipamento_aux=tipo,
+                    quantidade_disponivel=por_tipo - por_tipo // 20, quantidade_manutencao=por_tipo // 20)
+        for tipo in tipos_aux
+    ])
+
+    # bulk_create não dispara signals: contadores e índice de busca são reconstruídos no fim
+    log("Recalculando contadores e índice de busca...")
+    call_command('reconciliar_contadores', stdout=io.StringIO())
+    call_command('reindexar_busca', lote=LOTE, stdout=io.StringIO())
+
+
+class Fabrica:
+    """Objetos novos para as rotas que apagam/alteram (cada repetição recebe o seu)."""
+
+    def __init__(self):
+        self.seq = itertools.count(1)
+
+    def funcionario(self, status='ATIVO', com_dispositivo=False):
+        from dispositivos.models import Dispositivo
+        from funcionarios.models import Funcionario
+
+        n = next(self.seq)
+        func = Funcionario.objects.create(
+            nome=f"Bench {n}", email=f"bench{n}.{time.time_ns()}@benchmark.local", status=status
+        )
+        if com_dispositivo:
+            Dispositivo.objects.create(codigo=f"BF{n}-{time.time_ns()}", tipo_dispositivo='NOTEBOOK',
+                                       funcionario=func, status='ATIVO')
+        return func
+
+    def dispositivo(self, com_funcionario=False):
+        from dispositivos.models import Dispositivo
+
+        n = next(self.seq)
+        func = self.funcionario() if com_funcionario else None
+        return Dispositivo.objects.create(codigo=f"BD{n}-{time.time_ns()}", tipo_dispositivo='NOTEBOOK',
+                                          funcionario=func, status='ATIVO' if func else 'DISPONIVEL')
+
+    def equipamento(self, com_funcionario=False):
+        from equipamentos.models import EquipamentoAuxiliar
+
+        func = self.funcionario() if com_funcionario else None
+        return EquipamentoAuxiliar.objects.create(nome="Bench Mouse", tipo_equipamento_aux='MOUSE', funcionario=func)
+
+    def lote(self):
+        from equipamentos.models import LoteEstoque
+
+        return LoteEstoque.objects.create(nome=f"Bench Lote {next(self.seq)}-{time.time_ns()}", tipo_equipamento_aux='MOUSE',
+                                          quantidade_disponivel=5, quantidade_manutencao=5)
+
+    def csv_funcionarios(self, linhas):
+        n = next(self.seq)
+        conteudo = "nome;email\n" + "".join(
+            f"Importado {n}-{i};imp{n}.{i}.{time.time_ns()}@benchmark.local\n" for i in range(linhas)
+        )
+        return SimpleUploadedFile("importacao.csv", conteudo.encode())
+
+
+# ---------------------
+# CENÁRIOS
+# ---------------------
+
+class Cenario:
+    """
+    Uma requisição medida. `montar(fabrica, base)` roda antes de cada repetição
+    (fora da medição) e devolve kwargs da URL, query string, cabeçalhos e corpo do POST.
+    """
+
+    def __init__(self, rota, nome=None, metodo='get', montar=None, depois=None):
+        self.rota = rota
+        self.nome = nome or rota
+        self.metodo = metodo
+        self.montar = montar or (lambda fabrica, base: {})
+        self.depois = depois
+
+
+def _base():
+    """Ids de objetos já existentes, usados pelas rotas de leitura."""
+    from dispositivos.models import Dispositivo
+    from funcionarios.models import Funcionario
+
+    dispositivo = Dispositivo.objects.filter(status='ATIVO').order_by('id').first()
+    funcionario = Funcionario.objects.filter(status='ATIVO', dispositivos__isnull=False).order_by('id').first()
+    return {'dispositivo': dispositivo.pk if dispositivo else 1, 'funcionario': funcionario.pk if funcionario else 1}
+
+
+def _revalidacao(obter_versao, *args):
+    """If-None-Match com a versão atual: mede o caminho do 304 (core.condicional)."""
+    from asgiref.sync import async_to_sync, iscoroutinefunction
+    from django.utils.http import quote_etag
+    from django.utils.module_loading import import_string
+
+    obter_versao = import_string(obter_versao)
+    if iscoroutinefunction(obter_versao):
+        obter_versao = async_to_sync(obter_versao)
+    return {'If-None-Match': quote_etag(obter_versao(None, *args)[0])}
+
+
+CENARIOS = [
+    Cenario('home'),
+    Cenario('busca_global', montar=lambda f, b: {'params': {'q': 'ben0001'}}),
+    Cenario('historico_inventario', montar=lambda f, b: {'params': {'unidade': 'ITAPEVI'}}),
+    Cenario('importar_dados'),
+    Cenario('importar_dados', 'importar_dados (POST 50 linhas)', 'post',
+            lambda f, b: {'dados': {'tipo': 'funcionarios', 'arquivo': f.csv_funcionarios(50)}}),
+    Cenario('metricas'),
+    Cenario('contas:login'),
+    Cenario('contas:logout', depois=lambda client, usuario: client.force_login(usuario)),
+
+    Cenario('dispositivos:listar_dispositivos'),
+    Cenario('dispositivos:listar_dispositivos', 'dispositivos:listar_dispositivos (busca)',
+            montar=lambda f, b: {'params': {'busca': '0001'}}),
+    Cenario('dispositivos:listar_dispositivos', 'dispositivos:listar_dispositivos (status)',
+            montar=lambda f, b: {'params': {'status': 'DISPONIVEL'}}),
+    Cenario('dispositivos:criar_dispositivo', metodo='post',
+            montar=lambda f, b: {'dados': {'codigo': f"NOVO{next(f.seq)}-{time.time_ns()}", 'tipo_dispositivo': 'COLETOR'}}),
+    Cenario('dispositivos:editar_dispositivo', montar=lambda f, b: {'kwargs': {'id': b['dispositivo']}}),
+    Cenario('dispositivos:editar_dispositivo', 'dispositivos:editar_dispositivo (POST)', 'post',
+            lambda f, b: (lambda d: {'kwargs': {'id': d.pk}, 'dados': {'codigo': d.codigo, 'status': 'MANUTENCAO'}})(f.dispositivo(True))),
+    Cenario('dispositivos:deletar_dispositivo', montar=lambda f, b: {'kwargs': {'id': f.dispositivo().pk}}),
+    Cenario('dispositivos:desvincular_dispositivo', montar=lambda f, b: {'kwargs': {'id': f.dispositivo(True).pk}}),
+    Cenario('dispositivos:exportar_csv'),
+    Cenario('dispositivos:dashboard_dispositivos'),
+    Cenario('dispositivos:api_dados_dashboard'),
+
+    Cenario('equipamentos:dashboard_estoque'),
+    Cenario('equipamentos:entrada_estoque', metodo='post',
+            montar=lambda f, b: {'dados': {'tipo_equipamento_aux': 'TECLADO', 'quantidade': 10, 'prefixo_nome': 'Teclado'}}),
+    Cenario('equipamentos:listar_por_tipo', montar=lambda f, b: {'kwargs': {'tipo_codigo': 'MOUSE'}}),
+    Cenario('equipamentos:acao_manutencao', montar=lambda f, b: {'kwargs': {'id': f.equipamento(True).pk}}),
+    Cenario('equipamentos:acao_manutencao_lote', metodo='post',
+            montar=lambda f, b: {'kwargs': {'id': f.lote().pk, 'acao': 'enviar'}}),
+    Cenario('equipamentos:acao_manutencao_lote', 'equipamentos:acao_manutencao_lote (retornar)', 'post',
+            montar=lambda f, b: {'kwargs': {'id': f.lote().pk, 'acao': 'retornar'}}),
+    Cenario('equipamentos:deletar_lote', metodo='post', montar=lambda f, b: {'kwargs': {'id': f.lote().pk}}),
+    Cenario('equipamentos:equipamentos_dispositivo', montar=lambda f, b: {'kwargs': {'dispositivo_id': b['dispositivo']}}),
+    Cenario('equipamentos:equipamentos_dispositivo', 'equipamentos:equipamentos_dispositivo (POST)', 'post',
+            lambda f, b: {'kwargs': {'dispositivo_id': b['dispositivo']}, 'dados': {'tipo_equipamento_aux': 'MOUSE'}}),
+    Cenario('equipamentos:alocar_equipamento', metodo='post',
+            montar=lambda f, b: {'dados': {'tipo_equipamento_aux': 'TECLADO', 'dispositivo_id': b['dispositivo']}}),
+    Cenario('equipamentos:itens_por_dispositivo',
+            montar=lambda f, b: {'params': {'ids': ','.join(str(b['dispositivo'] + i) for i in range(20))}}),
+    Cenario('equipamentos:editar_equipamento', metodo='post',
+            montar=lambda f, b: {'kwargs': {'id': f.equipamento(True).pk}, 'dados': {'nome': 'Mouse editado'}}),
+    Cenario('equipamentos:deletar_equipamento', montar=lambda f, b: {'kwargs': {'id': f.equipamento(True).pk}}),
+    Cenario('equipamentos:desvincular_equipamento', montar=lambda f, b: {'kwargs': {'id': f.equipamento(True).pk}}),
+
+    Cenario('funcionarios:listar_funcionarios'),
+    Cenario('funcionarios:listar_demitidos'),
+    Cenario('funcionarios:criar_funcionario', metodo='post',
+            montar=lambda f, b: {'dados': {'nome': 'Novo', 'email': f"novo{next(f.seq)}.{time.time_ns()}@benchmark.local",
+                                           'unidade_trabalho': 'ITAPEVI'}}),
+    Cenario('funcionarios:editar_funcionario', metodo='post',
+            montar=lambda f, b: {'kwargs': {'id': f.funcionario().pk}, 'dados': {'nome': 'Editado', 'unidade_trabalho': 'GARUVA'}}),
+    Cenario('funcionarios:demitir_funcionario',
+            montar=lambda f, b: {'kwargs': {'id': f.funcionario(com_dispositivo=True).pk}}),
+    Cenario('funcionarios:demitir_em_lote', metodo='post',
+            montar=lambda f, b: {'dados': {'ids': [f.funcionario(com_dispositivo=True).pk for _ in range(5)]}}),
+    Cenario('funcionarios:reativar_funcionario', montar=lambda f, b: {'kwargs': {'id': f.funcionario('DEMITIDO').pk}}),
+    Cenario('funcionarios:autocompletar_funcionarios', montar=lambda f, b: {'params': {'q': 'Funcionario 00001'}}),
+    Cenario('funcionarios:get_funcionario_json', montar=lambda f, b: {'kwargs': {'id': b['funcionario']}}),
+    Cenario('funcionarios:historico_funcionario', montar=lambda f, b: {'kwargs': {'id': b['funcionario']}}),
+    Cenario('funcionarios:historico_funcionario', 'funcionarios:historico_funcionario (304)',
+            montar=lambda f, b: {'kwargs': {'id': b['funcionario']}, 'cabecalhos': _revalidacao(
+                'funcionarios.views._versao_historico', b['funcionario'])}),
+]
+
+
+def rotas_do_projeto():
+    """Nomes ('app:nome') de todas as rotas do projeto, exceto o admin."""
+    nomes = set()
+
+    def percorrer(padroes, namespace):
+        for padrao in padroes:
+            if isinstance(padrao, URLResolver):
+                if padrao.app_name == 'admin':
+                    continue
+                percorrer(padrao.url_patterns, padrao.namespace or namespace)
+            elif isinstance(padrao, URLPattern) and padrao.name:
+                nomes.add(f"{namespace}:{padrao.name}" if namespace else padrao.name)
+
+    percorrer(get_resolver().url_patterns, None)
+    return nomes
+
+
+def rotas_sem_cenario():
+    cobertas = {c.rota for c in CENARIOS} | set(IGNORADAS)
+    return sorted(rotas_do_projeto() - cobertas)
+
+
+# ---------------------
+# MEDIÇÃO
+# ---------------------
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))]
+
+
+def medir(client, usuario, cenario, fabrica, base, repeticoes, aquecimento):
+    tempos, queries, tempos_sql, status, tamanhos = [], [], [], set(), []
+    for i in range(aquecimento + repeticoes):
+        req = cenario.montar(fabrica, base)
+        url = reverse(cenario.rota, kwargs=req.get('kwargs'))
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            if cenario.metodo == 'post':
+                response = client.post(url, req.get('dados', {}))
+            else:
+                response = client.get(url, req.get('params', {}), headers=req.get('cabecalhos'))
+            # Respostas em streaming (exportação CSV) só terminam quando o corpo é lido
+            pedacos = list(response.streaming_content) if response.streaming else [response.content]
+            decorrido = time.perf_counter() - inicio
+        corpo = b''.join(pedacos)
+        if cenario.depois:
+            cenario.depois(client, usuario)
+        if i < aquecimento:
+            continue
+        tempos.append(decorrido * 1000)
+        queries.append(len(capturadas))
+        tempos_sql.append(sum(float(q['time']) for q in capturadas.captured_queries) * 1000)
+        status.add(response.status_code)
+        tamanhos.append(len(corpo))
+
+    return {
+        'rota': cenario.rota,
+        'metodo': cenario.metodo.upper(),
+        'status': sorted(status),
+        'p50_ms': round(percentil(tempos, 50), 2),
+        'p95_ms': round(percentil(tempos, 95), 2),
+        'media_ms': round(sum(tempos) / len(tempos), 2),
+        'queries': percentil(queries, 50),
+        'queries_max': max(queries),
+        'sql_p50_ms': round(percentil(tempos_sql, 50), 2),
+        'sql_p95_ms': round(percentil(tempos_sql, 95), 2),
+        'bytes': percentil(tamanhos, 50),
+        'compressao': medir_compressao(response, pedacos),
+    }
+
+
+def medir_compressao(response, pedacos):
+    """
+    Bytes e CPU para comprimir o corpo da última repetição em cada codificação, com os
+    níveis do settings e pedaço a pedaço como o CompressaoMiddleware faz. O client do
+    benchmark não manda Accept-Encoding, então o corpo medido acima é o original.
+    None se o middleware não comprimiria essa resposta.
+    """
+    if not compressao.comprimivel(response):
+        return None
+    resultado = {}
+    for codificacao in compressao.codificacoes():
+        inicio = time.process_time()
+        tamanho = sum(len(p) for p in compressao.comprimir_pedacos(pedacos, codificacao))
+        resultado[codificacao] = {'bytes': tamanho, 'cpu_ms': round((time.process_time() - inicio) * 1000, 3)}
+    return resultado
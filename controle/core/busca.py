@@ -0,0 +1,267 @@
+"""
+Busca por trecho de texto usando um índice de trigramas (core.models.IndiceBusca).
+
+Um LIKE '%termo%' não usa índice e varre a tabela inteira. Aqui cada texto
+indexado é quebrado em trigramas ("notebook" -> not, ote, teb, ...) e a busca
+procura os objetos que têm TODOS os trigramas do termo, partindo dos trigramas
+raros (leituras curtas no índice (trigrama, tipo, objeto_id)). Os candidatos
+são poucos e são ranqueados em Python (igual > começa com > contém).
+
+O índice é mantido pelos signals de cada app. Para (re)construir do zero:
+    python manage.py reindexar_busca
+"""
+import unicodedata
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.urls import reverse
+
+from .models import IndiceBusca
+
+# tipo -> (model, campos indexados)
+CAMPOS = {
+    'DISPOSITIVO': ('dispositivos.Dispositivo', ('codigo',)),
+    'FUNCIONARIO': ('funcionarios.Funcionario', ('nome', 'email')),
+    'EQUIPAMENTO': ('equipamentos.EquipamentoAuxiliar', ('nome',)),
+}
+
+# Termos menores que um trigrama caem na busca por prefixo (ver prefixo())
+TAMANHO_MINIMO = 3
+
+# Quantos candidatos são trazidos do índice, por tipo, para cada resultado pedido
+FATOR_CANDIDATOS = 5
+
+# Trigrama presente em mais objetos que isso é "comum" (ex.: "nb-" em todo notebook)
+# e não é lido inteiro: serve só para conferir os candidatos dos trigramas raros
+LIMITE_RARO = 2000
+
+# candidatos(): todos os trigramas do termo são comuns
+TERMO_COMUM = object()
+
+# Ids por IN (...) nas operações em lote: abaixo do limite de 999 variáveis do
+# SQLite antigo e longe do max_allowed_packet do MySQL
+LOTE_IDS = 900
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: 'João' e 'joao' viram a mesma coisa."""
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c)).strip()
+
+
+def trigramas(texto):
+    texto = normalizar(texto)
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _model(tipo):
+    return apps.get_model(CAMPOS[tipo][0])
+
+
+def _trigramas_do_objeto(tipo, obj):
+    resultado = set()
+    for campo in CAMPOS[tipo][1]:
+        resultado |= trigramas(getattr(obj, campo))
+    return resultado
+
+
+# ---------------------
+# MANUTENÇÃO DO ÍNDICE
+# ---------------------
+
+def indexar(tipo, obj):
+    """Atualiza só a diferença entre os trigramas gravados e os atuais."""
+    novos = _trigramas_do_objeto(tipo, obj)
+    atuais = set(IndiceBusca.objects.filter(tipo=tipo, objeto_id=obj.pk).values_list('trigrama', flat=True))
+    if novos == atuais:
+        return
+    with transaction.atomic():
+        if atuais - novos:
+            IndiceBusca.objects.filter(tipo=tipo, objeto_id=obj.pk, trigrama__in=atuais - novos).delete()
+        IndiceBusca.objects.bulk_create([
+            IndiceBusca(tipo=tipo, objeto_id=obj.pk, trigrama=t) for t in novos - atuais
+        ])
+
+
+def indexar_lote(tipo, objetos, lote=5000, novos=False):
+    """
+    Reindexa vários objetos de uma vez (importação e reindexação completa).
+    Com novos=True (objetos recém-criados) não há o que apagar antes.
+    """
+    objetos = list(objetos)
+    linhas = [(tipo, o.pk, t) for o in objetos for t in _trigramas_do_objeto(tipo, o)]
+    with transaction.atomic():
+        if not novos:
+            IndiceBusca.objects.filter(tipo=tipo, objeto_id__in=[o.pk for o in objetos]).delete()
+        # executemany direto: centenas de milhares de linhas sem instanciar um model para cada uma
+        # (o pymysql junta o executemany num INSERT de várias linhas)
+        opts = IndiceBusca._meta
+        colunas = ', '.join(connection.ops.quote_name(opts.get_field(c).column) for c in ('tipo', 'objeto_id', 'trigrama'))
+        sql = f"INSERT INTO {connection.ops.quote_name(opts.db_table)} ({colunas}) VALUES (%s, %s, %s)"
+        with connection.cursor() as cursor:
+            for i in range(0, len(linhas), lote):
+                cursor.executemany(sql, linhas[i:i + lote])
+
+
+def remover(tipo, objeto_id):
+    IndiceBusca.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+
+def remover_lote(tipo, objeto_ids):
+    objeto_ids = list(objeto_ids)
+    for i in range(0, len(objeto_ids), LOTE_IDS):
+        IndiceBusca.objects.filter(tipo=tipo, objeto_id__in=objeto_ids[i:i + LOTE_IDS]).delete()
+
+
+# ---------------------
+# CONSULTA
+# ---------------------
+
+def _amostrar(tipo, tris):
+    """
+    {trigrama: ids} com no máximo LIMITE_RARO + 1 ids por trigrama, numa query só:
+    cada parte do UNION para no LIMIT, então um trigrama comum custa o mesmo que um raro.
+    """
+    tabela = connection.ops.quote_name(IndiceBusca._meta.db_table)
+    parte = (
+        f"SELECT t, o FROM (SELECT trigrama AS t, objeto_id AS o FROM {tabela} "
+        f"WHERE tipo = %s AND trigrama = %s LIMIT {LIMITE_RARO + 1}) AS p{{}}"
+    )
+    ordem = sorted(tris)
+    sql = ' UNION ALL '.join(parte.format(i) for i in range(len(ordem)))
+    amostras = {t: set() for t in ordem}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [valor for t in ordem for valor in (tipo, t)])
+        for trigrama, objeto_id in cursor.fetchall():
+            amostras[trigrama].add(objeto_id)
+    return amostras
+
+
+def candidatos(tipo, termo):
+    """
+    Ids que contêm todos os trigramas do termo, para usar em filter(id__in=...).
+    Devolve None se o termo for curto demais para o índice, e TERMO_COMUM se todos
+    os trigramas do termo forem comuns (ver filtro()).
+
+    Os trigramas raros (até LIMITE_RARO objetos) vêm inteiros na amostra, e a
+    interseção deles já limita os candidatos; os comuns só são conferidos para
+    esses ids. Nenhuma lista de postagens de um trigrama comum é lida inteira.
+    """
+    tris = trigramas(termo)
+    if len(normalizar(termo)) < TAMANHO_MINIMO or not tris:
+        return None
+    amostras = _amostrar(tipo, tris)
+    raros = [ids for ids in amostras.values() if len(ids) <= LIMITE_RARO]
+    if not raros:
+        return TERMO_COMUM
+    ids = set.intersection(*raros)
+    comuns = [t for t, amostra in amostras.items() if len(amostra) > LIMITE_RARO]
+    if not comuns or not ids:
+        return sorted(ids)
+    return (
+        IndiceBusca.objects.filter(tipo=tipo, trigrama__in=comuns, objeto_id__in=ids)
+        .values('objeto_id')
+        .annotate(encontrados=Count('trigrama'))
+        .filter(encontrados=len(comuns))
+        .values('objeto_id')
+    )
+
+
+def filtro(tipo, termo, caminho=''):
+    """
+    Q de "contém o termo" para o model do tipo (ou para a relação em `caminho`,
+    ex.: 'funcionario__'), ou None se o termo for curto demais para o índice.
+    Em qualquer caso o critério é o mesmo: ter todos os trigramas do termo
+    normalizado ('joao' acha 'João', como no _pontuar).
+
+    Termo com todos os trigramas comuns casa com boa parte da tabela: em vez de
+    montar a lista de ids, cada linha é conferida no índice (um EXISTS por
+    trigrama, uma leitura pontual em (tipo, trigrama, objeto_id)) na ordem da
+    listagem, que completa a página logo nas primeiras linhas.
+    """
+    ids = candidatos(tipo, termo)
+    if ids is None:
+        return None
+    if ids is TERMO_COMUM:
+        objeto = OuterRef(f'{caminho}pk')
+        condicao = Q()
+        for trigrama in sorted(trigramas(termo)):
+            condicao &= Exists(IndiceBusca.objects.filter(tipo=tipo, trigrama=trigrama, objeto_id=objeto))
+        return condicao
+    return Q(**{f'{caminho}{"id" if caminho else "pk"}__in': ids})
+
+
+def prefixo(tipo, termo):
+    """
+    values('pk') dos objetos com algum campo começando pelo termo, para filter(pk__in=...).
+
+    Um SELECT por campo, juntos num UNION: cada parte é um range no índice da
+    própria coluna (no MySQL, com collation _ci, o istartswith é um LIKE 'termo%'
+    direto na coluna). Um OR entre colunas numa query só não usa índice nenhum.
+    """
+    model = _model(tipo)
+    partes = [model.objects.filter(**{f'{campo}__istartswith': termo}).order_by().values('pk') for campo in CAMPOS[tipo][1]]
+    return partes[0].union(*partes[1:]) if len(partes) > 1 else partes[0]
+
+
+def _pontuar(tipo, obj, termo):
+    """3 = igual, 2 = começa com, 1 = contém, 0 = falso positivo do trigrama."""
+    melhor = 0
+    for campo in CAMPOS[tipo][1]:
+        valor = normalizar(getattr(obj, campo))
+        if valor == termo:
+            melhor = max(melhor, 3)
+        elif valor.startswith(termo):
+            melhor = max(melhor, 2)
+        elif termo in valor:
+            melhor = max(melhor, 1)
+    return melhor
+
+
+def _resultado(tipo, obj, pontos):
+    if tipo == 'DISPOSITIVO':
+        titulo, detalhe = obj.codigo, obj.get_tipo_dispositivo_display()
+        url = f"{reverse('dispositivos:listar_dispositivos')}?{urlencode({'busca': obj.codigo})}"
+    elif tipo == 'FUNCIONARIO':
+        titulo, detalhe = obj.nome, obj.email
+        url = reverse('funcionarios:listar_funcionarios')
+    else:
+        titulo, detalhe = obj.nome, obj.get_tipo_equipamento_aux_display()
+        url = reverse('equipamentos:listar_por_tipo', args=[obj.tipo_equipamento_aux])
+    return {'tipo': tipo, 'id': obj.pk, 'titulo': titulo, 'detalhe': detalhe, 'url': url, 'pontos': pontos}
+
+
+def buscar(termo, tipos=None, limite=10):
+    """Busca ranqueada em dispositivos, funcionários e equipamentos. Devolve os `limite` melhores."""
+    termo_normalizado = normalizar(termo)
+    if not termo_normalizado:
+        return []
+
+    resultados = []
+    for tipo in (tipos or CAMPOS):
+        model = _model(tipo)
+
+        # 1) Quem começa com o termo já entra com boa pontuação: um range no índice de cada campo
+        ids = set()
+        for campo in CAMPOS[tipo][1]:
+            qs = model.objects.filter(**{f'{campo}__istartswith': termo}).order_by(campo)
+            ids.update(qs.values_list('pk', flat=True)[:limite])
+        encontrados = model.objects.in_bulk(ids)
+
+        # 2) Quem contém o termo no meio, via índice de trigramas
+        condicao = filtro(tipo, termo)
+        if condicao is not None:
+            qs = model.objects.filter(condicao).exclude(pk__in=list(encontrados))
+            for obj in qs.order_by('pk')[:limite * FATOR_CANDIDATOS]:
+                encontrados[obj.pk] = obj
+
+        for obj in encontrados.values():
+            pontos = _pontuar(tipo, obj, termo_normalizado)
+            if pontos:
+                resultados.append(_resultado(tipo, obj, pontos))
+
+    # Mais pontos primeiro; no empate, o texto mais curto (mais parecido com o termo)
+    resultados.sort(key=lambda r: (-r['pontos'], len(r['titulo'])))
+    return resultados[:limite]
@@ -0,0 +1,72 @@
+"""
+Backends de cache que contam acertos e falhas para o /metrics (core/metricas.py).
+
+Uso no settings: 'BACKEND': 'core.cache.FileBasedCache' e, opcionalmente,
+'NOME': 'default' para identificar o cache nas métricas.
+
+Os dois descartam pelo LRU quando passam de MAX_ENTRIES: o LocMemCache do Django
+já faz isso; o FileBasedCache daqui troca o sorteio do Django pelo arquivo lido
+há mais tempo (a data de modificação é atualizada a cada acerto).
+"""
+import os
+
+from django.core.cache.backends import filebased, locmem
+
+from . import metricas
+
+_AUSENTE = object()
+
+
+class MetricasCacheMixin:
+    # Só get() é medido: get_many() e os métodos async do BaseCache passam por ele
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.nome_metricas = params.get('NOME', location or 'default')
+
+    def get(self, key, default=None, version=None):
+        valor = super().get(key, _AUSENTE, version)
+        metricas.registrar_cache(self.nome_metricas, valor is not _AUSENTE)
+        return default if valor is _AUSENTE else valor
+
+
+class FileBasedCache(MetricasCacheMixin, filebased.FileBasedCache):
+    def get(self, key, default=None, version=None):
+        valor = super().get(key, _AUSENTE, version)
+        if valor is _AUSENTE:
+            return default
+        try:
+            # Marca o acesso para o _cull() saber quem foi usado por último
+            os.utime(self._key_to_file(key, version))
+        except OSError:
+            pass
+        return valor
+
+    def _cull(self):
+        arquivos = self._list_cache_files()
+        if len(arquivos) < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def ultimo_acesso(arquivo):
+            try:
+                return os.path.getmtime(arquivo)
+            except OSError:
+                return 0
+
+        arquivos.sort(key=ultimo_acesso)
+        for arquivo in arquivos[:len(arquivos) // self._cull_frequency]:
+            self._delete(arquivo)
+
+
+class LocMemCache(MetricasCacheMixin, locmem.LocMemCache):
+    # Só memória do processo, sem I/O: os métodos async respondem na própria
+    # event loop em vez de mandar a chamada para uma thread (padrão do BaseCache)
+    async def aget(self, key, default=None, version=None):
+        return self.get(key, default, version)
+
+    async def aget_many(self, keys, version=None):
+        return self.get_many(keys, version)
+
+    async def aset(self, key, value, timeout=locmem.DEFAULT_TIMEOUT, version=None):
+        self.set(key, value, timeout, version)
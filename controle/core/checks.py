@@ -0,0 +1,115 @@
+"""
+System checks do projeto (rodam no `manage.py check`, no runserver e no migrate).
+"""
+import os
+import re
+
+from django.conf import settings
+from django.core import checks
+from django.template import engines
+
+# <script src>, <link href>, <img src>... e url()/@import de CSS apontando para outro host.
+# Links de navegação (<a href>) não contam: não atrasam a renderização da página.
+_TAG_EXTERNA = re.compile(
+    r'<(?:script|link|img|source|iframe|embed|video|audio)\b[^>]*?\b(?:src|href)\s*=\s*["\']?\s*((?:https?:)?//[^"\'\s>]+)',
+    re.IGNORECASE,
+)
+_CSS_EXTERNO = re.compile(r'(?:url\(\s*["\']?|@import\s+["\'])\s*((?:https?:)?//[^"\'\s)]+)', re.IGNORECASE)
+# {% static 'caminho' %} com o caminho literal
+_STATIC = re.compile(r'{%\s*static\s+["\']([^"\']+)["\']\s*%}')
+# url() relativo nos CSS de assets/ (o ManifestStaticFilesStorage também precisa achar o arquivo)
+_CSS_RELATIVO = re.compile(r'url\(\s*["\']?(?!data:|https?:|//|/|#)([^"\'\s)]+)', re.IGNORECASE)
+
+
+def _templates_do_projeto():
+    raiz = str(settings.BASE_DIR)
+    for engine in engines.all():
+        for pasta in getattr(engine, 'template_dirs', ()):
+            pasta = str(pasta)
+            if not pasta.startswith(raiz) or not os.path.isdir(pasta):
+                continue  # templates do Django e de pacotes instalados
+            for atual, _, nomes in os.walk(pasta):
+                for nome in nomes:
+                    if nome.endswith('.html'):
+                        yield os.path.join(atual, nome)
+
+
+@checks.register(checks.Tags.templates)
+def verificar_recursos_externos(app_configs, **kwargs):
+    """
+    Todo recurso carregado de outro host é avisado (W001): é uma conexão a mais
+    no caminho da renderização e um ponto de falha fora do nosso controle.
+    Se a biblioteca já está em assets/vendor/ o aviso vira erro (E001): o
+    template tem de usar o {% static %} (ver core/estaticos.py).
+    """
+    from .estaticos import VENDOR
+
+    raiz = os.path.join(settings.BASE_DIR, 'assets')
+    origens = {origem: destino for destino, origem in VENDOR}
+    erros = []
+    for caminho in _templates_do_projeto():
+        with open(caminho, encoding='utf-8') as f:
+            conteudo = f.read()
+        for regex in (_TAG_EXTERNA, _CSS_EXTERNO):
+            for match in regex.finditer(conteudo):
+                url = match.group(1)
+                destino = origens.get(url)
+                linha = conteudo.count('\n', 0, match.start()) + 1
+                mensagem = f"{os.path.relpath(caminho, settings.BASE_DIR)}:{linha} carrega {url}"
+                if destino and os.path.exists(os.path.join(raiz, destino)):
+                    erros.append(checks.Error(
+                        mensagem,
+                        hint=f"O arquivo já está em assets/: use {{% static '{destino}' %}}.",
+                        id='core.E001',
+                    ))
+                elif destino:
+                    erros.append(checks.Warning(
+                        mensagem,
+                        hint="Rode `python manage.py baixar_assets`, commite o arquivo e troque a referência por {% static %}.",
+                        id='core.W001',
+                    ))
+                else:
+                    erros.append(checks.Warning(
+                        mensagem,
+                        hint="Acrescente a origem em core/estaticos.py (VENDOR), rode `python manage.py baixar_assets` "
+                             "e sirva o arquivo pelo {% static %}.",
+                        id='core.W001',
+                    ))
+    return erros
+
+
+@checks.register(checks.Tags.templates)
+def verificar_estaticos(app_configs, **kwargs):
+    """Todo {% static %} dos templates e todo url() relativo dos CSS em assets/ apontam para um arquivo existente."""
+    from django.contrib.staticfiles import finders
+
+    erros = []
+    for caminho in _templates_do_projeto():
+        with open(caminho, encoding='utf-8') as f:
+            conteudo = f.read()
+        for match in _STATIC.finditer(conteudo):
+            if finders.find(match.group(1)) is None:
+                linha = conteudo.count('\n', 0, match.start()) + 1
+                erros.append(checks.Error(
+                    f"{os.path.relpath(caminho, settings.BASE_DIR)}:{linha} usa {match.group(1)}, que não existe",
+                    hint="Commite o arquivo em assets/ (ou rode `python manage.py baixar_assets`) antes de trocar a referência; "
+                         "sem ele o collectstatic falha e o ManifestStaticFilesStorage quebra a página.",
+                    id='core.E002',
+                ))
+    for pasta in settings.STATICFILES_DIRS:
+        for atual, _, nomes in os.walk(pasta):
+            for nome in nomes:
+                if not nome.endswith('.css'):
+                    continue
+                arquivo = os.path.join(atual, nome)
+                with open(arquivo, encoding='utf-8') as f:
+                    conteudo = f.read()
+                for match in _CSS_RELATIVO.finditer(conteudo):
+                    alvo = os.path.normpath(os.path.join(atual, match.group(1).split('?')[0].split('#')[0]))
+                    if not os.path.exists(alvo):
+                        erros.append(checks.Error(
+                            f"{os.path.relpath(arquivo, settings.BASE_DIR)} usa {match.group(1)}, que não existe",
+                            hint="Commite o arquivo junto com o CSS que o referencia.",
+                            id='core.E002',
+                        ))
+    return erros
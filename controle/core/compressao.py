@@ -0,0 +1,161 @@
+"""
+Compressão das respostas dinâmicas (HTML, JSON, CSV) com brotli ou gzip, conforme o Accept-Encoding.
+
+No lugar do GZipMiddleware do Django porque:
+  - prefere brotli quando o navegador aceita (e o pacote Brotli está instalado);
+  - respostas em streaming (exportação CSV) são comprimidas pedaço a pedaço, sem
+    juntar o corpo inteiro na memória; o compressor só devolve bytes quando tem
+    um bloco pronto, então a memória fica limitada ao estado dele;
+  - nível, tamanho mínimo e tipos são configuráveis no settings.
+
+Não comprime: o stream dos dashboards (text/event-stream, cada evento precisa
+sair na hora), respostas que já têm Content-Encoding (os estáticos pré-comprimidos
+de core/estaticos.py), Cache-Control: no-transform e corpos menores que COMPRESSAO_MINIMA.
+"""
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # sem o pacote Brotli só gzip é oferecido
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+TIPOS_IGNORADOS = ('text/event-stream',)
+
+
+class _Gzip:
+    def __init__(self, nivel):
+        # wbits=31: formato gzip (cabeçalho + CRC), não zlib puro
+        self._obj = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+
+    def comprimir(self, dados):
+        return self._obj.compress(dados)
+
+    def finalizar(self):
+        return self._obj.flush()
+
+
+class _Brotli:
+    def __init__(self, qualidade):
+        self._obj = brotli.Compressor(quality=qualidade)
+
+    def comprimir(self, dados):
+        return self._obj.process(dados)
+
+    def finalizar(self):
+        return self._obj.finish()
+
+
+def codificacoes():
+    """Codificações oferecidas, da preferida para a menos preferida."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compressor(codificacao):
+    if codificacao == 'br':
+        return _Brotli(getattr(settings, 'COMPRESSAO_QUALIDADE_BROTLI', 4))
+    return _Gzip(getattr(settings, 'COMPRESSAO_NIVEL_GZIP', 6))
+
+
+def comprimir_pedacos(pedacos, codificacao):
+    """Gera o corpo comprimido a partir de um iterável de bytes, sem juntar a entrada."""
+    c = compressor(codificacao)
+    for pedaco in pedacos:
+        saida = c.comprimir(pedaco)
+        if saida:
+            yield saida
+    yield c.finalizar()
+
+
+async def _comprimir_pedacos_async(pedacos, codificacao):
+    c = compressor(codificacao)
+    async for pedaco in pedacos:
+        saida = c.comprimir(pedaco)
+        if saida:
+            yield saida
+    yield c.finalizar()
+
+
+def escolher(accept_encoding):
+    """A primeira codificação nossa que o navegador aceita (q=0 conta como recusa), ou None."""
+    aceitas = set()
+    for parte in accept_encoding.lower().split(','):
+        nome, _, parametros = parte.partition(';')
+        if parametros.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        aceitas.add(nome.strip())
+    for codificacao in codificacoes():
+        if codificacao in aceitas or '*' in aceitas:
+            return codificacao
+    return None
+
+
+def comprimivel(response):
+    """A resposta pode ser comprimida? (independe do que o navegador aceita)"""
+    if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+        return False
+    if 'no-transform' in response.get('Cache-Control', ''):
+        return False
+    tipo = response.get('Content-Type', '').split(';')[0].strip().lower()
+    if tipo in TIPOS_IGNORADOS or not tipo.startswith(TIPOS_COMPRIMIVEIS):
+        return False
+    if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSAO_MINIMA', 1024):
+        return False
+    return True
+
+
+class CompressaoMiddleware:
+    """
+    Fica acima do InstrumentacaoSQLMiddleware (que ainda mexe no HTML para os staff)
+    e abaixo do MetricasMiddleware, para a latência do /metrics incluir a compressão.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.processar(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.processar(request, await self.get_response(request))
+
+    def processar(self, request, response):
+        # O Vary vale mesmo quando esta resposta sai sem compressão
+        if not comprimivel(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacao = escolher(request.headers.get('Accept-Encoding', ''))
+        if codificacao is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _comprimir_pedacos_async(response.streaming_content, codificacao)
+            else:
+                response.streaming_content = comprimir_pedacos(response.streaming_content, codificacao)
+            # O tamanho final só é conhecido no fim do stream
+            del response['Content-Length']
+        else:
+            comprimido = b''.join(comprimir_pedacos([response.content], codificacao))
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response['Content-Length'] = str(len(comprimido))
+
+        # O corpo mudou de bytes: um ETag forte deixaria de valer (If-None-Match compara fraco)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codificacao
+        return response
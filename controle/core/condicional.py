@@ -0,0 +1,77 @@
+"""
+Respostas condicionais (ETag / Last-Modified) a partir da versão das linhas (core.models.Versionado).
+
+A view informa como obter a versão do que ela devolve, com uma query pequena
+(chave primária ou índice), e o decorator responde 304 quando o navegador já
+tem essa versão, sem executar a view nem montar o JSON.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def assinatura(*partes):
+    """ETag forte a partir das partes (versões, quantidades, datas) que identificam a resposta."""
+    return hashlib.md5(repr(partes).encode(), usedforsecurity=False).hexdigest()
+
+
+def ultima_alteracao(*datas):
+    datas = [d for d in datas if d is not None]
+    return max(datas) if datas else None
+
+
+def _preparar(request, versao):
+    """(etag, timestamp, 304/412 ou None) a partir do que obter_versao devolveu."""
+    etag, modificado = versao
+    etag = quote_etag(etag)
+    timestamp = int(modificado.timestamp()) if modificado else None
+    return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def _marcar(response, etag, timestamp):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Sem max-age o navegador poderia reaproveitar a resposta sem perguntar
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def condicional(obter_versao):
+    """
+    `obter_versao(request, *args, **kwargs)` devolve (etag, última alteração) ou None
+    quando o objeto não existe (a view responde o 404). Só vale para GET/HEAD.
+    Em view async, `obter_versao` também é async.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def _view_async(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+                versao = await obter_versao(request, *args, **kwargs)
+                if versao is None:
+                    return await view(request, *args, **kwargs)
+                etag, timestamp, response = _preparar(request, versao)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _marcar(response, etag, timestamp)
+            return _view_async
+
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            versao = obter_versao(request, *args, **kwargs)
+            if versao is None:
+                return view(request, *args, **kwargs)
+            etag, timestamp, response = _preparar(request, versao)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _marcar(response, etag, timestamp)
+        return _view
+    return decorator
@@ -0,0 +1,65 @@
+"""
+Backend MySQL do Django com pool de conexões (core/db/pool.py).
+
+No settings: ENGINE 'core.db.mysql' e as opções em DATABASES[alias]['POOL']
+(variáveis DB_POOL_*). Todo o resto (operações, introspecção, migrations) é o
+django.db.backends.mysql, com o pymysql no lugar do MySQLdb.
+
+O Django continua abrindo e fechando a conexão a cada requisição (CONN_MAX_AGE
+= 0); só que "abrir" pega uma conexão do pool e "fechar" a devolve. Uma
+conexão devolvida no meio de uma transação leva rollback antes; depois de um
+erro de banco, ou fechada dentro de um atomic(), é descartada.
+"""
+from django.db.backends.mysql import base as mysql
+from django.utils.asyncio import async_unsafe
+
+from core.db import pool as pools
+
+Database = mysql.Database
+
+
+def _conectar(conn_params):
+    conexao = Database.connect(**conn_params)
+    # Mesmo ajuste do backend do Django (ver django.db.backends.mysql.base.get_new_connection)
+    if conexao.encoders.get(bytes) is bytes:
+        conexao.encoders.pop(bytes)
+    return conexao
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+    _pool = None
+    _reaproveitada = False
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        opcoes = self.settings_dict.get('POOL') or {}
+        if int(opcoes.get('MAX', 10)) <= 0:  # DB_POOL_MAX=0 desliga o pool
+            self._pool, self._reaproveitada = None, False
+            return super().get_new_connection(conn_params)
+        # O pool vale para um servidor/banco: se o NAME mudar (banco de teste), é refeito
+        destino = tuple(conn_params.get(chave) for chave in ('host', 'unix_socket', 'port', 'user', 'database'))
+        self._pool = pools.do_alias(self.alias, lambda: _conectar(conn_params), opcoes,
+                                    erro=Database.OperationalError, destino=destino)
+        conexao, self._reaproveitada = self._pool.emprestar()
+        return conexao
+
+    def init_connection_state(self):
+        # Os SET da sessão (SQL_AUTO_IS_NULL, nível de isolamento) continuam valendo na reaproveitada
+        if not self._reaproveitada:
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self._pool is None:
+            return super()._close()
+        conexao, pool = self.connection, self._pool
+        descartar = self.in_atomic_block or self.errors_occurred
+        if not descartar and not self.autocommit:
+            # Transação aberta com set_autocommit(False): o próximo dono religa o
+            # autocommit, e no MySQL isso faria COMMIT do que ficou pendente
+            try:
+                conexao.rollback()
+            except Database.Error:
+                descartar = True
+        pool.devolver(conexao, descartar=descartar)
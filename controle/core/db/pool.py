@@ -0,0 +1,237 @@
+"""
+Pool de conexões com o banco, um por processo e por alias (ver core/db/mysql/base.py).
+
+Sem pool, cada requisição abre uma conexão nova com o MySQL (TCP + autenticação
++ os SET da sessão) e a fecha no fim. Com o pool, a conexão fechada pelo Django
+volta para a fila de ociosas e a próxima requisição do processo a reaproveita.
+
+  - MAX: conexões abertas por processo (em uso + ociosas). Quando todas estão em
+    uso, quem pede espera até ESPERA segundos e depois recebe OperationalError.
+  - OCIOSO: ociosa há mais que isso é fechada (o MySQL derruba as conexões
+    paradas depois do wait_timeout, 8 horas por padrão).
+  - VIDA: idade máxima de uma conexão, mesmo sempre em uso; espalha as
+    reconexões e acompanha failover/troca de IP do servidor.
+  - PING_APOS: uma ociosa há mais que isso leva um ping antes de ser entregue;
+    se não responder, é descartada e o pool tenta a próxima.
+
+A fila das ociosas é LIFO: a conexão devolvida por último (a que acabou de ser
+usada e com certeza está viva) sai primeiro e dispensa o ping; as do fundo
+envelhecem até o OCIOSO e são fechadas, então o pool encolhe sozinho fora do pico.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from core import metricas
+
+BUCKETS_ESPERA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+EVENTOS = ('criadas', 'reaproveitadas', 'recicladas', 'descartadas', 'pings_falhos', 'esperas', 'esgotamentos')
+
+
+class Pool:
+    def __init__(self, alias, criar, maximo=10, espera=5.0, ocioso=300.0, vida=3600.0, ping_apos=10.0,
+                 erro=RuntimeError, destino=None):
+        self.alias = alias
+        self.destino = destino  # (host, socket, porta, usuário, banco) das conexões deste pool
+        self.maximo = maximo
+        self.espera = espera
+        self.ocioso = ocioso
+        self.vida = vida
+        self.ping_apos = ping_apos
+        self._criar = criar
+        self._erro = erro  # exceção do driver para pool esgotado (o Django embrulha em OperationalError)
+        self._cond = threading.Condition()
+        self._encerrado = False
+        self._iniciar()
+
+    def _iniciar(self):
+        self._pid = os.getpid()
+        self._ociosas = deque()  # (conexão, criada em, devolvida em)
+        self._em_uso = {}  # id(conexão) -> criada em
+        self._abrindo = 0
+        self.eventos = dict.fromkeys(EVENTOS, 0)
+
+    def _verificar_fork(self):
+        # Num processo filho (gunicorn --preload), as conexões herdadas dividem o
+        # socket com o pai: são esquecidas sem fechar, para não derrubar as dele.
+        if self._pid != os.getpid():
+            self._iniciar()
+
+    def _contar(self, evento):
+        self.eventos[evento] += 1
+        metricas.registro.somar('controle_db_pool_eventos_total', {'alias': self.alias, 'evento': evento})
+
+    def _abertas(self):
+        return len(self._ociosas) + len(self._em_uso) + self._abrindo
+
+    def emprestar(self):
+        """(conexão, reaproveitada): uma ociosa saudável, uma nova ou, no limite, a espera por uma devolução."""
+        limite = time.monotonic() + self.espera
+        inicio_espera = None
+        while True:
+            vencidas = []
+            with self._cond:
+                self._verificar_fork()
+                entrada = None
+                agora = time.monotonic()
+                while self._ociosas:
+                    conexao, criada, devolvida = self._ociosas.pop()
+                    if agora - devolvida > self.ocioso or agora - criada > self.vida:
+                        vencidas.append(conexao)
+                        self._contar('recicladas')
+                        continue
+                    self._em_uso[id(conexao)] = criada
+                    entrada = (conexao, agora - devolvida)
+                    break
+                if entrada is None:
+                    if self._abertas() >= self.maximo:
+                        restante = limite - agora
+                        if restante <= 0:
+                            self._contar('esgotamentos')
+                            raise self._erro(
+                                f"Pool de conexões '{self.alias}' esgotado: {self.maximo} em uso "
+                                f"por mais de {self.espera:g}s (DB_POOL_MAX / DB_POOL_ESPERA)."
+                            )
+                        if inicio_espera is None:
+                            inicio_espera = agora
+                            self._contar('esperas')
+                        self._cond.wait(restante)
+                        continue
+                    self._abrindo += 1
+            for conexao in vencidas:
+                _fechar(conexao)
+
+            if entrada is None:
+                conexao = self._abrir()
+                self._registrar_espera(inicio_espera)
+                return conexao, False
+
+            conexao, parada = entrada
+            if parada > self.ping_apos and not self._responde(conexao):
+                self.devolver(conexao, descartar=True)
+                self._contar('pings_falhos')
+                continue
+            self._contar('reaproveitadas')
+            self._registrar_espera(inicio_espera)
+            return conexao, True
+
+    def _abrir(self):
+        try:
+            conexao = self._criar()
+        except BaseException:
+            with self._cond:
+                self._abrindo -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._abrindo -= 1
+            self._em_uso[id(conexao)] = time.monotonic()
+            self._contar('criadas')
+        return conexao
+
+    @staticmethod
+    def _responde(conexao):
+        try:
+            # reconnect=False: uma conexão que caiu é trocada por outra do pool,
+            # não reaberta por baixo (perderia os SET da sessão)
+            conexao.ping(reconnect=False)
+        except Exception:
+            return False
+        return True
+
+    def _registrar_espera(self, inicio):
+        if inicio is not None:
+            metricas.registro.observar('controle_db_pool_espera_segundos', {'alias': self.alias},
+                                       time.monotonic() - inicio, BUCKETS_ESPERA)
+
+    def devolver(self, conexao, descartar=False):
+        """Volta para as ociosas, ou é fechada se pedido ou se passou da VIDA."""
+        with self._cond:
+            self._verificar_fork()
+            criada = self._em_uso.pop(id(conexao), None)
+            if criada is None:
+                return  # herdada do processo pai: o socket é dele
+            agora = time.monotonic()
+            guardar = not descartar and not self._encerrado and agora - criada <= self.vida
+            if guardar:
+                self._ociosas.append((conexao, criada, agora))
+            else:
+                self._contar('descartadas' if descartar else 'recicladas')
+            self._cond.notify()
+        if not guardar:
+            _fechar(conexao)
+
+    def fechar_ociosas(self):
+        with self._cond:
+            self._verificar_fork()
+            ociosas = [conexao for conexao, _, _ in self._ociosas]
+            self._ociosas.clear()
+            self._cond.notify_all()
+        for conexao in ociosas:
+            _fechar(conexao)
+
+    def encerrar(self):
+        """Substituído por outro pool: fecha as ociosas e as em uso são fechadas na devolução."""
+        with self._cond:
+            self._encerrado = True
+        self.fechar_ociosas()
+
+    def estatisticas(self):
+        with self._cond:
+            self._verificar_fork()
+            return {
+                'alias': self.alias,
+                'maximo': self.maximo,
+                'em_uso': len(self._em_uso) + self._abrindo,
+                'ociosas': len(self._ociosas),
+                **self.eventos,
+            }
+
+
+def _fechar(conexao):
+    try:
+        conexao.close()
+    except Exception:
+        pass  # já caída: o socket fecha com o objeto
+
+
+# ---------------------
+# UM POOL POR ALIAS
+# ---------------------
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def do_alias(alias, criar, opcoes, erro=RuntimeError, destino=None):
+    """
+    O pool do alias neste processo, criado na primeira conexão com as opções de DATABASES[alias]['POOL'].
+
+    `destino` identifica o servidor e o banco das conexões. Se mudar (o test runner troca
+    o NAME do alias para o banco de teste), o pool é refeito: uma conexão aberta para um
+    banco nunca é entregue a quem pediu outro. Sem `destino`, devolve o pool atual.
+    """
+    pool = _pools.get(alias)
+    if pool is None or (destino is not None and pool.destino != destino):
+        with _lock:
+            pool = _pools.get(alias)
+            if pool is None or (destino is not None and pool.destino != destino):
+                if pool is not None:
+                    pool.encerrar()
+                pool = _pools[alias] = Pool(
+                    alias, criar,
+                    maximo=int(opcoes.get('MAX', 10)),
+                    espera=float(opcoes.get('ESPERA', 5)),
+                    ocioso=float(opcoes.get('OCIOSO', 300)),
+                    vida=float(opcoes.get('VIDA', 3600)),
+                    ping_apos=float(opcoes.get('PING_APOS', 10)),
+                    erro=erro,
+                    destino=destino,
+                )
+    return pool
+
+
+def todos():
+    return list(_pools.values())
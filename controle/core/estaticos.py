@@ -0,0 +1,207 @@
+"""
+Arquivos estáticos servidos pela própria aplicação, sem servidor web na frente.
+
+  - As bibliotecas de terceiros vão para assets/vendor/ (lista em VENDOR; o
+    comando `baixar_assets` busca as que faltarem, uma vez, para commitar).
+    Enquanto o arquivo não está commitado, o template continua apontando para
+    a URL de origem no CDN; a referência só vira {% static %} junto com o
+    arquivo (core.checks: W001, E001 e E002).
+  - O collectstatic (ArmazenamentoEstaticos) grava cada arquivo também com o hash
+    do conteúdo no nome (bootstrap.min.3f2a9c.css) e, ao lado, as variantes .gz
+    e .br já comprimidas.
+  - O EstaticosMiddleware responde /static/ direto do STATIC_ROOT: escolhe a
+    variante pelo Accept-Encoding e manda cache "immutable" de um ano para os
+    nomes com hash (o conteúdo daquela URL nunca muda; outro conteúdo, outra URL).
+
+Rode `python manage.py collectstatic` a cada deploy, antes de subir os processos:
+o índice dos arquivos é montado uma vez, na inicialização.
+"""
+import gzip
+import mimetypes
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # sem o pacote Brotli só as variantes .gz são geradas
+    brotli = None
+
+# (destino em assets/, origem). A versão faz parte do caminho: atualizar uma
+# biblioteca é acrescentar a pasta nova e trocar a referência nos templates.
+VENDOR = [
+    ('vendor/bootstrap-5.3.3/css/bootstrap.min.css',
+     'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css'),
+    ('vendor/bootstrap-5.3.3/css/bootstrap.min.css.map',
+     'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css.map'),
+    ('vendor/bootstrap-5.3.3/js/bootstrap.bundle.min.js',
+     'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js'),
+    ('vendor/bootstrap-5.3.3/js/bootstrap.bundle.min.js.map',
+     'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js.map'),
+    ('vendor/bootstrap-icons-1.11.3/bootstrap-icons.min.css',
+     'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.min.css'),
+    ('vendor/bootstrap-icons-1.11.3/fonts/bootstrap-icons.woff2',
+     'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff2'),
+    ('vendor/bootstrap-icons-1.11.3/fonts/bootstrap-icons.woff',
+     'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff'),
+    ('vendor/jquery-3.7.1/jquery.min.js',
+     'https://code.jquery.com/jquery-3.7.1.min.js'),
+    ('vendor/tom-select-2.2.2/css/tom-select.bootstrap5.min.css',
+     'https://cdn.jsdelivr.net/npm/tom-select@2.2.2/dist/css/tom-select.bootstrap5.min.css'),
+    ('vendor/tom-select-2.2.2/css/tom-select.bootstrap5.min.css.map',
+     'https://cdn.jsdelivr.net/npm/tom-select@2.2.2/dist/css/tom-select.bootstrap5.min.css.map'),
+    ('vendor/tom-select-2.2.2/js/tom-select.complete.min.js',
+     'https://cdn.jsdelivr.net/npm/tom-select@2.2.2/dist/js/tom-select.complete.min.js'),
+    ('vendor/tom-select-2.2.2/js/tom-select.complete.min.js.map',
+     'https://cdn.jsdelivr.net/npm/tom-select@2.2.2/dist/js/tom-select.complete.min.js.map'),
+]
+
+# Formatos já comprimidos (imagens, woff/woff2) não ganham nada com gzip/brotli
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.ttf', '.eot')
+
+# Variantes, da preferida para a menos preferida: (Content-Encoding, sufixo do arquivo)
+CODIFICACOES = [('br', '.br'), ('gzip', '.gz')]
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+mimetypes.add_type('font/woff2', '.woff2')
+mimetypes.add_type('font/woff', '.woff')
+mimetypes.add_type('application/json', '.map')
+
+
+def comprimir(caminho, minimo):
+    """Grava caminho.gz (e caminho.br, se houver o pacote Brotli) quando compensa."""
+    with open(caminho, 'rb') as f:
+        dados = f.read()
+    if len(dados) < minimo:
+        return
+    variantes = {'.gz': gzip.compress(dados, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(dados, quality=11)
+    for sufixo, comprimido in variantes.items():
+        # Menos de 5% de ganho não paga o Content-Encoding
+        if len(comprimido) < len(dados) * 0.95:
+            with open(caminho + sufixo, 'wb') as f:
+                f.write(comprimido)
+
+
+class ArmazenamentoEstaticos(ManifestStaticFilesStorage):
+    """Nomes com hash do conteúdo (ManifestStaticFilesStorage) + variantes .gz/.br de cada arquivo."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        minimo = getattr(settings, 'ESTATICOS_COMPRESSAO_MINIMA', 512)
+        nomes = set(paths)
+        nomes.update(self.hashed_files.get(self.hash_key(self.clean_name(nome))) for nome in paths)
+        for nome in nomes:
+            if nome and nome.endswith(EXTENSOES_COMPRIMIVEIS) and self.exists(nome):
+                comprimir(self.path(nome), minimo)
+
+
+class Arquivo:
+    """Um arquivo do STATIC_ROOT e as variantes comprimidas que existirem ao lado dele."""
+
+    __slots__ = ('caminho', 'tipo', 'charset', 'tamanho', 'modificado', 'etag', 'cache', 'variantes')
+
+    def __init__(self, caminho, imutavel, max_age):
+        estado = os.stat(caminho)
+        self.caminho = caminho
+        self.tipo, _ = mimetypes.guess_type(caminho)
+        self.tipo = self.tipo or 'application/octet-stream'
+        self.charset = self.tipo.startswith('text/') or self.tipo in ('application/javascript', 'application/json')
+        self.tamanho = estado.st_size
+        self.modificado = int(estado.st_mtime)
+        self.etag = f'"{estado.st_size:x}-{estado.st_mtime_ns:x}"'
+        self.cache = CACHE_IMUTAVEL if imutavel else f'public, max-age={max_age}'
+        self.variantes = [
+            (codificacao, caminho + sufixo, os.path.getsize(caminho + sufixo))
+            for codificacao, sufixo in CODIFICACOES if os.path.exists(caminho + sufixo)
+        ]
+
+    def escolher(self, accept_encoding):
+        """(caminho, tamanho, Content-Encoding ou None) conforme o Accept-Encoding do navegador."""
+        aceitas = {parte.split(';')[0].strip().lower() for parte in accept_encoding.split(',')}
+        for codificacao, caminho, tamanho in self.variantes:
+            if codificacao in aceitas:
+                return caminho, tamanho, codificacao
+        return self.caminho, self.tamanho, None
+
+
+def indexar(raiz, manifesto, max_age):
+    """{caminho relativo: Arquivo} de tudo que está no STATIC_ROOT (menos as próprias variantes)."""
+    imutaveis = set(manifesto.values())
+    arquivos = {}
+    for pasta, _, nomes in os.walk(raiz):
+        for nome in nomes:
+            if nome.endswith(tuple(sufixo for _, sufixo in CODIFICACOES)):
+                continue
+            caminho = os.path.join(pasta, nome)
+            relativo = os.path.relpath(caminho, raiz).replace(os.sep, '/')
+            arquivos[relativo] = Arquivo(caminho, relativo in imutaveis, max_age)
+    return arquivos
+
+
+class EstaticosMiddleware:
+    """
+    Primeiro da lista (logo depois do SecurityMiddleware): um arquivo estático não
+    passa por sessão, autenticação, métricas por view nem banco.
+    Sem STATIC_ROOT coletado fica desligado (no runserver com DEBUG quem serve é o staticfiles).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        raiz = settings.STATIC_ROOT
+        if not raiz or not os.path.isdir(raiz):
+            raise MiddlewareNotUsed
+        self.prefixo = '/' + settings.STATIC_URL.lstrip('/')
+        # staticfiles.json: nome original -> nome com hash (vazio se o collectstatic não gerou)
+        manifesto = ArmazenamentoEstaticos(location=raiz).hashed_files
+        self.arquivos = indexar(raiz, manifesto, getattr(settings, 'ESTATICOS_MAX_AGE', 60))
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._responder(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self._responder(request) or await self.get_response(request)
+
+    def _responder(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefixo):
+            return None
+        arquivo = self.arquivos.get(request.path_info[len(self.prefixo):])
+        if arquivo is None:
+            return None
+
+        response = get_conditional_response(request, etag=arquivo.etag, last_modified=arquivo.modificado)
+        if response is None:
+            caminho, tamanho, codificacao = arquivo.escolher(request.headers.get('Accept-Encoding', ''))
+            corpo = b''
+            if request.method == 'GET':
+                with open(caminho, 'rb') as f:
+                    corpo = f.read()
+            tipo = f'{arquivo.tipo}; charset=utf-8' if arquivo.charset else arquivo.tipo
+            response = HttpResponse(corpo, content_type=tipo)
+            response['Content-Length'] = tamanho
+            if codificacao:
+                response['Content-Encoding'] = codificacao
+        if arquivo.variantes:
+            response['Vary'] = 'Accept-Encoding'
+        response['ETag'] = arquivo.etag
+        response['Last-Modified'] = http_date(arquivo.modificado)
+        response['Cache-Control'] = arquivo.cache
+        return response
@@ -0,0 +1,139 @@
+"""
+Stream de eventos (SSE) dos dashboards.
+
+Cada processo ASGI tem um único vigia que olha as versões no cache (core.versoes)
+a cada EVENTOS_INTERVALO segundos. Quando a versão de um canal muda, os dados do
+canal são recalculados uma vez e só as chaves que mudaram são enviadas a todos os
+navegadores conectados naquele canal.
+
+Uma conexão parada custa só um objeto Assinante (um dict e um asyncio.Event),
+então um worker aguenta milhares delas sem consultar o banco por conexão.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import versoes
+
+# canal -> (labels dos models observados, função que calcula os dados do canal)
+CANAIS = {}
+
+
+def registrar_canal(nome, labels, coletar):
+    """Chamado no ready() de cada app. `coletar` devolve um dict plano de valores."""
+    CANAIS[nome] = (tuple(labels), coletar)
+
+
+def intervalo():
+    return getattr(settings, 'EVENTOS_INTERVALO', 1.0)
+
+
+def diferenca(antes, depois):
+    """Só as chaves que mudaram (ou surgiram) entre dois snapshots."""
+    return {chave: valor for chave, valor in depois.items() if antes.get(chave) != valor}
+
+
+class Assinante:
+    """Uma conexão SSE. Os deltas pendentes são mesclados, então cliente lento não acumula fila."""
+
+    def __init__(self, canais):
+        self.canais = set(canais)
+        self.pendente = {}
+        self.sinal = asyncio.Event()
+
+    def entregar(self, canal, delta):
+        self.pendente.setdefault(canal, {}).update(delta)
+        self.sinal.set()
+
+    async def proximo(self, timeout):
+        try:
+            await asyncio.wait_for(self.sinal.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.sinal.clear()
+        pendente, self.pendente = self.pendente, {}
+        return pendente
+
+
+class Difusor:
+    def __init__(self):
+        self.assinantes = set()
+        self.ultimos = {}  # canal -> (versão, dados)
+        self.tarefa = None
+
+    async def _versao(self, canal):
+        labels, _ = CANAIS[canal]
+        return versoes.combinar(await versoes.aobter(*labels))
+
+    async def _atualizar(self, canal):
+        """Recalcula o canal se a versão mudou. Devolve o delta (ou None se nada mudou)."""
+        versao = await self._versao(canal)
+        anterior = self.ultimos.get(canal)
+        if anterior and anterior[0] == versao:
+            return None
+        _, coletar = CANAIS[canal]
+        dados = await sync_to_async(coletar)()
+        self.ultimos[canal] = (versao, dados)
+        return diferenca(anterior[1] if anterior else {}, dados)
+
+    async def assinar(self, canais):
+        assinante = Assinante(canais)
+        for canal in assinante.canais:
+            await self._atualizar(canal)
+            # Primeiro envio: snapshot completo do canal
+            assinante.entregar(canal, self.ultimos[canal][1])
+        self.assinantes.add(assinante)
+        self._garantir_vigia()
+        return assinante
+
+    def cancelar(self, assinante):
+        self.assinantes.discard(assinante)
+
+    def _garantir_vigia(self):
+        loop = asyncio.get_running_loop()
+        if self.tarefa is None or self.tarefa.done() or self.tarefa.get_loop() is not loop:
+            self.tarefa = loop.create_task(self._vigiar())
+
+    async def _vigiar(self):
+        while self.assinantes:
+            await asyncio.sleep(intervalo())
+            canais = set().union(*(a.canais for a in self.assinantes))
+            for canal in canais:
+                delta = await self._atualizar(canal)
+                if not delta:
+                    continue
+                for assinante in list(self.assinantes):
+                    if canal in assinante.canais:
+                        assinante.entregar(canal, delta)
+
+
+difusor = Difusor()
+
+
+def formatar(evento, dados):
+    return f"event: {evento}\ndata: {json.dumps(dados)}\n\n"
+
+
+async def snapshot(canais):
+    """Dados completos dos canais, {canal: dados}: o polling de quem não segura o stream."""
+    return {canal: await sync_to_async(CANAIS[canal][1])() for canal in canais}
+
+
+async def stream(canais):
+    """Gerador assíncrono usado pelo StreamingHttpResponse da view de eventos."""
+    assinante = await difusor.assinar(canais)
+    keepalive = getattr(settings, 'EVENTOS_KEEPALIVE', 20)
+    try:
+        yield f"retry: {int(intervalo() * 3000)}\n\n"
+        while True:
+            pendente = await assinante.proximo(keepalive)
+            if pendente is None:
+                # Comentário SSE: mantém a conexão viva em proxies e balanceadores
+                yield ": keepalive\n\n"
+                continue
+            for canal, delta in pendente.items():
+                yield formatar(canal, delta)
+    finally:
+        difusor.cancelar(assinante)
@@ -0,0 +1,384 @@
+"""
+Importação em massa (CSV ou XLSX) de funcionários, dispositivos e equipamentos auxiliares.
+
+As linhas são lidas em streaming e processadas em lotes. Emails e códigos que
+já existem são carregados uma única vez num set em memória, então validar uma
+linha não custa query nenhuma; cada lote vira um bulk_create (mais o histórico
+"CONTRATADO", o índice de busca e os contadores do dashboard, também em lote).
+
+Usado pelo comando `python manage.py importar_dados` e pela tela de importação.
+
+Colunas esperadas (o cabeçalho é obrigatório; maiúsculas/acentos não importam):
+    funcionarios:  nome, email, unidade_trabalho (opcional), codigo_dispositivo (opcional, entrega um dispositivo disponível)
+    dispositivos:  codigo, tipo_dispositivo, email_funcionario (opcional)
+    equipamentos:  nome, tipo_equipamento_aux, codigo_dispositivo (opcional), email_funcionario (opcional)
+                   (sem dispositivo nem funcionário, a linha só soma uma unidade no lote do estoque)
+"""
+import csv
+import io
+from collections import Counter
+from functools import lru_cache
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import busca, versoes
+from .models import Versionado
+
+TAMANHO_LOTE = 1000
+
+
+class ErroLinha(Exception):
+    pass
+
+
+class Relatorio:
+    def __init__(self):
+        self.lidas = 0
+        self.inseridas = 0
+        self.erros = []  # (número da linha, mensagem)
+
+    def erro(self, numero, mensagem):
+        self.erros.append((numero, mensagem))
+
+    def como_csv(self):
+        saida = io.StringIO()
+        writer = csv.writer(saida, delimiter=';')
+        writer.writerow(['linha', 'erro'])
+        writer.writerows(self.erros)
+        return saida.getvalue()
+
+
+# ---------------------
+# LEITURA
+# ---------------------
+
+def _chave_coluna(nome):
+    return busca.normalizar(str(nome or '')).replace(' ', '_')
+
+
+def ler_linhas(arquivo, nome_arquivo=''):
+    """Gera (número da linha, dict) sem carregar o arquivo inteiro. Aceita .csv e .xlsx."""
+    if nome_arquivo.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        planilha = load_workbook(arquivo, read_only=True, data_only=True).active
+        linhas = planilha.iter_rows(values_only=True)
+    else:
+        texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+        amostra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+        except csv.Error:
+            dialeto = csv.excel
+        linhas = csv.reader(texto, dialeto)
+
+    cabecalho = None
+    for numero, valores in enumerate(linhas, start=1):
+        if cabecalho is None:
+            cabecalho = [_chave_coluna(v) for v in valores]
+            continue
+        if not any(v not in (None, '') for v in valores):
+            continue
+        yield numero, {col: ('' if v is None else str(v)).strip() for col, v in zip(cabecalho, valores)}
+
+
+@lru_cache(maxsize=None)
+def _opcoes(choices):
+    mapa = {}
+    for codigo, rotulo in choices:
+        mapa[busca.normalizar(codigo)] = codigo
+        mapa[busca.normalizar(rotulo)] = codigo
+    return mapa
+
+
+def _choice(valor, choices, campo):
+    """Aceita tanto o código ('NAVEGANTES_CD1') quanto o rótulo ('Navegantes CD01')."""
+    codigo = _opcoes(tuple(choices)).get(busca.normalizar(valor))
+    if codigo is None:
+        raise ErroLinha(f"{campo} inválido: '{valor}'")
+    return codigo
+
+
+# ---------------------
+# IMPORTADORES
+# ---------------------
+
+class Importador:
+    """Base: subclasses implementam carregar_existentes(), validar() e gravar()."""
+    obrigatorias = ()
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE):
+        self.tamanho_lote = tamanho_lote
+        self.relatorio = Relatorio()
+
+    def carregar_existentes(self):
+        pass
+
+    def validar(self, dados):
+        raise NotImplementedError
+
+    def gravar(self, objetos):
+        raise NotImplementedError
+
+    def executar(self, linhas):
+        self.carregar_existentes()
+        lote = []
+        for numero, dados in linhas:
+            self.relatorio.lidas += 1
+            try:
+                faltando = [c for c in self.obrigatorias if not dados.get(c)]
+                if faltando:
+                    raise ErroLinha(f"coluna(s) obrigatória(s) vazia(s): {', '.join(faltando)}")
+                lote.append((numero, self.validar(dados)))
+            except ErroLinha as exc:
+                self.relatorio.erro(numero, str(exc))
+                continue
+            if len(lote) >= self.tamanho_lote:
+                self._gravar_lote(lote)
+                lote = []
+        if lote:
+            self._gravar_lote(lote)
+        return self.relatorio
+
+    def _gravar_lote(self, lote):
+        """
+        Cada lote na sua transação (um savepoint, se já houver uma aberta). Um erro
+        do banco (unique violado por um insert concorrente, deadlock, conexão
+        perdida...) desfaz só aquele lote: as linhas dele vão para o relatório e a
+        importação segue com os próximos.
+        """
+        try:
+            with transaction.atomic():
+                self.gravar([objeto for _, objeto in lote])
+        except DatabaseError as exc:
+            for numero, _ in lote:
+                self.relatorio.erro(numero, f"não gravada, o lote inteiro foi desfeito: {exc}")
+            return
+        self.relatorio.inseridas += len(lote)
+
+
+class ImportadorFuncionarios(Importador):
+    obrigatorias = ('nome', 'email')
+
+    def carregar_existentes(self):
+        from dispositivos.models import Dispositivo
+        from funcionarios.models import Funcionario
+
+        self.emails = {e.lower() for e in Funcionario.objects.values_list('email', flat=True).iterator()}
+        # Só dispositivos livres podem ser entregues na admissão
+        self.disponiveis = {
+            codigo.lower(): (pk, tipo)
+            for codigo, pk, tipo in Dispositivo.objects.filter(status='DISPONIVEL', funcionario__isnull=True)
+            .values_list('codigo', 'id', 'tipo_dispositivo').iterator()
+        }
+        self.entregas = {}  # email -> (id do dispositivo, tipo)
+
+    def validar(self, dados):
+        from funcionarios.models import Funcionario
+
+        email = dados['email']
+        if '@' not in email:
+            raise ErroLinha(f"email inválido: '{email}'")
+        if email.lower() in self.emails:
+            raise ErroLinha(f"já existe um funcionário com o email {email}")
+
+        funcionario = Funcionario(nome=dados['nome'], email=email, status='ATIVO')
+        if dados.get('unidade_trabalho'):
+            funcionario.unidade_trabalho = _choice(dados['unidade_trabalho'], Funcionario.UNIDADE_CHOICES, 'unidade_trabalho')
+
+        codigo = (dados.get('codigo_dispositivo') or '').lower()
+        if codigo:
+            if codigo not in self.disponiveis:
+                raise ErroLinha(f"dispositivo não encontrado ou indisponível: {dados['codigo_dispositivo']}")
+            self.entregas[email] = self.disponiveis.pop(codigo)
+
+        # Reserva o email já na validação: duplicados dentro do próprio arquivo também são barrados
+        self.emails.add(email.lower())
+        return funcionario
+
+    def gravar(self, objetos):
+        from funcionarios.models import Funcionario, HistoricoFuncionario
+
+        Funcionario.objects.bulk_create(objetos)
+        # O MySQL não devolve os ids do bulk_create: relê pelo email (único)
+        criados = list(Funcionario.objects.filter(email__in=[f.email for f in objetos]).only('id', 'nome', 'email'))
+        agora = timezone.now()
+        HistoricoFuncionario.objects.bulk_create([
+            HistoricoFuncionario(funcionario=f, acao='CONTRATADO', data=agora, descricao="Admitido.")
+            for f in criados
+        ])
+        self._entregar_dispositivos(criados)
+        busca.indexar_lote('FUNCIONARIO', criados, novos=True)
+        versoes.invalidar('funcionarios.Funcionario', 'funcionarios.HistoricoFuncionario')
+
+    def _entregar_dispositivos(self, criados):
+        """Um único UPDATE com CASE para todos os dispositivos entregues no lote."""
+        from dispositivos.models import ContadorDispositivo, Dispositivo
+        from funcionarios.models import AtribuicaoAtivo
+
+        entregas, tipos = {}, Counter()
+        for funcionario in criados:
+            if funcionario.email in self.entregas:
+                dispositivo_id, tipo = self.entregas.pop(funcionario.email)
+                entregas[dispositivo_id] = funcionario.pk
+                tipos[tipo] += 1
+        if not entregas:
+            return
+
+        Dispositivo.objects.filter(id__in=entregas).update(
+            funcionario_id=Case(*[When(id=d, then=Value(f)) for d, f in entregas.items()]),
+            status='ATIVO',
+            **Versionado.alteracao(),
+        )
+        # Eram DISPONIVEL (sem dono): só há atribuições a abrir
+        AtribuicaoAtivo.abrir_varios('DISPOSITIVO', [
+            (d, codigo, entregas[d])
+            for d, codigo in Dispositivo.objects.filter(id__in=entregas).values_list('id', 'codigo')
+        ])
+        deltas = {}
+        for tipo, qtd in tipos.items():
+            deltas[(tipo, 'DISPONIVEL')] = -qtd
+            deltas[(tipo, 'ATIVO')] = qtd
+        ContadorDispositivo.ajustar_varios(deltas)
+        versoes.invalidar('dispositivos.Dispositivo')
+
+
+class ImportadorDispositivos(Importador):
+    obrigatorias = ('codigo', 'tipo_dispositivo')
+
+    def carregar_existentes(self):
+        from dispositivos.models import Dispositivo
+        from funcionarios.models import Funcionario
+
+        self.codigos = {c.lower() for c in Dispositivo.objects.values_list('codigo', flat=True).iterator()}
+        self.funcionarios = {
+            email.lower(): pk
+            for email, pk in Funcionario.objects.filter(status='ATIVO').values_list('email', 'id').iterator()
+        }
+
+    def validar(self, dados):
+        from dispositivos.models import Dispositivo, TIPO_DISPOSITIVO_CHOICES
+
+        codigo = dados['codigo']
+        if codigo.lower() in self.codigos:
+            raise ErroLinha(f"já existe um dispositivo com o código {codigo}")
+        tipo = _choice(dados['tipo_dispositivo'], TIPO_DISPOSITIVO_CHOICES, 'tipo_dispositivo')
+
+        funcionario_id = None
+        email = (dados.get('email_funcionario') or '').lower()
+        if email:
+            funcionario_id = self.funcionarios.get(email)
+            if funcionario_id is None:
+                raise ErroLinha(f"funcionário ativo não encontrado: {email}")
+
+        self.codigos.add(codigo.lower())
+        return Dispositivo(
+            codigo=codigo,
+            tipo_dispositivo=tipo,
+            funcionario_id=funcionario_id,
+            status='ATIVO' if funcionario_id else 'DISPONIVEL',
+        )
+
+    def gravar(self, objetos):
+        from dispositivos.models import ContadorDispositivo, Dispositivo
+        from funcionarios.models import AtribuicaoAtivo
+
+        Dispositivo.objects.bulk_create(objetos)
+        ContadorDispositivo.ajustar_varios(Counter((d.tipo_dispositivo, d.status) for d in objetos))
+        criados = list(
+            Dispositivo.objects.filter(codigo__in=[d.codigo for d in objetos]).only('id', 'codigo', 'funcionario_id')
+        )
+        busca.indexar_lote('DISPOSITIVO', criados, novos=True)
+        AtribuicaoAtivo.abrir_varios('DISPOSITIVO', [(d.pk, d.codigo, d.funcionario_id) for d in criados])
+        versoes.invalidar('dispositivos.Dispositivo')
+
+
+class ImportadorEquipamentos(Importador):
+    obrigatorias = ('nome', 'tipo_equipamento_aux')
+
+    def carregar_existentes(self):
+        from dispositivos.models import Dispositivo
+        from funcionarios.models import Funcionario
+
+        self.dispositivos = {
+            codigo.lower(): (pk, funcionario_id)
+            for codigo, pk, funcionario_id in Dispositivo.objects.values_list('codigo', 'id', 'funcionario_id').iterator()
+        }
+        self.funcionarios = {
+            email.lower(): pk
+            for email, pk in Funcionario.objects.filter(status='ATIVO').values_list('email', 'id').iterator()
+        }
+
+    def validar(self, dados):
+        from equipamentos.models import EquipamentoAuxiliar, TIPO_EQUIPAMENTO_AUX_CHOICES
+
+        tipo = _choice(dados['tipo_equipamento_aux'], TIPO_EQUIPAMENTO_AUX_CHOICES, 'tipo_equipamento_aux')
+
+        dispositivo_id = funcionario_id = None
+        codigo = (dados.get('codigo_dispositivo') or '').lower()
+        if codigo:
+            if codigo not in self.dispositivos:
+                raise ErroLinha(f"dispositivo não encontrado: {dados['codigo_dispositivo']}")
+            # Como no vínculo pela tela: o item acompanha o dono do dispositivo
+            dispositivo_id, funcionario_id = self.dispositivos[codigo]
+
+        email = (dados.get('email_funcionario') or '').lower()
+        if email:
+            funcionario_id = self.funcionarios.get(email)
+            if funcionario_id is None:
+                raise ErroLinha(f"funcionário ativo não encontrado: {email}")
+
+        return EquipamentoAuxiliar(
+            nome=dados['nome'],
+            tipo_equipamento_aux=tipo,
+            dispositivo_id=dispositivo_id,
+            funcionario_id=funcionario_id,
+            status='ATIVO' if (dispositivo_id or funcionario_id) else 'DISPONIVEL',
+        )
+
+    def gravar(self, objetos):
+        from equipamentos.models import EquipamentoAuxiliar, LoteEstoque
+        from funcionarios.models import AtribuicaoAtivo
+
+        # Itens sem dono só somam no lote do modelo (ver equipamentos.LoteEstoque)
+        soltos = Counter((obj.tipo_equipamento_aux, obj.nome) for obj in objetos if obj.status == 'DISPONIVEL')
+        LoteEstoque.ajustar_varios({chave: (qtd, 0) for chave, qtd in soltos.items()})
+        objetos = [obj for obj in objetos if obj.status != 'DISPONIVEL']
+        if not objetos:
+            return
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            # PostgreSQL, SQLite, MariaDB: o bulk_create já preenche os ids
+            criados = EquipamentoAuxiliar.objects.bulk_create(objetos)
+        else:
+            # MySQL não devolve os ids e nomes se repetem. Só "id maior que o último" pegaria
+            # inserts de outras requisições já commitados (READ COMMITTED), então o lote
+            # também é marcado pelo atualizado_em: o mesmo instante, até o microssegundo,
+            # em todos os itens dele
+            marca = timezone.now()
+            ultimo_id = EquipamentoAuxiliar.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            for obj in objetos:
+                obj.atualizado_em = marca
+            EquipamentoAuxiliar.objects.bulk_create(objetos)
+            criados = list(
+                EquipamentoAuxiliar.objects.filter(id__gt=ultimo_id, atualizado_em=marca)
+                .only('id', 'nome', 'funcionario_id')
+            )
+        busca.indexar_lote('EQUIPAMENTO', criados, novos=True)
+        AtribuicaoAtivo.abrir_varios('EQUIPAMENTO', [(e.pk, e.nome, e.funcionario_id) for e in criados])
+        versoes.invalidar('equipamentos.EquipamentoAuxiliar')
+
+
+IMPORTADORES = {
+    'funcionarios': ImportadorFuncionarios,
+    'dispositivos': ImportadorDispositivos,
+    'equipamentos': ImportadorEquipamentos,
+}
+
+
+def importar(tipo, arquivo, nome_arquivo='', tamanho_lote=TAMANHO_LOTE):
+    importador = IMPORTADORES[tipo](tamanho_lote=tamanho_lote)
+    return importador.executar(ler_linhas(arquivo, nome_arquivo))
@@ -0,0 +1,40 @@
+import os
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.estaticos import VENDOR
+
+
+class Command(BaseCommand):
+    help = (
+        "Baixa para assets/vendor/ as bibliotecas de front-end listadas em core/estaticos.py "
+        "(só as que ainda não existem). Rode uma vez, numa máquina com internet, e commite os arquivos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forcar', action='store_true', help="Baixa de novo mesmo os que já existem.")
+
+    def handle(self, *args, **options):
+        raiz = os.path.join(settings.BASE_DIR, 'assets')
+        baixados, falhas = 0, []
+        for destino, origem in VENDOR:
+            caminho = os.path.join(raiz, destino)
+            if os.path.exists(caminho) and not options['forcar']:
+                continue
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            try:
+                with urllib.request.urlopen(origem, timeout=30) as resposta:
+                    dados = resposta.read()
+            except OSError as exc:
+                falhas.append(f"{origem}: {exc}")
+                continue
+            with open(caminho, 'wb') as f:
+                f.write(dados)
+            baixados += 1
+            self.stdout.write(f"{destino} ({len(dados)} bytes)")
+
+        if falhas:
+            raise CommandError("Falha ao baixar:\n" + "\n".join(falhas))
+        self.stdout.write(self.style.SUCCESS(f"{baixados} arquivo(s) baixado(s); assets/vendor/ completo."))
@@ -0,0 +1,148 @@
+import json
+import platform
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede todas as rotas do projeto (p50/p95, queries e tempo de SQL) num banco de teste "
+        "populado na escala escolhida. Grava JSON e falha se algum orçamento de queries estourar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=list(benchmark.ESCALAS), default='10k',
+                            help="Quantidade de dispositivos gerados (10k, 100k ou 1m).")
+        parser.add_argument('--dispositivos', type=int, help="Quantidade exata de dispositivos (sobrepõe --escala).")
+        parser.add_argument('--repeticoes', type=int, default=20)
+        parser.add_argument('--aquecimento', type=int, default=2)
+        parser.add_argument('--rota', action='append', help="Mede só os cenários desta rota (pode repetir).")
+        parser.add_argument('--saida', default='benchmark.json', help="Arquivo JSON com os resultados.")
+        parser.add_argument('--comparar', help="JSON de uma execução anterior para mostrar a diferença.")
+        parser.add_argument('--tolerancia', type=float,
+                            help="Com --comparar: falha se o p95 de algum cenário piorar mais que X%%.")
+        parser.add_argument('--compressao', action='store_true',
+                            help="Mostra também bytes economizados e CPU da compressão (brotli/gzip) por cenário.")
+        parser.add_argument('--manter-banco', action='store_true',
+                            help="Reaproveita o banco de teste (e os dados) entre execuções.")
+
+    def handle(self, *args, **options):
+        faltando = benchmark.rotas_sem_cenario()
+        if faltando:
+            raise CommandError(f"Rotas sem cenário em core/benchmark.py: {', '.join(faltando)}")
+
+        qtd = options['dispositivos'] or benchmark.ESCALAS[options['escala']]
+        setup_test_environment()
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['manter_banco'])
+        try:
+            from dispositivos.models import Dispositivo
+
+            if Dispositivo.objects.count() < qtd:
+                self.stdout.write(f"Populando o banco de teste com {qtd} dispositivos...")
+                benchmark.popular(qtd, saida=self)
+            resultado = self._rodar(qtd, options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0, keepdb=options['manter_banco'])
+            teardown_test_environment()
+
+        with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        self.stdout.write(f"Resultados gravados em {options['saida']}.")
+
+        falhas = resultado['falhas']
+        if options['comparar']:
+            falhas += self._comparar(resultado, options['comparar'], options['tolerancia'])
+        if falhas:
+            raise CommandError("\n".join(falhas))
+        self.stdout.write(self.style.SUCCESS("Todos os cenários dentro do orçamento."))
+
+    def write(self, msg):
+        # Permite passar o próprio comando como `saida` para benchmark.popular()
+        self.stdout.write(msg)
+
+    def _rodar(self, qtd, options):
+        usuario, _ = get_user_model().objects.get_or_create(
+            username='benchmark', defaults={'is_staff': True, 'is_superuser': True}
+        )
+        client = Client()
+        client.force_login(usuario)
+        fabrica = benchmark.Fabrica()
+        base = benchmark._base()
+
+        cenarios = [c for c in benchmark.CENARIOS if not options['rota'] or c.rota in options['rota']]
+        resultados, falhas = {}, []
+        self.stdout.write(f"{'cenário':<48} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'sql ms':>8}")
+        for cenario in cenarios:
+            try:
+                dados = benchmark.medir(client, usuario, cenario, fabrica, base,
+                                        options['repeticoes'], options['aquecimento'])
+            except Exception as exc:
+                falhas.append(f"{cenario.nome}: erro na requisição ({exc!r})")
+                self.stdout.write(self.style.ERROR(f"{cenario.nome:<48} ERRO {exc!r}"))
+                continue
+
+            orcamento = benchmark.ORCAMENTOS.get(cenario.nome)
+            dados['orcamento_queries'] = orcamento
+            estilo = self.style.SUCCESS
+            if orcamento is not None and dados['queries_max'] > orcamento:
+                falhas.append(f"{cenario.nome}: {dados['queries_max']} queries (orçamento {orcamento})")
+                estilo = self.style.ERROR
+            if any(s >= 500 for s in dados['status']):
+                falhas.append(f"{cenario.nome}: status {dados['status']}")
+                estilo = self.style.ERROR
+            resultados[cenario.nome] = dados
+            self.stdout.write(estilo(
+                f"{cenario.nome:<48} {dados['p50_ms']:>9} {dados['p95_ms']:>9} "
+                f"{dados['queries_max']:>8} {dados['sql_p50_ms']:>8}"
+            ))
+
+        if options['compressao']:
+            self._mostrar_compressao(resultados)
+
+        return {
+            'meta': {
+                'data': timezone.now().isoformat(),
+                'dispositivos': qtd,
+                'banco': connection.vendor,
+                'repeticoes': options['repeticoes'],
+                'python': sys.version.split()[0],
+                'maquina': platform.node(),
+            },
+            'resultados': resultados,
+            'falhas': falhas,
+        }
+
+    def _mostrar_compressao(self, resultados):
+        self.stdout.write(f"\n{'compressão':<48} {'bytes':>9} {'codif.':>7} {'comprimido':>10} {'economia':>9} {'cpu ms':>8}")
+        for nome, dados in resultados.items():
+            for codificacao, medida in (dados['compressao'] or {}).items():
+                economia = 1 - medida['bytes'] / dados['bytes'] if dados['bytes'] else 0
+                self.stdout.write(
+                    f"{nome:<48} {dados['bytes']:>9} {codificacao:>7} {medida['bytes']:>10} "
+                    f"{economia:>8.1%} {medida['cpu_ms']:>8}"
+                )
+
+    def _comparar(self, atual, caminho, tolerancia):
+        with open(caminho, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)['resultados']
+
+        falhas = []
+        self.stdout.write(f"\nComparação com {caminho}:")
+        for nome, dados in atual['resultados'].items():
+            if nome not in anterior or not anterior[nome]['p95_ms']:
+                continue
+            variacao = (dados['p95_ms'] - anterior[nome]['p95_ms']) / anterior[nome]['p95_ms'] * 100
+            queries = dados['queries_max'] - anterior[nome]['queries_max']
+            self.stdout.write(f"  {nome:<48} p95 {variacao:+7.1f}%   queries {queries:+d}")
+            if tolerancia is not None and variacao > tolerancia:
+                falhas.append(f"{nome}: p95 piorou {variacao:.1f}% (tolerância {tolerancia}%)")
+        return falhas
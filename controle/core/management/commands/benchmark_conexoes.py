@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import benchmark
+from core.db import pool as pools
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo de conexão por requisição no MySQL com e sem o pool (core/db/pool.py). "
+        "Cada requisição simulada faz o que o Django faz: conecta, roda uma query curta e fecha. "
+        "Rode contra o banco de produção (ou um na mesma zona/rede) para ver o handshake real."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Alias em DATABASES.")
+        parser.add_argument('--requisicoes', type=int, default=200, help="Requisições por modo.")
+        parser.add_argument('--threads', type=int, default=1,
+                            help="Requisições simultâneas (acima do DB_POOL_MAX aparecem as esperas).")
+        parser.add_argument('--query', default='SELECT 1', help="Query de cada requisição.")
+        parser.add_argument('--saida', help="Grava os resultados neste JSON.")
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections.settings:
+            raise CommandError(f"Alias '{alias}' não está em DATABASES.")
+        settings_dict = connections.settings[alias]
+        if settings_dict['ENGINE'] != 'core.db.mysql':
+            raise CommandError(f"O alias '{alias}' usa {settings_dict['ENGINE']}, não o backend com pool (core.db.mysql).")
+        if settings_dict.get('CONN_MAX_AGE'):
+            raise CommandError("Com CONN_MAX_AGE > 0 o Django não fecha a conexão por requisição; rode com CONN_MAX_AGE = 0.")
+
+        self.alias, self.query = alias, options['query']
+        opcoes = settings_dict.setdefault('POOL', {})
+        maximo = int(opcoes.get('MAX', 10))
+        connections[alias].close()
+
+        resultados = {}
+        self.stdout.write(f"{'modo':<10} {'conectar p50':>12} {'p95':>8} {'requisição p50':>15} {'p95':>8} {'req/s':>8}")
+        for modo, max_pool in (('sem pool', 0), ('com pool', maximo or 10)):
+            opcoes['MAX'] = max_pool
+            if max_pool:
+                self._aquecer(min(options['threads'], max_pool))
+            dados = self._rodada(options['requisicoes'], options['threads'])
+            if max_pool:
+                dados['pool'] = pools.do_alias(alias, None, opcoes).estatisticas()
+            resultados[modo] = dados
+            self.stdout.write(
+                f"{modo:<10} {dados['conectar_p50_ms']:>12} {dados['conectar_p95_ms']:>8} "
+                f"{dados['requisicao_p50_ms']:>15} {dados['requisicao_p95_ms']:>8} {dados['req_s']:>8}"
+            )
+        opcoes['MAX'] = maximo
+
+        economia = round(resultados['sem pool']['requisicao_p50_ms'] - resultados['com pool']['requisicao_p50_ms'], 2)
+        resultados['economia_p50_ms_por_requisicao'] = economia
+        estatisticas = resultados['com pool']['pool']
+        self.stdout.write(
+            f"Economia por requisição (p50): {economia} ms. Pool: {estatisticas['criadas']} criadas, "
+            f"{estatisticas['reaproveitadas']} reaproveitadas, {estatisticas['esperas']} esperas, "
+            f"{estatisticas['esgotamentos']} esgotamentos."
+        )
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultados gravados em {options['saida']}.")
+
+    def _requisicao(self):
+        conexao = connections[self.alias]
+        inicio = time.perf_counter()
+        conexao.ensure_connection()
+        conectado = time.perf_counter()
+        with conexao.cursor() as cursor:
+            cursor.execute(self.query)
+            cursor.fetchall()
+        # Fim da requisição: o Django fecha (com o pool, devolve)
+        conexao.close()
+        fim = time.perf_counter()
+        return (conectado - inicio) * 1000, (fim - inicio) * 1000
+
+    def _aquecer(self, threads):
+        # Abre as conexões do pool antes de medir, como num processo que já atendeu tráfego
+        barreira = threading.Barrier(threads)
+
+        def abrir():
+            connections[self.alias].ensure_connection()
+            barreira.wait()
+            connections[self.alias].close()
+
+        self._em_threads(threads, [abrir] * threads)
+
+    def _rodada(self, total, threads):
+        tempos, trava = [], threading.Lock()
+        proxima = iter(range(total))
+
+        def cliente():
+            while True:
+                with trava:
+                    if next(proxima, None) is None:
+                        return
+                medida = self._requisicao()
+                with trava:
+                    tempos.append(medida)
+
+        inicio = time.perf_counter()
+        self._em_threads(threads, [cliente] * threads)
+        duracao = time.perf_counter() - inicio
+        conectar = sorted(t[0] for t in tempos)
+        requisicao = sorted(t[1] for t in tempos)
+        return {
+            'requisicoes': len(tempos),
+            'conectar_p50_ms': round(benchmark.percentil(conectar, 50), 2),
+            'conectar_p95_ms': round(benchmark.percentil(conectar, 95), 2),
+            'requisicao_p50_ms': round(benchmark.percentil(requisicao, 50), 2),
+            'requisicao_p95_ms': round(benchmark.percentil(requisicao, 95), 2),
+            'req_s': round(len(tempos) / duracao, 1) if duracao else 0,
+        }
+
+    def _em_threads(self, threads, funcoes):
+        def rodar(funcao):
+            try:
+                funcao()
+            finally:
+                # Cada thread tem a sua conexão no Django; não deixa nenhuma fora do pool
+                connections.close_all()
+
+        if threads == 1:
+            return rodar(funcoes[0])
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for futuro in [executor.submit(rodar, funcao) for funcao in funcoes]:
+                futuro.result()
@@ -0,0 +1,262 @@
+import asyncio
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from core import benchmark
+
+# As APIs chamadas a cada poucos segundos pelas telas (views async)
+ROTAS_PADRAO = [
+    'dispositivos:api_dados_dashboard',
+    'dispositivos:editar_dispositivo',
+    'funcionarios:get_funcionario_json',
+    'funcionarios:historico_funcionario',
+]
+
+
+class _Pico:
+    """Contador de requisições em andamento que guarda o máximo atingido."""
+
+    def __init__(self):
+        self.atual = 0
+        self.maximo = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.atual += 1
+            self.maximo = max(self.maximo, self.atual)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.atual -= 1
+
+
+class _AmostradorThreads(threading.Thread):
+    """Pico de threads do processo durante a rodada (o worker ASGI cria threads para o ORM)."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.base = threading.active_count()
+        self.maximo = self.base
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.wait(0.005):
+            self.maximo = max(self.maximo, threading.active_count())
+
+    def resultado(self):
+        self.parar.set()
+        self.join()
+        return max(self.maximo - self.base - 1, 0)  # sem contar o próprio amostrador
+
+
+def _latencia_sql(segundos):
+    """execute_wrapper que simula a ida e volta até o MySQL em toda query."""
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(segundos)
+        return execute(sql, params, many, context)
+
+    def instalar(sender, connection, **kwargs):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    return instalar
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga em processo das APIs async: para cada nível de concorrência, mede "
+        "um worker ASGI (controle.asgi) e um worker WSGI com --threads threads (o caminho síncrono, "
+        "como um gunicorn gthread). Usa o banco configurado, só com GETs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rota', action='append', help="Rota a chamar (pode repetir). Padrão: as 4 APIs async.")
+        parser.add_argument('--concorrencia', default='1,10,50,200',
+                            help="Níveis de clientes simultâneos, separados por vírgula.")
+        parser.add_argument('--requisicoes', type=int, default=400, help="Requisições por nível e por modo.")
+        parser.add_argument('--threads', type=int, default=4, help="Threads do worker WSGI de comparação.")
+        parser.add_argument('--latencia-sql', type=float, default=2.0,
+                            help="Milissegundos somados a cada query, simulando a rede até o banco (0 desliga).")
+        parser.add_argument('--usuario', help="Usuário logado nas requisições (padrão: o primeiro staff ativo).")
+        parser.add_argument('--host', default='localhost', help="Header Host (precisa estar no ALLOWED_HOSTS).")
+        parser.add_argument('--saida', help="Grava os resultados neste JSON.")
+
+    def handle(self, *args, **options):
+        usuarios = get_user_model().objects.filter(is_active=True)
+        if options['usuario']:
+            usuario = usuarios.filter(username=options['usuario']).first()
+        else:
+            usuario = usuarios.filter(is_staff=True).order_by('pk').first()
+        if usuario is None:
+            raise CommandError("Nenhum usuário para logar; informe --usuario.")
+
+        client = Client()
+        client.force_login(usuario)
+        self.cookie = f"sessionid={client.cookies['sessionid'].value}"
+        self.host = options['host']
+
+        base = benchmark._base()
+        kwargs = {
+            'dispositivos:editar_dispositivo': {'id': base['dispositivo']},
+            'funcionarios:get_funcionario_json': {'id': base['funcionario']},
+            'funcionarios:historico_funcionario': {'id': base['funcionario']},
+        }
+        self.urls = [reverse(rota, kwargs=kwargs.get(rota)) for rota in options['rota'] or ROTAS_PADRAO]
+
+        if options['latencia_sql']:
+            instalar = _latencia_sql(options['latencia_sql'] / 1000)
+            connection_created.connect(instalar, weak=False, dispatch_uid='carga_asgi.latencia')
+            for conexao in connections.all():
+                instalar(None, conexao)
+
+        from controle.asgi import application as asgi
+        from controle.wsgi import application as wsgi
+
+        niveis = [int(n) for n in options['concorrencia'].split(',') if n.strip()]
+        resultados = []
+        self.stdout.write(
+            f"{'modo':<18} {'clientes':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'em andamento':>12} {'threads':>8} {'erros':>6}"
+        )
+        for nivel in niveis:
+            for modo, rodar in (('asgi', lambda: self._asgi(asgi, nivel, options['requisicoes'])),
+                                (f"wsgi {options['threads']} threads",
+                                 lambda: self._wsgi(wsgi, nivel, options['requisicoes'], options['threads']))):
+                dados = rodar()
+                dados.update({'modo': modo, 'clientes': nivel})
+                resultados.append(dados)
+                self.stdout.write(
+                    f"{modo:<18} {nivel:>8} {dados['req_s']:>8} {dados['p50_ms']:>8} {dados['p95_ms']:>8} "
+                    f"{dados['pico_em_andamento']:>12} {dados['pico_threads']:>8} {dados['erros']:>6}"
+                )
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump({'urls': self.urls, 'latencia_sql_ms': options['latencia_sql'], 'resultados': resultados},
+                          arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultados gravados em {options['saida']}.")
+
+    def _resumo(self, tempos, erros, duracao, pico, threads):
+        tempos.sort()
+        return {
+            'req_s': round(len(tempos) / duracao, 1) if duracao else 0,
+            'p50_ms': round(benchmark.percentil(tempos, 50), 1) if tempos else None,
+            'p95_ms': round(benchmark.percentil(tempos, 95), 1) if tempos else None,
+            'pico_em_andamento': pico,
+            'pico_threads': threads,
+            'erros': erros,
+        }
+
+    # ASGI: todos os clientes são tarefas na mesma event loop, sem threads de cliente
+
+    def _asgi(self, app, clientes, total):
+        return asyncio.run(self._asgi_async(app, clientes, total))
+
+    async def _asgi_async(self, app, clientes, total):
+        pico, tempos, erros = _Pico(), [], [0]
+        proxima = iter(range(total))
+        amostrador = _AmostradorThreads()
+        amostrador.start()
+
+        async def cliente():
+            for i in proxima:
+                inicio = time.perf_counter()
+                with pico:
+                    status = await self._chamar_asgi(app, self.urls[i % len(self.urls)])
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                if status >= 400:
+                    erros[0] += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(clientes)))
+        duracao = time.perf_counter() - inicio
+        return self._resumo(tempos, erros[0], duracao, pico.maximo, amostrador.resultado())
+
+    async def _chamar_asgi(self, app, caminho):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': caminho, 'raw_path': caminho.encode(), 'query_string': b'',
+            'root_path': '', 'client': ('127.0.0.1', 0), 'server': (self.host, 80),
+            'headers': [(b'host', self.host.encode()), (b'cookie', self.cookie.encode())],
+        }
+        corpo_enviado = False
+        status = [0]
+
+        async def receive():
+            nonlocal corpo_enviado
+            if not corpo_enviado:
+                corpo_enviado = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # O cliente não desconecta: o Django cancela esta espera quando a resposta termina
+            await asyncio.Event().wait()
+
+        async def send(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                status[0] = mensagem['status']
+
+        await app(scope, receive, send)
+        return status[0]
+
+    # WSGI: cada cliente é uma thread; o semáforo limita às --threads do worker
+
+    def _wsgi(self, app, clientes, total, threads):
+        pico, tempos, erros = _Pico(), [], [0]
+        worker = threading.BoundedSemaphore(threads)
+        proxima = iter(range(total))
+        trava = threading.Lock()
+
+        def cliente():
+            while True:
+                with trava:
+                    i = next(proxima, None)
+                if i is None:
+                    return
+                inicio = time.perf_counter()
+                with worker, pico:
+                    status = self._chamar_wsgi(app, self.urls[i % len(self.urls)])
+                with trava:
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                    if status >= 400:
+                        erros[0] += 1
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clientes) as executor:
+            for futuro in [executor.submit(cliente) for _ in range(clientes)]:
+                futuro.result()
+        duracao = time.perf_counter() - inicio
+        return self._resumo(tempos, erros[0], duracao, pico.maximo, threads)
+
+    def _chamar_wsgi(self, app, caminho):
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+            'SERVER_NAME': self.host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host, 'HTTP_COOKIE': self.cookie, 'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(b''),
+            'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status = [0]
+
+        def start_response(linha, headers, exc_info=None):
+            status[0] = int(linha.split()[0])
+
+        resposta = app(environ, start_response)
+        try:
+            for _ in resposta:
+                pass
+        finally:
+            if hasattr(resposta, 'close'):
+                resposta.close()
+        return status[0]
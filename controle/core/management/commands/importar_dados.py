@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import importacao
+
+
+class Command(BaseCommand):
+    help = "Importa funcionários, dispositivos ou equipamentos de um arquivo CSV/XLSX, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=list(importacao.IMPORTADORES))
+        parser.add_argument('arquivo', help="Caminho do .csv ou .xlsx (com cabeçalho).")
+        parser.add_argument('--lote', type=int, default=importacao.TAMANHO_LOTE, help="Linhas gravadas por bulk_create.")
+        parser.add_argument('--relatorio', help="Grava as linhas com erro neste arquivo CSV.")
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                relatorio = importacao.importar(options['tipo'], arquivo, options['arquivo'], options['lote'])
+        except OSError as exc:
+            raise CommandError(f"Não foi possível abrir o arquivo: {exc}")
+
+        for numero, mensagem in relatorio.erros[:20]:
+            self.stdout.write(self.style.WARNING(f"Linha {numero}: {mensagem}"))
+        if len(relatorio.erros) > 20:
+            self.stdout.write(self.style.WARNING(f"... e mais {len(relatorio.erros) - 20} erro(s)."))
+
+        if options['relatorio'] and relatorio.erros:
+            with open(options['relatorio'], 'w', encoding='utf-8', newline='') as saida:
+                saida.write(relatorio.como_csv())
+            self.stdout.write(f"Relatório de erros gravado em {options['relatorio']}.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio.inseridas} de {relatorio.lidas} linha(s) importada(s), "
+            f"{len(relatorio.erros)} com erro, em {time.monotonic() - inicio:.1f}s."
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core import busca
+from core.models import IndiceBusca
+
+
+class Command(BaseCommand):
+    help = "Reconstrói do zero o índice de trigramas da busca (dispositivos, funcionários e equipamentos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', choices=list(busca.CAMPOS), help="Reindexa só um tipo.")
+        parser.add_argument('--lote', type=int, default=2000, help="Objetos lidos por vez.")
+
+    def handle(self, *args, **options):
+        tipos = [options['tipo']] if options['tipo'] else list(busca.CAMPOS)
+        for tipo in tipos:
+            IndiceBusca.objects.filter(tipo=tipo).delete()
+            model = busca._model(tipo)
+            campos = ('pk',) + busca.CAMPOS[tipo][1]
+
+            total = 0
+            ultimo = 0
+            while True:
+                objetos = list(model.objects.filter(pk__gt=ultimo).order_by('pk').only(*campos)[:options['lote']])
+                if not objetos:
+                    break
+                busca.indexar_lote(tipo, objetos)
+                total += len(objetos)
+                ultimo = objetos[-1].pk
+
+            self.stdout.write(self.style.SUCCESS(f"{tipo}: {total} objeto(s) indexado(s)."))
@@ -0,0 +1,126 @@
+import json
+import textwrap
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from core import busca
+from core.models import IndiceBusca
+from dispositivos.models import Dispositivo, ManutencaoDispositivo
+from equipamentos.models import EquipamentoAuxiliar, LoteEstoque
+from funcionarios.models import Funcionario, HistoricoFuncionario
+
+
+def consultas():
+    """A consulta principal de cada tela, no mesmo formato que a view monta."""
+    return [
+        ("dispositivos: lista", lambda: Dispositivo.objects.select_related('funcionario').order_by('codigo')[:21]),
+        ("dispositivos: lista por status",
+         lambda: Dispositivo.objects.select_related('funcionario').filter(status='ATIVO').order_by('codigo')[:21]),
+        ("dispositivos: contagem por tipo e status",
+         lambda: Dispositivo.objects.filter(tipo_dispositivo='NOTEBOOK', status='ATIVO').values('id')),
+        ("dispositivos: manutenção em aberto",
+         lambda: ManutencaoDispositivo.objects.filter(dispositivo_id=1, data_fim__isnull=True)),
+        ("equipamentos: lista por tipo",
+         lambda: EquipamentoAuxiliar.objects.filter(tipo_equipamento_aux='MOUSE').order_by('status', 'nome')),
+        ("equipamentos: dashboard do estoque (em uso)",
+         lambda: EquipamentoAuxiliar.objects.filter(status='ATIVO').order_by().values('tipo_equipamento_aux')
+         .annotate(qtd=Count('id'))),
+        ("equipamentos: lotes do tipo", lambda: LoteEstoque.objects.filter(tipo_equipamento_aux='MOUSE').order_by('nome')),
+        ("equipamentos: itens do dispositivo", lambda: EquipamentoAuxiliar.objects.filter(dispositivo_id=1)),
+        ("equipamentos: itens do funcionário", lambda: EquipamentoAuxiliar.objects.filter(funcionario_id=1)),
+        ("funcionarios: ativos", lambda: Funcionario.objects.filter(status='ATIVO').order_by('nome', 'id')[:26]),
+        ("funcionarios: demitidos", lambda: Funcionario.objects.filter(status='DEMITIDO').order_by('nome', 'id')[:26]),
+        ("funcionarios: autocomplete por nome",
+         lambda: Funcionario.objects.filter(status='ATIVO', nome__istartswith='Ana').order_by('nome', 'id')[:20]),
+        ("funcionarios: autocomplete por email",
+         lambda: Funcionario.objects.filter(status='ATIVO', email__istartswith='ana').order_by('nome', 'id')[:20]),
+        ("funcionarios: histórico", lambda: HistoricoFuncionario.objects.filter(funcionario_id=1)),
+        ("funcionarios: dispositivos do funcionário", lambda: Dispositivo.objects.filter(funcionario_id=1)),
+        # Termos curtos da busca (busca.prefixo e busca.buscar): um range por coluna
+        ("busca: prefixo do nome do funcionário",
+         lambda: Funcionario.objects.filter(nome__istartswith='an').order_by('nome').values('pk')[:10]),
+        ("busca: prefixo do nome do equipamento",
+         lambda: EquipamentoAuxiliar.objects.filter(nome__istartswith='mo').order_by('nome').values('pk')[:10]),
+        # A amostra de cada trigrama (busca._amostrar) é um LIMIT sobre o mesmo prefixo do índice
+        ("busca: amostra de um trigrama",
+         lambda: IndiceBusca.objects.filter(tipo='DISPOSITIVO', trigrama='not').values_list('trigrama', 'objeto_id')
+         [:busca.LIMITE_RARO + 1]),
+        ("busca: conferência dos trigramas comuns",
+         lambda: IndiceBusca.objects.filter(tipo='DISPOSITIVO', trigrama__in=['ote', 'teb'], objeto_id__in=[1, 2, 3])
+         .values('objeto_id').annotate(encontrados=Count('trigrama')).filter(encontrados=2)),
+    ]
+
+
+def _varreduras_sqlite(plano):
+    # "SCAN tabela" sem "USING ... INDEX" é leitura da tabela inteira
+    return [
+        linha.strip() for linha in plano.splitlines()
+        if ' SCAN ' in f' {linha} ' and 'INDEX' not in linha and 'CONSTANT ROW' not in linha
+    ]
+
+
+def _varreduras_mysql(plano, minimo_linhas):
+    encontradas = []
+
+    def percorrer(no):
+        if isinstance(no, dict):
+            if no.get('access_type') == 'ALL' and no.get('rows_examined_per_scan', 0) >= minimo_linhas:
+                encontradas.append(f"{no.get('table_name')} (access_type=ALL, ~{no.get('rows_examined_per_scan')} linhas)")
+            for valor in no.values():
+                percorrer(valor)
+        elif isinstance(no, list):
+            for valor in no:
+                percorrer(valor)
+
+    percorrer(json.loads(plano))
+    return encontradas
+
+
+def _varreduras_postgresql(plano):
+    return [linha.strip() for linha in plano.splitlines() if 'Seq Scan' in linha]
+
+
+class Command(BaseCommand):
+    help = (
+        "Roda EXPLAIN na consulta principal de cada tela e falha se alguma delas "
+        "ler a tabela inteira em vez de usar um índice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minimo-linhas', type=int, default=0,
+            help="(MySQL) Ignora full scan em tabelas com menos linhas estimadas que isso. "
+                 "Em bases quase vazias o otimizador prefere ler a tabela toda.",
+        )
+        parser.add_argument('--plano', action='store_true', help="Mostra o plano completo de cada consulta.")
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ('sqlite', 'mysql', 'postgresql'):
+            raise CommandError(f"Banco '{vendor}' não suportado por esta verificação.")
+
+        falhas = 0
+        for nome, montar in consultas():
+            queryset = montar()
+            if vendor == 'mysql':
+                plano = queryset.explain(format='json')
+                varreduras = _varreduras_mysql(plano, options['minimo_linhas'])
+            else:
+                plano = queryset.explain()
+                varreduras = _varreduras_sqlite(plano) if vendor == 'sqlite' else _varreduras_postgresql(plano)
+
+            if varreduras:
+                falhas += 1
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {nome}"))
+                for varredura in varreduras:
+                    self.stdout.write(f"    {varredura}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok         {nome}"))
+            if options['plano']:
+                self.stdout.write(textwrap.indent(plano, "    "))
+
+        if falhas:
+            raise CommandError(f"{falhas} consulta(s) sem índice.")
+        self.stdout.write(self.style.SUCCESS("Todas as consultas usam índice."))
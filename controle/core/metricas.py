@@ -0,0 +1,378 @@
+"""
+Métricas no formato texto do Prometheus (endpoint /metrics).
+
+Cada processo acumula as métricas em memória (um dict protegido por um único
+lock, sem disputa na prática) e, no máximo a cada METRICAS_INTERVALO segundos,
+grava uma cópia em METRICAS_DIR/metricas-<pid>-<início>.json. O /metrics junta
+os arquivos de todos os processos (workers do gunicorn, por exemplo) sem tocar
+no banco.
+
+O início do processo entra no nome porque o sistema reaproveita pids: um worker
+novo com o pid de um morto grava em outro arquivo, e o do morto não é tomado
+por vivo.
+
+Contadores e histogramas de processos que já morreram continuam somando (um
+contador não pode diminuir); medidores (gauges) só valem para processos vivos.
+Passada a METRICAS_RETENCAO, o arquivo do processo morto é incorporado ao
+acumulado.json e só então apagado.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos, só o da thread
+    fcntl = None
+
+BUCKETS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_QUERIES = (1, 2, 5, 10, 20, 50, 100, 250, 500)
+
+DESCRICOES = {
+    'controle_http_requisicoes_total': ('counter', "Requisições atendidas, por view, método e status."),
+    'controle_http_duracao_segundos': ('histogram', "Latência das requisições, por view."),
+    'controle_http_em_andamento': ('gauge', "Requisições sendo atendidas agora."),
+    'controle_db_queries_por_requisicao': ('histogram', "Queries SQL por requisição, por view."),
+    'controle_db_duracao_segundos': ('histogram', "Tempo de SQL por requisição, por view."),
+    'controle_db_conexoes_abertas': ('gauge', "Conexões com o banco abertas, por alias."),
+    'controle_db_pool_conexoes': ('gauge', "Conexões do pool, por alias e estado (em_uso/ociosas)."),
+    'controle_db_pool_eventos_total': ('counter', "Eventos do pool de conexões, por alias (criadas, reaproveitadas, esperas...)."),
+    'controle_db_pool_espera_segundos': ('histogram', "Tempo esperando uma conexão livre, quando o pool estava cheio."),
+    'controle_cache_operacoes_total': ('counter', "Leituras de cache, por cache e resultado (hit/miss)."),
+    'controle_cache_taxa_acerto': ('gauge', "Fração de leituras do cache que encontraram o valor."),
+    'controle_sse_conexoes': ('gauge', "Conexões abertas no stream de eventos dos dashboards."),
+}
+
+
+def _chave(labels):
+    return json.dumps(sorted(labels.items()), ensure_ascii=False)
+
+
+class Registro:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.contadores = {}
+        self.histogramas = {}
+        self.medidores = {}
+        self.ultima_gravacao = 0.0
+
+    def somar(self, nome, labels, valor=1):
+        chave = _chave(labels)
+        with self.lock:
+            serie = self.contadores.setdefault(nome, {})
+            serie[chave] = serie.get(chave, 0) + valor
+
+    def observar(self, nome, labels, valor, buckets):
+        chave = _chave(labels)
+        # Índice do primeiro bucket que comporta o valor (o último é o +Inf)
+        indice = next((i for i, limite in enumerate(buckets) if valor <= limite), len(buckets))
+        with self.lock:
+            serie = self.histogramas.setdefault(nome, {})
+            dados = serie.get(chave)
+            if dados is None:
+                dados = serie[chave] = {'limites': list(buckets), 'buckets': [0] * (len(buckets) + 1), 'soma': 0, 'total': 0}
+            dados['buckets'][indice] += 1
+            dados['soma'] += valor
+            dados['total'] += 1
+
+    def medir(self, nome, labels, valor):
+        with self.lock:
+            self.medidores.setdefault(nome, {})[_chave(labels)] = valor
+
+    def instantaneo(self):
+        _amostrar_medidores(self)
+        with self.lock:
+            pid, inicio = _identidade()
+            return json.loads(json.dumps({
+                'pid': pid,
+                'inicio': inicio,
+                'contadores': self.contadores,
+                'histogramas': self.histogramas,
+                'medidores': self.medidores,
+            }))
+
+
+registro = Registro()
+
+
+# ---------------------
+# COLETA
+# ---------------------
+
+_conexoes = weakref.WeakSet()
+
+
+def _guardar_conexao(sender, connection, **kwargs):
+    _conexoes.add(connection)
+
+
+connection_created.connect(_guardar_conexao, dispatch_uid='core.metricas.conexoes')
+
+
+def _amostrar_medidores(reg):
+    """Medidores lidos na hora de gravar, em vez de mantidos a cada evento."""
+    abertas = {}
+    for conexao in list(_conexoes):
+        if conexao.connection is not None:
+            abertas[conexao.alias] = abertas.get(conexao.alias, 0) + 1
+    for alias in settings.DATABASES:
+        reg.medir('controle_db_conexoes_abertas', {'alias': alias}, abertas.get(alias, 0))
+
+    from .db import pool
+    for p in pool.todos():
+        estatisticas = p.estatisticas()
+        for estado in ('em_uso', 'ociosas'):
+            reg.medir('controle_db_pool_conexoes', {'alias': p.alias, 'estado': estado}, estatisticas[estado])
+
+    from . import eventos
+    reg.medir('controle_sse_conexoes', {}, len(eventos.difusor.assinantes))
+
+
+def registrar_requisicao(view, metodo, status, duracao, queries=None, tempo_sql=None):
+    registro.somar('controle_http_requisicoes_total', {'view': view, 'metodo': metodo, 'status': str(status)})
+    registro.observar('controle_http_duracao_segundos', {'view': view}, duracao, BUCKETS_DURACAO)
+    if queries is not None:
+        registro.observar('controle_db_queries_por_requisicao', {'view': view}, queries, BUCKETS_QUERIES)
+        registro.observar('controle_db_duracao_segundos', {'view': view}, tempo_sql, BUCKETS_DURACAO)
+    gravar_se_preciso()
+
+
+def registrar_cache(alias, acertou):
+    registro.somar('controle_cache_operacoes_total', {'cache': alias, 'resultado': 'hit' if acertou else 'miss'})
+
+
+def em_andamento(delta):
+    with registro.lock:
+        serie = registro.medidores.setdefault('controle_http_em_andamento', {})
+        chave = _chave({})
+        serie[chave] = serie.get(chave, 0) + delta
+
+
+# ---------------------
+# ARQUIVOS POR PROCESSO
+# ---------------------
+
+def _diretorio():
+    return getattr(settings, 'METRICAS_DIR', os.path.join(settings.BASE_DIR, '.metricas'))
+
+
+def _inicio(pid):
+    """Instante em que o processo começou (em ticks desde o boot), ou None fora do Linux."""
+    try:
+        with open(f'/proc/{pid}/stat', encoding='ascii') as arquivo:
+            # O nome do comando (2º campo) pode ter espaços: conta a partir do último ')'
+            return int(arquivo.read().rpartition(')')[2].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_processo = {}
+
+
+def _identidade():
+    """(pid, início) deste processo; recalculado depois de um fork."""
+    pid = os.getpid()
+    if _processo.get('pid') != pid:
+        _processo.update(pid=pid, inicio=_inicio(pid) or int(time.time()))
+    return _processo['pid'], _processo['inicio']
+
+
+def gravar():
+    diretorio = _diretorio()
+    os.makedirs(diretorio, exist_ok=True)
+    pid, inicio = _identidade()
+    destino = os.path.join(diretorio, f'metricas-{pid}-{inicio}.json')
+    temporario = f'{destino}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(registro.instantaneo(), arquivo)
+    # os.replace é atômico: quem lê nunca vê um arquivo pela metade
+    os.replace(temporario, destino)
+    registro.ultima_gravacao = time.monotonic()
+
+
+def gravar_se_preciso():
+    if time.monotonic() - registro.ultima_gravacao >= getattr(settings, 'METRICAS_INTERVALO', 5):
+        gravar()
+
+
+@atexit.register
+def _gravar_ao_sair():
+    try:
+        if registro.contadores:
+            gravar()
+    except Exception:
+        pass
+
+
+def _vivo(pid, inicio=None):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # Mesmo pid, outro início: o processo do arquivo morreu e o pid foi reaproveitado
+    atual = _inicio(pid)
+    return inicio is None or atual is None or atual == inicio
+
+
+def _somar(contadores, histogramas, processo):
+    for nome, serie in processo['contadores'].items():
+        destino = contadores.setdefault(nome, {})
+        for chave, valor in serie.items():
+            destino[chave] = destino.get(chave, 0) + valor
+    for nome, serie in processo['histogramas'].items():
+        destino = histogramas.setdefault(nome, {})
+        for chave, dados in serie.items():
+            atual = destino.get(chave)
+            if atual is None or atual['limites'] != dados['limites']:
+                destino[chave] = dados
+                continue
+            atual['buckets'] = [a + b for a, b in zip(atual['buckets'], dados['buckets'])]
+            atual['soma'] += dados['soma']
+            atual['total'] += dados['total']
+
+
+def _ler(caminho):
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _incorporar(diretorio, expirados):
+    """
+    Soma os arquivos de processos mortos ao acumulado.json e só depois os apaga.
+
+    Roda sob um lock de arquivo: dois workers servindo o /metrics ao mesmo tempo
+    não incorporam o mesmo arquivo duas vezes. Os nomes já somados ficam
+    registrados no acumulado; se o processo cair entre gravar o acumulado e
+    apagar os arquivos, a próxima passada só termina de apagar.
+    """
+    caminho = os.path.join(diretorio, 'acumulado.json')
+    with open(os.path.join(diretorio, 'acumulado.lock'), 'a') as trava:
+        if fcntl is not None:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+        acumulado = _ler(caminho) or {'contadores': {}, 'histogramas': {}, 'incorporados': []}
+        incorporados = set(acumulado['incorporados'])
+        novos = []
+        for arquivo in expirados:
+            nome = os.path.basename(arquivo)
+            if nome in incorporados:
+                continue
+            dados = _ler(arquivo)
+            if dados is None:
+                continue
+            _somar(acumulado['contadores'], acumulado['histogramas'], dados)
+            novos.append(nome)
+        if novos:
+            # Nomes que já não existem no diretório não precisam mais ser lembrados
+            existentes = set(os.listdir(diretorio))
+            acumulado['incorporados'] = sorted(n for n in incorporados | set(novos) if n in existentes)
+            temporario = f'{caminho}.tmp'
+            with open(temporario, 'w', encoding='utf-8') as saida:
+                json.dump(acumulado, saida)
+            os.replace(temporario, caminho)
+        for arquivo in expirados:
+            try:
+                os.remove(arquivo)
+            except FileNotFoundError:
+                pass
+    return acumulado
+
+
+def _ler_processos():
+    diretorio = _diretorio()
+    retencao = getattr(settings, 'METRICAS_RETENCAO', 24 * 3600)
+    processos, expirados = [], []
+    for caminho in glob.glob(os.path.join(diretorio, 'metricas-*.json')):
+        dados = _ler(caminho)
+        if dados is None:
+            continue
+        vivo = _vivo(dados['pid'], dados.get('inicio'))
+        if not vivo and time.time() - os.path.getmtime(caminho) > retencao:
+            expirados.append(caminho)
+            continue
+        dados['vivo'] = vivo
+        processos.append(dados)
+
+    if expirados:
+        acumulado = _incorporar(diretorio, expirados)
+    else:
+        acumulado = _ler(os.path.join(diretorio, 'acumulado.json'))
+    if acumulado:
+        processos.append({**acumulado, 'medidores': {}, 'vivo': False})
+    return processos
+
+
+def agregar():
+    """Soma as métricas de todos os processos (gravando antes as deste)."""
+    gravar()
+    contadores, histogramas, medidores = {}, {}, {}
+    for processo in _ler_processos():
+        _somar(contadores, histogramas, processo)
+        if processo['vivo']:
+            for nome, serie in processo['medidores'].items():
+                destino = medidores.setdefault(nome, {})
+                for chave, valor in serie.items():
+                    destino[chave] = destino.get(chave, 0) + valor
+
+    # Taxa de acerto do cache, calculada a partir dos contadores já somados
+    por_cache = {}
+    for chave, valor in contadores.get('controle_cache_operacoes_total', {}).items():
+        labels = dict(json.loads(chave))
+        por_cache.setdefault(labels['cache'], {'hit': 0, 'miss': 0})[labels['resultado']] += valor
+    for alias, totais in por_cache.items():
+        total = totais['hit'] + totais['miss']
+        medidores.setdefault('controle_cache_taxa_acerto', {})[_chave({'cache': alias})] = totais['hit'] / total if total else 0
+    return contadores, histogramas, medidores
+
+
+# ---------------------
+# FORMATO TEXTO
+# ---------------------
+
+def _labels(chave, extra=None):
+    pares = json.loads(chave) + (extra or [])
+    if not pares:
+        return ''
+    escapados = []
+    for nome, valor in pares:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escapados.append(f'{nome}="{valor}"')
+    return '{' + ','.join(escapados) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exposicao():
+    contadores, histogramas, medidores = agregar()
+    linhas = []
+    for nome, (tipo, descricao) in DESCRICOES.items():
+        serie = contadores.get(nome) or histogramas.get(nome) or medidores.get(nome)
+        if not serie:
+            continue
+        linhas.append(f'# HELP {nome} {descricao}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        if tipo == 'histogram':
+            for chave, dados in sorted(serie.items()):
+                acumulado = 0
+                for limite, qtd in zip(dados['limites'] + ['+Inf'], dados['buckets']):
+                    acumulado += qtd
+                    linhas.append(f'{nome}_bucket{_labels(chave, [["le", limite]])} {acumulado}')
+                linhas.append(f'{nome}_sum{_labels(chave)} {_numero(dados["soma"])}')
+                linhas.append(f'{nome}_count{_labels(chave)} {dados["total"]}')
+        else:
+            for chave, valor in sorted(serie.items()):
+                linhas.append(f'{nome}{_labels(chave)} {_numero(valor)}')
+    return '\n'.join(linhas) + '\n'
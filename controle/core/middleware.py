@@ -0,0 +1,286 @@
+"""
+Middlewares de observabilidade: instrumentação de SQL e métricas por view.
+
+Instrumentação de SQL por requisição:
+
+Conta as queries e o tempo de banco de cada requisição e detecta N+1: a mesma
+forma de SQL repetida várias vezes na mesma requisição. Para cada forma
+repetida guarda a linha do template (ou do código) que disparou a query.
+
+Saídas:
+  - header Server-Timing (aparece na aba Network do navegador);
+  - uma linha de log JSON no logger 'controle.sql' (WARNING quando há N+1);
+  - para usuários staff, um resumo no canto da página HTML.
+
+O custo por query é um perf_counter e um incremento num dict; a pilha só é
+percorrida uma vez por forma repetida, então dá para deixar ligado em produção.
+Queries feitas depois que a view retorna (corpo de StreamingHttpResponse) não
+entram na conta.
+"""
+import json
+import logging
+import re
+import sys
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.html import escape
+
+from . import metricas
+
+logger = logging.getLogger('controle.sql')
+
+# Coletor da requisição atual. ContextVar (e não atributo da conexão) porque em
+# ASGI a view síncrona roda em outra thread, com outra conexão; o contexto vai junto.
+_coletor_atual = ContextVar('coletor_sql', default=None)
+
+_LISTA_IN = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def _forma(sql):
+    """O SQL já vem parametrizado; só os IN (%s, %s, ...) variam de tamanho."""
+    return _LISTA_IN.sub('IN (...)', sql)
+
+
+def _origem():
+    """Linha do template que está sendo renderizado, ou a linha de código do projeto."""
+    codigo = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                return f"{origin.template_name}:{token.lineno}"
+        arquivo = frame.f_code.co_filename
+        if codigo is None and str(settings.BASE_DIR) in arquivo and 'site-packages' not in arquivo \
+                and not arquivo.endswith('middleware.py'):
+            codigo = f"{arquivo.replace(str(settings.BASE_DIR), '').lstrip('/')}:{frame.f_lineno}"
+        frame = frame.f_back
+    return codigo or '?'
+
+
+class Coletor:
+    def __init__(self, limite_repeticoes):
+        self.limite = limite_repeticoes
+        self.total = 0
+        self.tempo = 0.0
+        self.por_sql = {}  # sql -> [vezes, tempo, origem]
+
+    def executar(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.total += 1
+            self.tempo += duracao
+            dados = self.por_sql.get(sql)
+            if dados is None:
+                self.por_sql[sql] = [1, duracao, None]
+            else:
+                dados[0] += 1
+                dados[1] += duracao
+                if dados[0] == self.limite:
+                    dados[2] = _origem()
+
+    def repetidas(self):
+        """Formas de SQL executadas `limite` vezes ou mais: candidatas a N+1."""
+        formas = {}
+        for sql, (vezes, tempo, origem) in self.por_sql.items():
+            forma = formas.setdefault(_forma(sql), [0, 0.0, None])
+            forma[0] += vezes
+            forma[1] += tempo
+            forma[2] = forma[2] or origem
+        return sorted(
+            (
+                {'sql': forma[:300], 'vezes': vezes, 'ms': round(tempo * 1000, 2), 'origem': origem or '?'}
+                for forma, (vezes, tempo, origem) in formas.items() if vezes >= self.limite
+            ),
+            key=lambda r: -r['vezes'],
+        )
+
+
+def _wrapper(execute, sql, params, many, context):
+    coletor = _coletor_atual.get()
+    if coletor is None:
+        return execute(sql, params, many, context)
+    return coletor.executar(execute, sql, params, many, context)
+
+
+def _instalar(sender, connection, **kwargs):
+    # connection_created dispara a cada reconexão; o wrapper só entra uma vez
+    if _wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_wrapper)
+
+
+connection_created.connect(_instalar, dispatch_uid='core.middleware.instrumentacao_sql')
+
+
+class InstrumentacaoSQLMiddleware:
+    """Fica no topo do MIDDLEWARE para contar também as queries de sessão e autenticação."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ligado = getattr(settings, 'INSTRUMENTACAO_SQL', True)
+        self.limite = getattr(settings, 'SQL_REPETICOES_N1', 5)
+        self.resumo_staff = getattr(settings, 'SQL_RESUMO_STAFF', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Conexões abertas antes deste módulo ser importado (checks do runserver, shell)
+        for conexao in connections.all():
+            _instalar(None, conexao)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.ligado:
+            return self.get_response(request)
+
+        coletor = Coletor(self.limite)
+        token = _coletor_atual.set(coletor)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _coletor_atual.reset(token)
+        # Só olha o usuário (sessão + query) se a resposta for uma página HTML
+        staff = self.resumo_staff and _eh_html(response) and getattr(getattr(request, 'user', None), 'is_staff', False)
+        return self._finalizar(request, response, coletor, time.perf_counter() - inicio, staff)
+
+    async def __acall__(self, request):
+        if not self.ligado:
+            return await self.get_response(request)
+
+        coletor = Coletor(self.limite)
+        token = _coletor_atual.set(coletor)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _coletor_atual.reset(token)
+        staff = False
+        if self.resumo_staff and hasattr(request, 'auser') and _eh_html(response):
+            staff = (await request.auser()).is_staff
+        return self._finalizar(request, response, coletor, time.perf_counter() - inicio, staff)
+
+    def _finalizar(self, request, response, coletor, duracao, staff):
+        repetidas = coletor.repetidas()
+        sql_ms = coletor.tempo * 1000
+
+        partes = [
+            f'db;dur={sql_ms:.1f};desc="{coletor.total} queries"',
+            f'app;dur={(duracao - coletor.tempo) * 1000:.1f}',
+        ]
+        if repetidas:
+            partes.append(f'n1;desc="{len(repetidas)} forma(s) repetida(s)"')
+        response['Server-Timing'] = ', '.join(filter(None, [response.get('Server-Timing')] + partes))
+
+        match = getattr(request, 'resolver_match', None)
+        registro = {
+            'metodo': request.method,
+            'caminho': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duracao_ms': round(duracao * 1000, 2),
+            'queries': coletor.total,
+            'sql_ms': round(sql_ms, 2),
+        }
+        if repetidas:
+            registro['n_mais_1'] = repetidas
+        logger.log(logging.WARNING if repetidas else logging.INFO, json.dumps(registro, ensure_ascii=False))
+
+        # Outros middlewares (métricas) reaproveitam a contagem sem medir de novo
+        request.sql_queries, request.sql_tempo = coletor.total, coletor.tempo
+
+        if staff and _eh_html(response):
+            _injetar_resumo(response, registro, repetidas)
+        return response
+
+
+def _eh_html(response):
+    return (
+        not getattr(response, 'streaming', False)
+        and response.get('Content-Type', '').startswith('text/html')
+        and b'</body>' in response.content
+    )
+
+
+def _injetar_resumo(response, registro, repetidas):
+    linhas = ''.join(
+        f"<li><strong>{r['vezes']}x</strong> ({r['ms']} ms) em <code>{escape(r['origem'])}</code>"
+        f"<div class='text-muted text-truncate' style='max-width: 420px;'>{escape(r['sql'])}</div></li>"
+        for r in repetidas
+    )
+    cor = '#dc3545' if repetidas else '#198754'
+    html = (
+        f"<div id='resumoSql' style='position: fixed; bottom: 12px; right: 12px; z-index: 99999; background: #fff; "
+        f"border-left: 4px solid {cor}; border-radius: 8px; box-shadow: 0 4px 16px rgba(0,0,0,.15); "
+        f"padding: 8px 12px; font-size: 12px; max-width: 460px;'>"
+        f"<strong>SQL:</strong> {registro['queries']} queries, {registro['sql_ms']} ms "
+        f"&middot; total {registro['duracao_ms']} ms"
+        + (f"<div class='mt-1' style='color: {cor};'>Possível N+1:</div><ul class='mb-0 ps-3'>{linhas}</ul>" if repetidas else '')
+        + "</div>"
+    )
+    conteudo = response.content.replace(b'</body>', html.encode() + b'</body>', 1)
+    response.content = conteudo
+    if response.has_header('Content-Length'):
+        response['Content-Length'] = str(len(conteudo))
+
+
+class MetricasMiddleware:
+    """
+    Latência, status e queries de cada requisição, por nome de rota, para o /metrics.
+    Fica acima do InstrumentacaoSQLMiddleware para aproveitar a contagem de queries dele.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        for conexao in connections.all():
+            metricas._guardar_conexao(None, conexao)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metricas.em_andamento(1)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metricas.em_andamento(-1)
+        self._registrar(request, response, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        metricas.em_andamento(1)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metricas.em_andamento(-1)
+        self._registrar(request, response, time.perf_counter() - inicio)
+        return response
+
+    def _registrar(self, request, response, duracao):
+        match = getattr(request, 'resolver_match', None)
+        metricas.registrar_requisicao(
+            match.view_name if match else 'sem_rota',
+            request.method,
+            response.status_code,
+            duracao,
+            getattr(request, 'sql_queries', None),
+            getattr(request, 'sql_tempo', None),
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('DISPOSITIVO', 'Dispositivo'), ('FUNCIONARIO', 'Funcionário'), ('EQUIPAMENTO', 'Equipamento Auxiliar')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('trigrama', models.CharField(max_length=3)),
+            ],
+            options={
+                'verbose_name': 'Índice de Busca',
+                'verbose_name_plural': 'Índice de Busca',
+                'indexes': [models.Index(fields=['trigrama', 'tipo', 'objeto_id'], name='indice_busca_trigrama')],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id', 'trigrama'), name='indice_busca_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('unidade_trabalho', models.CharField(max_length=50)),
+                ('tipo_ativo', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Snapshot do Inventário',
+                'verbose_name_plural': 'Snapshots do Inventário',
+                'constraints': [models.UniqueConstraint(fields=('data', 'unidade_trabalho', 'tipo_ativo', 'status'), name='snapshot_inventario_unico')],
+            },
+        ),
+    ]
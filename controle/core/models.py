@@ -0,0 +1,268 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class Versionado(models.Model):
+    """
+    Versão de cada linha: `versao` sobe a cada save() e `atualizado_em` guarda quando.
+    As APIs usam os dois como ETag/Last-Modified (core.condicional) sem montar a resposta.
+    UPDATE em lote não passa pelo save(): use queryset.update(..., **Versionado.alteracao()).
+    """
+    atualizado_em = models.DateTimeField(default=timezone.now)
+    versao = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    @staticmethod
+    def alteracao():
+        return {'versao': F('versao') + 1, 'atualizado_em': timezone.now()}
+
+    def save(self, *args, **kwargs):
+        incrementou = not self._state.adding
+        if incrementou:
+            # Incremento no banco: dois saves simultâneos não geram a mesma versão
+            self.versao = F('versao') + 1
+        self.atualizado_em = timezone.now()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'versao', 'atualizado_em'}
+        super().save(*args, **kwargs)
+
+    def _save_table(self, *args, **kwargs):
+        atualizou = super()._save_table(*args, **kwargs)
+        if hasattr(self.__dict__.get('versao'), 'resolve_expression'):
+            # Antes do post_save: os receivers não veem F('versao') + 1. Volta a ser um
+            # campo adiado, lido do banco (o valor já incrementado) só se alguém precisar
+            del self.__dict__['versao']
+        return atualizou
+
+    @classmethod
+    def versao_da_linha(cls, pk):
+        """(versao, atualizado_em) de uma linha pela chave primária, ou None se não existir."""
+        return cls.objects.filter(pk=pk).values_list('versao', 'atualizado_em').first()
+
+    @classmethod
+    async def aversao_da_linha(cls, pk):
+        return await cls.objects.filter(pk=pk).values_list('versao', 'atualizado_em').afirst()
+
+    @staticmethod
+    def versao_do_conjunto(queryset):
+        """
+        (quantidade, última alteração) das linhas do queryset. Entrar no conjunto muda a
+        data; sair muda a quantidade (ou a data, se outra linha entrou junto).
+        """
+        resumo = queryset.order_by().aggregate(qtd=models.Count('pk'), ultima=models.Max('atualizado_em'))
+        return resumo['qtd'], resumo['ultima']
+
+    @staticmethod
+    async def aversao_do_conjunto(queryset):
+        resumo = await queryset.order_by().aaggregate(qtd=models.Count('pk'), ultima=models.Max('atualizado_em'))
+        return resumo['qtd'], resumo['ultima']
+
+
+class IndiceBusca(models.Model):
+    """
+    Índice de trigramas para a busca por trecho de texto (ver core/busca.py).
+    Cada linha diz: o objeto `objeto_id` do `tipo` contém o trigrama `trigrama`.
+    """
+    TIPO_CHOICES = [
+        ('DISPOSITIVO', 'Dispositivo'),
+        ('FUNCIONARIO', 'Funcionário'),
+        ('EQUIPAMENTO', 'Equipamento Auxiliar'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    trigrama = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            # Também serve para apagar/reindexar um objeto
+            models.UniqueConstraint(fields=['tipo', 'objeto_id', 'trigrama'], name='indice_busca_unico'),
+        ]
+        indexes = [
+            # Cobre a consulta da busca inteira (sem ir na tabela)
+            models.Index(fields=['trigrama', 'tipo', 'objeto_id'], name='indice_busca_trigrama'),
+        ]
+        verbose_name = "Índice de Busca"
+        verbose_name_plural = "Índice de Busca"
+
+    def __str__(self):
+        return f"{self.tipo}:{self.objeto_id} [{self.trigrama}]"
+
+
+class SnapshotInventario(models.Model):
+    """
+    Fotografia diária do inventário: quantos ativos de cada tipo estavam em cada
+    status, por unidade de trabalho, no fim do dia `data`.
+
+    Os gráficos de tendência leem só daqui (SnapshotInventario.series), nunca das
+    tabelas vivas. Quem grava: python manage.py gerar_snapshots_inventario
+    (o dia de hoje, a partir do estado atual; com --desde, os dias passados,
+    reconstruídos do livro de atribuições e das manutenções).
+    """
+    # Ativo sem funcionário (disponível, em manutenção, lotes do estoque)
+    SEM_UNIDADE = 'ESTOQUE'
+
+    data = models.DateField()
+    # Unidade do funcionário com o ativo, ou SEM_UNIDADE
+    unidade_trabalho = models.CharField(max_length=50)
+    # tipo_dispositivo (NOTEBOOK...) ou tipo_equipamento_aux (MOUSE...); os valores não se repetem
+    tipo_ativo = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    quantidade = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Também cobre a leitura de um período (prefixo data)
+            models.UniqueConstraint(
+                fields=['data', 'unidade_trabalho', 'tipo_ativo', 'status'], name='snapshot_inventario_unico'
+            ),
+        ]
+        verbose_name = "Snapshot do Inventário"
+        verbose_name_plural = "Snapshots do Inventário"
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} {self.unidade_trabalho}/{self.tipo_ativo}/{self.status}: {self.quantidade}"
+
+    @classmethod
+    def contar_agora(cls):
+        """{(unidade, tipo, status): quantidade} do estado atual: uma agregação por tabela."""
+        from dispositivos.models import Dispositivo
+        from equipamentos.models import EquipamentoAuxiliar, LoteEstoque
+
+        contagens = {}
+        for model, campo_tipo in ((Dispositivo, 'tipo_dispositivo'), (EquipamentoAuxiliar, 'tipo_equipamento_aux')):
+            linhas = model.objects.order_by().values_list('funcionario__unidade_trabalho', campo_tipo, 'status').annotate(
+                qtd=models.Count('pk')
+            )
+            for unidade, tipo, status, qtd in linhas:
+                chave = (unidade or cls.SEM_UNIDADE, tipo, status)
+                contagens[chave] = contagens.get(chave, 0) + qtd
+        # O que está no estoque são só quantidades nos lotes
+        lotes = LoteEstoque.objects.order_by().values_list('tipo_equipamento_aux').annotate(
+            disponivel=models.Sum('quantidade_disponivel'), manutencao=models.Sum('quantidade_manutencao')
+        )
+        for tipo, disponivel, manutencao in lotes:
+            for status, qtd in (('DISPONIVEL', disponivel), ('MANUTENCAO', manutencao)):
+                if qtd:
+                    chave = (cls.SEM_UNIDADE, tipo, status)
+                    contagens[chave] = contagens.get(chave, 0) + qtd
+        return contagens
+
+    @classmethod
+    def reconstruir(cls, desde, ate, lote=2000):
+        """
+        ({data: {(unidade, tipo, status): quantidade}}, atribuições ignoradas) de desde
+        a ate, a partir da história:
+          - ATIVO: as atribuições (funcionarios.AtribuicaoAtivo) abertas no fim do dia;
+          - MANUTENCAO (dispositivos): as ManutencaoDispositivo abertas no fim do dia;
+          - DISPONIVEL (dispositivos): o total atual do tipo menos os dois acima.
+        Aproximações: a unidade é a atual do funcionário, os dispositivos de hoje
+        existiam no período todo, e disponível/manutenção dos equipamentos auxiliares
+        (só quantidades nos lotes) não têm história e ficam de fora.
+        Cada tabela é lida uma vez, sem ordenar: cada intervalo soma 1 no dia em que
+        começa e tira 1 no dia em que termina, e o acumulado dá cada dia. Atribuição de
+        dispositivo já apagado não tem tipo conhecido e é ignorada (contada no retorno).
+        """
+        from dispositivos.models import Dispositivo, ManutencaoDispositivo
+        from equipamentos.models import EquipamentoAuxiliar, LoteEstoque
+        from funcionarios.models import AtribuicaoAtivo, Funcionario
+
+        inicio_periodo, fim_periodo = _fim_do_dia(desde - timedelta(days=1)), _fim_do_dia(ate)
+        variacoes = {}
+
+        def intervalo(chave, inicio, fim):
+            # Vale no fim dos dias [data de inicio, data de fim)
+            primeiro = max(timezone.localdate(inicio), desde)
+            ultimo = timezone.localdate(fim) if fim else None
+            if ultimo is not None and ultimo <= primeiro:
+                return
+            variacoes.setdefault(primeiro, Counter())[chave] += 1
+            if ultimo is not None and ultimo <= ate:
+                variacoes.setdefault(ultimo, Counter())[chave] -= 1
+
+        tipos = {
+            'DISPOSITIVO': dict(Dispositivo.objects.values_list('pk', 'tipo_dispositivo').iterator(chunk_size=lote)),
+            'EQUIPAMENTO': dict(
+                EquipamentoAuxiliar.objects.values_list('pk', 'tipo_equipamento_aux').iterator(chunk_size=lote)
+            ),
+        }
+        # Equipamento devolvido ao estoque é apagado: o tipo vem do lote com o mesmo nome
+        tipo_por_nome = dict(LoteEstoque.objects.values_list('nome', 'tipo_equipamento_aux'))
+        unidades = dict(Funcionario.objects.values_list('pk', 'unidade_trabalho').iterator(chunk_size=lote))
+
+        no_periodo = models.Q(fim__isnull=True) | models.Q(fim__gte=inicio_periodo)
+        atribuicoes = AtribuicaoAtivo.objects.filter(no_periodo, inicio__lt=fim_periodo).order_by().values_list(
+            'tipo_ativo', 'ativo_id', 'identificacao', 'funcionario_id', 'inicio', 'fim'
+        )
+        sem_tipo = 0
+        for tipo_ativo, ativo_id, identificacao, funcionario_id, inicio, fim in atribuicoes.iterator(chunk_size=lote):
+            tipo = tipos[tipo_ativo].get(ativo_id)
+            if tipo is None and tipo_ativo == 'EQUIPAMENTO':
+                tipo = tipo_por_nome.get(identificacao)
+            if tipo is None:
+                sem_tipo += 1
+                continue
+            intervalo((unidades.get(funcionario_id) or cls.SEM_UNIDADE, tipo, 'ATIVO'), inicio, fim)
+
+        manutencoes = ManutencaoDispositivo.objects.filter(
+            models.Q(data_fim__isnull=True) | models.Q(data_fim__gte=inicio_periodo), data_inicio__lt=fim_periodo
+        ).order_by().values_list('dispositivo__tipo_dispositivo', 'data_inicio', 'data_fim')
+        for tipo, inicio, fim in manutencoes.iterator(chunk_size=lote):
+            intervalo((cls.SEM_UNIDADE, tipo, 'MANUTENCAO'), inicio, fim)
+
+        totais = dict(Dispositivo.objects.order_by().values_list('tipo_dispositivo').annotate(qtd=models.Count('pk')))
+        dias, atual, dia = {}, Counter(), desde
+        while dia <= ate:
+            atual.update(variacoes.get(dia, {}))
+            contagens = {chave: qtd for chave, qtd in atual.items() if qtd > 0}
+            for tipo, total in totais.items():
+                fora = sum(qtd for (_, t, _), qtd in contagens.items() if t == tipo)
+                if total > fora:
+                    contagens[(cls.SEM_UNIDADE, tipo, 'DISPONIVEL')] = total - fora
+            dias[dia] = contagens
+            dia += timedelta(days=1)
+        return dias, sem_tipo
+
+    @classmethod
+    def gravar(cls, data, contagens):
+        """Troca as linhas do dia pelas `contagens`: rodar de novo só regrava o mesmo dia."""
+        from core import versoes
+
+        with transaction.atomic():
+            cls.objects.filter(data=data).delete()
+            cls.objects.bulk_create([
+                cls(data=data, unidade_trabalho=unidade, tipo_ativo=tipo, status=status, quantidade=qtd)
+                for (unidade, tipo, status), qtd in sorted(contagens.items()) if qtd
+            ])
+            versoes.invalidar(cls._meta.label)
+
+    @classmethod
+    def series(cls, inicio, fim, unidade=None, tipo=None, status=None):
+        """Uma série por (unidade, tipo, status) com os pontos [data, quantidade] do período."""
+        filtro = cls.objects.filter(data__range=(inicio, fim))
+        if unidade:
+            filtro = filtro.filter(unidade_trabalho=unidade)
+        if tipo:
+            filtro = filtro.filter(tipo_ativo=tipo)
+        if status:
+            filtro = filtro.filter(status=status)
+        series = {}
+        for data, unidade_, tipo_, status_, qtd in filtro.order_by('data').values_list(
+            'data', 'unidade_trabalho', 'tipo_ativo', 'status', 'quantidade'
+        ):
+            series.setdefault((unidade_, tipo_, status_), []).append([data.isoformat(), qtd])
+        return [
+            {'unidade_trabalho': u, 'tipo_ativo': t, 'status': s, 'pontos': pontos}
+            for (u, t, s), pontos in sorted(series.items())
+        ]
+
+
+def _fim_do_dia(data):
+    """Meia-noite (no fuso do settings) que encerra `data`."""
+    return timezone.make_aware(datetime.combine(data + timedelta(days=1), time.min))
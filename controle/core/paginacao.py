@@ -0,0 +1,95 @@
+"""
+Paginação por chave (keyset / seek).
+
+Em vez de COUNT(*) + OFFSET, cada página é uma leitura de intervalo no índice:
+"campos > valores da última linha", limitado ao tamanho da página.
+Os cursores são opacos (assinados com a SECRET_KEY) e guardam apenas os
+valores de ordenação da linha de fronteira e a direção.
+"""
+from django.core import signing
+from django.db.models import Q
+
+SALT = 'core.paginacao'
+
+
+class PaginaCursor:
+    """Expõe o mesmo vocabulário do Page do Django usado nos templates (has_next etc.)."""
+
+    def __init__(self, itens, proximo=None, anterior=None, total=None):
+        self.object_list = itens
+        self.next_cursor = proximo
+        self.previous_cursor = anterior
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _codificar(valores, direcao):
+    return signing.dumps({'v': valores, 'd': direcao}, salt=SALT, compress=True)
+
+
+def _decodificar(cursor):
+    try:
+        dados = signing.loads(cursor, salt=SALT)
+        return dados['v'], dados['d']
+    except (signing.BadSignature, KeyError, TypeError):
+        # Cursor adulterado ou de outra versão: volta para a primeira página
+        return None, None
+
+
+def _apos(campos, valores, operador):
+    """(a, b) > (x, y)  =>  a > x OR (a = x AND b > y)."""
+    condicao = Q()
+    for i, campo in enumerate(campos):
+        parte = Q(**{f'{campo}__{operador}': valores[i]})
+        for anterior, valor in zip(campos[:i], valores[:i]):
+            parte &= Q(**{anterior: valor})
+        condicao |= parte
+    return condicao
+
+
+def _valores(obj, campos):
+    return [getattr(obj, campo) for campo in campos]
+
+
+def paginar_por_cursor(queryset, campos, cursor=None, tamanho=20, total=None):
+    """
+    `campos` é a ordenação (ascendente) e precisa identificar a linha de forma única,
+    ex.: ('codigo',) ou ('nome', 'id'). Os valores precisam ser serializáveis em JSON.
+    """
+    campos = tuple(campos)
+    valores, direcao = _decodificar(cursor) if cursor else (None, None)
+
+    if valores is not None and direcao == 'anterior':
+        # Volta uma página: lê de trás para frente a partir da primeira linha exibida
+        qs = queryset.filter(_apos(campos, valores, 'lt')).order_by(*[f'-{c}' for c in campos])
+        itens = list(qs[:tamanho + 1])
+        tem_mais_antes = len(itens) > tamanho
+        itens = list(reversed(itens[:tamanho]))
+        tem_depois = True
+    else:
+        qs = queryset
+        if valores is not None:
+            qs = qs.filter(_apos(campos, valores, 'gt'))
+        qs = qs.order_by(*campos)
+        itens = list(qs[:tamanho + 1])
+        tem_depois = len(itens) > tamanho
+        itens = itens[:tamanho]
+        tem_mais_antes = valores is not None
+
+    proximo = _codificar(_valores(itens[-1], campos), 'proximo') if itens and tem_depois else None
+    anterior = _codificar(_valores(itens[0], campos), 'anterior') if itens and tem_mais_antes else None
+    return PaginaCursor(itens, proximo, anterior, total)
@@ -0,0 +1,174 @@
+"""
+Leituras pesadas numa réplica do banco (alias REPLICA em DATABASES).
+
+Só vai para a réplica o que as views marcadas com @somente_leitura leem
+(dashboards, listagens, exportação, histórico). Todo o resto, inclusive as
+escritas e qualquer leitura dentro de transaction.atomic(), fica no primário.
+
+A réplica anda alguns instantes atrás do primário. Para o usuário sempre ver o
+que acabou de gravar, uma requisição que escreve no banco faz o ReplicaMiddleware
+mandar o cookie PRIMARIO_COOKIE, e enquanto ele valer (REPLICA_JANELA segundos)
+as views marcadas daquele navegador também leem do primário.
+
+Sem o alias 'replica' no settings (DB_REPLICA_HOST vazio) tudo fica como antes.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+PRIMARIO_COOKIE = 'usar_primario'
+
+# Apps que nunca leem da réplica: a sessão acabou de ser gravada no login
+APPS_SO_PRIMARIO = ('sessions',)
+
+# A view atual pode ler da réplica? (marcado por @somente_leitura)
+_leitura = ContextVar('replica_leitura', default=False)
+# Lista da requisição atual; o roteador acrescenta um item a cada escrita.
+# Mutável de propósito: a view síncrona de uma requisição ASGI roda em outra
+# thread, com uma cópia do contexto, mas a lista é a mesma.
+_escritas = ContextVar('replica_escritas', default=None)
+
+
+def configurada():
+    return REPLICA in settings.DATABASES
+
+
+def lendo_da_replica():
+    """As leituras feitas agora vão para a réplica?"""
+    return _leitura.get() and configurada() and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def janela():
+    return getattr(settings, 'REPLICA_JANELA', 10)
+
+
+class RoteadorReplica:
+    """DATABASE_ROUTERS: leituras das views @somente_leitura na réplica, o resto no primário."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in APPS_SO_PRIMARIO and lendo_da_replica():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        escritas = _escritas.get()
+        if escritas is not None:
+            escritas.append(model._meta.label)
+        # Explícito: sem isso o Django gravaria no banco de onde a instância foi lida
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # réplica e primário têm os mesmos dados
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o schema pela replicação do MySQL
+        return db != REPLICA
+
+
+def _durante_leitura(pedacos):
+    """Itera o corpo de um StreamingHttpResponse ainda lendo da réplica (a view já retornou)."""
+    token = _leitura.set(True)
+    try:
+        yield from pedacos
+    finally:
+        _leitura.reset(token)
+
+
+async def _durante_leitura_async(pedacos):
+    token = _leitura.set(True)
+    try:
+        async for pedaco in pedacos:
+            yield pedaco
+    finally:
+        _leitura.reset(token)
+
+
+def _pode_usar(request):
+    return configurada() and request.method in ('GET', 'HEAD') and PRIMARIO_COOKIE not in request.COOKIES
+
+
+def _no_corpo(response):
+    if response.streaming:
+        if response.is_async:
+            response.streaming_content = _durante_leitura_async(response.streaming_content)
+        else:
+            response.streaming_content = _durante_leitura(response.streaming_content)
+    return response
+
+
+def somente_leitura(view):
+    """
+    Marca a view como só de leitura: o que ela (e o corpo em streaming dela) lê vai
+    para a réplica. Fica abaixo do @login_required, para a sessão e o usuário
+    continuarem vindo do primário, e acima do @condicional, para a versão vir do
+    mesmo banco que os dados.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def _view_async(request, *args, **kwargs):
+            if not _pode_usar(request):
+                return await view(request, *args, **kwargs)
+            token = _leitura.set(True)
+            try:
+                response = await view(request, *args, **kwargs)
+            finally:
+                _leitura.reset(token)
+            return _no_corpo(response)
+        return _view_async
+
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        if not _pode_usar(request):
+            return view(request, *args, **kwargs)
+        token = _leitura.set(True)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _leitura.reset(token)
+        return _no_corpo(response)
+    return _view
+
+
+class ReplicaMiddleware:
+    """
+    Depois de uma requisição que gravou no banco, manda o cookie que prende o
+    navegador ao primário por REPLICA_JANELA segundos. Fica acima do
+    SessionMiddleware para contar também a gravação da sessão (login).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        escritas = []
+        token = _escritas.set(escritas)
+        try:
+            response = self.get_response(request)
+        finally:
+            _escritas.reset(token)
+        return self.marcar(response, escritas)
+
+    async def __acall__(self, request):
+        escritas = []
+        token = _escritas.set(escritas)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _escritas.reset(token)
+        return self.marcar(response, escritas)
+
+    def marcar(self, response, escritas):
+        if escritas and configurada():
+            response.set_cookie(PRIMARIO_COOKIE, '1', max_age=janela(), httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,81 @@
+"""
+Cache dos dados das telas e APIs, versionado pelos models de que eles dependem.
+
+A chave de cada entrada leva a versão atual (core.versoes) de cada model que o
+resultado lê. Um post_save/post_delete troca só o token daquele model: as
+entradas que dependem dele deixam de ser encontradas e as outras continuam
+valendo. Nada é apagado na escrita; as entradas velhas saem pelo descarte LRU
+do cache (MAX_ENTRIES no settings).
+
+Guarda dados (o contexto do template, o payload do JSON), e não o HTML pronto:
+a página tem token CSRF, mensagens e o usuário logado, que mudam por requisição.
+
+Acertos e falhas aparecem no /metrics como controle_cache_operacoes_total{cache="respostas"}.
+
+Um resultado calculado na réplica (core.replica) pode estar atrás da versão lida
+do primário; ele fica guardado só por REPLICA_JANELA segundos.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import replica, versoes
+
+_AUSENTE = object()
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPOSTAS_CACHE', 'respostas')]
+
+
+def _montar(nome, tokens, partes):
+    variavel = hashlib.md5(repr(tuple(partes)).encode(), usedforsecurity=False).hexdigest()[:16]
+    return f'resposta:{nome}:{versoes.combinar(tokens)}:{variavel}'
+
+
+def _timeout(timeout):
+    if not replica.lendo_da_replica():
+        return timeout
+    padrao = timeout if timeout is not None else _cache().default_timeout
+    return replica.janela() if padrao is None else min(padrao, replica.janela())
+
+
+def chave(nome, labels, partes=()):
+    """resposta:<nome>:<versão dos models>:<hash das partes que variam (id, filtros...)>"""
+    return _montar(nome, versoes.obter(*labels), partes)
+
+
+def obter(nome, labels, partes, calcular, timeout=None):
+    """
+    Devolve o resultado guardado para (nome, partes) na versão atual dos `labels`,
+    ou chama `calcular()` e guarda. A versão é lida antes do cálculo: se uma escrita
+    acontecer no meio, o resultado fica numa chave que já nasce velha.
+    Sem `timeout`, vale o TIMEOUT do cache.
+    """
+    cache = _cache()
+    k = chave(nome, labels, partes)
+    valor = cache.get(k, _AUSENTE)
+    if valor is _AUSENTE:
+        timeout = _timeout(timeout)
+        valor = calcular()
+        if timeout is None:
+            cache.set(k, valor)
+        else:
+            cache.set(k, valor, timeout)
+    return valor
+
+
+async def aobter(nome, labels, partes, calcular, timeout=None):
+    """obter() para views async: `calcular()` devolve um awaitable (ORM async)."""
+    cache = _cache()
+    k = _montar(nome, await versoes.aobter(*labels), partes)
+    valor = await cache.aget(k, _AUSENTE)
+    if valor is _AUSENTE:
+        timeout = _timeout(timeout)
+        valor = await calcular()
+        if timeout is None:
+            await cache.aset(k, valor)
+        else:
+            await cache.aset(k, valor, timeout)
+    return valor
@@ -1,3 +1,524 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db import connection, connections
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from dispositivos.models import ContadorDispositivo, Dispositivo
+from equipamentos.models import EquipamentoAuxiliar, LoteEstoque
+from funcionarios.models import AtribuicaoAtivo, Funcionario, HistoricoFuncionario
+
+from . import busca, checks, importacao, metricas, paginacao
+from .db import pool as pools
+from .models import IndiceBusca
+from .paginacao import paginar_por_cursor
+
+
+class PaginacaoCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Dispositivo.objects.bulk_create(
+            Dispositivo(codigo=f'NB-{i:03d}', tipo_dispositivo='NOTEBOOK') for i in range(25)
+        )
+
+    def codigos(self, pagina):
+        return [d.codigo for d in pagina]
+
+    def test_primeira_pagina(self):
+        pagina = paginar_por_cursor(Dispositivo.objects.all(), ('codigo',), tamanho=10)
+
+        self.assertEqual(self.codigos(pagina), [f'NB-{i:03d}' for i in range(10)])
+        self.assertTrue(pagina.has_next())
+        self.assertFalse(pagina.has_previous())
+
+    def test_ida_e_volta(self):
+        qs = Dispositivo.objects.all()
+        primeira = paginar_por_cursor(qs, ('codigo',), tamanho=10)
+        segunda = paginar_por_cursor(qs, ('codigo',), primeira.next_cursor, tamanho=10)
+        terceira = paginar_por_cursor(qs, ('codigo',), segunda.next_cursor, tamanho=10)
+
+        self.assertEqual(self.codigos(segunda), [f'NB-{i:03d}' for i in range(10, 20)])
+        self.assertEqual(self.codigos(terceira), [f'NB-{i:03d}' for i in range(20, 25)])
+        self.assertFalse(terceira.has_next())
+        self.assertTrue(terceira.has_previous())
+
+        voltou = paginar_por_cursor(qs, ('codigo',), terceira.previous_cursor, tamanho=10)
+        self.assertEqual(self.codigos(voltou), self.codigos(segunda))
+        inicio = paginar_por_cursor(qs, ('codigo',), voltou.previous_cursor, tamanho=10)
+        self.assertEqual(self.codigos(inicio), self.codigos(primeira))
+        self.assertFalse(inicio.has_previous())
+
+    def test_ordenacao_composta_com_empate(self):
+        for i in range(5):
+            Funcionario.objects.create(nome='Mesmo Nome', email=f'f{i}@exemplo.com')
+        qs = Funcionario.objects.all()
+
+        primeira = paginar_por_cursor(qs, ('nome', 'id'), tamanho=3)
+        segunda = paginar_por_cursor(qs, ('nome', 'id'), primeira.next_cursor, tamanho=3)
+
+        ids = [f.id for f in primeira] + [f.id for f in segunda]
+        self.assertEqual(ids, sorted(qs.values_list('id', flat=True)))
+
+    def test_cursor_e_assinado(self):
+        pagina = paginar_por_cursor(Dispositivo.objects.all(), ('codigo',), tamanho=10)
+        dados = signing.loads(pagina.next_cursor, salt=paginacao.SALT)
+
+        self.assertEqual(dados, {'v': ['NB-009'], 'd': 'proximo'})
+        # Outro salt (ou outra SECRET_KEY) não abre o cursor
+        with self.assertRaises(signing.BadSignature):
+            signing.loads(pagina.next_cursor, salt='outro')
+
+    def test_cursor_adulterado_volta_ao_inicio(self):
+        falso = signing.dumps({'v': ['NB-019'], 'd': 'proximo'}, salt='outro', compress=True)
+
+        for cursor in (falso, 'lixo', paginar_por_cursor(Dispositivo.objects.all(), ('codigo',), tamanho=10).next_cursor + 'x'):
+            pagina = paginar_por_cursor(Dispositivo.objects.all(), ('codigo',), cursor, tamanho=10)
+            self.assertEqual(self.codigos(pagina)[0], 'NB-000')
+            self.assertFalse(pagina.has_previous())
+
+    def test_filtro_vazio(self):
+        pagina = paginar_por_cursor(Dispositivo.objects.filter(codigo='nada'), ('codigo',))
+
+        self.assertEqual(len(pagina), 0)
+        self.assertFalse(pagina.has_other_pages())
+
+
+class BuscaTests(TestCase):
+    def setUp(self):
+        self.joao = Funcionario.objects.create(nome='João Araújo', email='jaraujo@exemplo.com')
+        self.ana = Funcionario.objects.create(nome='Ana Lima', email='ana@exemplo.com')
+        self.notebook = Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        self.notebook.vincular(self.ana)
+        self.client.force_login(User.objects.create_user('operador'))
+
+    def encontrados(self, termo):
+        return set(Funcionario.objects.filter(busca.filtro('FUNCIONARIO', termo)).values_list('nome', flat=True))
+
+    def test_termo_sem_acento_acha_o_acentuado(self):
+        self.assertEqual(self.encontrados('araujo'), {'João Araújo'})
+
+    def test_termo_comum_tambem_ignora_acentos(self):
+        # Com LIMITE_RARO = 0 todo trigrama é comum e o filtro confere linha a linha
+        with mock.patch.object(busca, 'LIMITE_RARO', 0):
+            self.assertIs(busca.candidatos('FUNCIONARIO', 'joao'), busca.TERMO_COMUM)
+            self.assertEqual(self.encontrados('joao'), {'João Araújo'})
+            self.assertEqual(self.encontrados('araujo'), {'João Araújo'})
+            self.assertEqual(self.encontrados('lima'), {'Ana Lima'})
+            self.assertEqual(self.encontrados('xyz'), set())
+
+    def test_prefixo_junta_os_campos(self):
+        self.assertEqual(set(busca.prefixo('FUNCIONARIO', 'jo').values_list('pk', flat=True)), {self.joao.pk})
+        self.assertEqual(set(busca.prefixo('FUNCIONARIO', 'jar').values_list('pk', flat=True)), {self.joao.pk})
+        self.assertEqual([r['titulo'] for r in busca.buscar('an', tipos=['FUNCIONARIO'])], ['Ana Lima'])
+
+    def test_listagem_de_dispositivos_com_termo_curto(self):
+        Dispositivo.objects.create(codigo='AN-9', tipo_dispositivo='COLETOR')
+        Dispositivo.objects.create(codigo='CL-1', tipo_dispositivo='COLETOR')
+
+        def codigos(termo):
+            resposta = self.client.get(reverse('dispositivos:listar_dispositivos'), {'busca': termo})
+            return [d.codigo for d in resposta.context['dispositivos']]
+
+        # Pelo código (AN-9) ou pelo nome do funcionário (Ana, dona do NB-1)
+        self.assertEqual(codigos('an'), ['AN-9', 'NB-1'])
+        self.assertEqual(codigos('cl'), ['CL-1'])
+
+
+class ImportacaoTests(TestCase):
+    def importar(self, tipo, conteudo, tamanho_lote=importacao.TAMANHO_LOTE):
+        return importacao.importar(tipo, BytesIO(conteudo.encode()), f'{tipo}.csv', tamanho_lote)
+
+    def test_funcionarios_validos_e_invalidos(self):
+        Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+
+        relatorio = self.importar('funcionarios', (
+            "Nome;Email;Unidade_Trabalho\n"
+            "Bruno;bruno@exemplo.com;Itapevi\n"
+            "Ana de novo;ANA@exemplo.com;\n"
+            "Carla;carla-sem-arroba;\n"
+            "Duda;duda@exemplo.com;Lua\n"
+            ";vazio@exemplo.com;\n"
+            "Bruno 2;Bruno@Exemplo.com;\n"
+        ))
+
+        self.assertEqual((relatorio.lidas, relatorio.inseridas), (6, 1))
+        self.assertEqual([numero for numero, _ in relatorio.erros], [3, 4, 5, 6, 7])
+        self.assertIn("já existe um funcionário com o email ANA@exemplo.com", relatorio.erros[0][1])
+        self.assertIn("unidade_trabalho inválido: 'Lua'", relatorio.erros[2][1])
+        self.assertIn("nome", relatorio.erros[3][1])
+        bruno = Funcionario.objects.get(email='bruno@exemplo.com')
+        self.assertEqual(bruno.unidade_trabalho, 'ITAPEVI')
+        self.assertTrue(HistoricoFuncionario.objects.filter(funcionario=bruno, acao='CONTRATADO').exists())
+        self.assertTrue(IndiceBusca.objects.filter(tipo='FUNCIONARIO', objeto_id=bruno.pk).exists())
+
+    def test_erro_do_banco_desfaz_so_o_lote(self):
+        carregar = importacao.ImportadorDispositivos.carregar_existentes
+
+        def carregar_e_concorrer(importador):
+            carregar(importador)
+            # Inserido por outra requisição depois da leitura dos códigos existentes
+            Dispositivo.objects.create(codigo='NB-3', tipo_dispositivo='NOTEBOOK')
+
+        with mock.patch.object(importacao.ImportadorDispositivos, 'carregar_existentes', carregar_e_concorrer):
+            relatorio = self.importar('dispositivos', (
+                "codigo,tipo_dispositivo\n"
+                "NB-1,NOTEBOOK\n"
+                "NB-2,NOTEBOOK\n"
+                "NB-3,NOTEBOOK\n"
+                "NB-4,NOTEBOOK\n"
+                "NB-5,NOTEBOOK\n"
+            ), tamanho_lote=2)
+
+        self.assertEqual((relatorio.lidas, relatorio.inseridas), (5, 3))
+        self.assertEqual([numero for numero, _ in relatorio.erros], [4, 5])
+        self.assertIn("lote inteiro foi desfeito", relatorio.erros[0][1])
+        self.assertEqual(
+            sorted(Dispositivo.objects.values_list('codigo', flat=True)), ['NB-1', 'NB-2', 'NB-3', 'NB-5']
+        )
+        self.assertEqual(
+            set(IndiceBusca.objects.filter(tipo='DISPOSITIVO').values_list('objeto_id', flat=True)),
+            set(Dispositivo.objects.values_list('id', flat=True)),
+        )
+        self.assertEqual(dict(ContadorDispositivo.objects.values_list('status', 'quantidade')), {'DISPONIVEL': 4})
+
+    def test_dispositivos_acertam_contadores_e_atribuicoes(self):
+        ana = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+
+        relatorio = self.importar('dispositivos', (
+            "codigo,tipo_dispositivo,email_funcionario\n"
+            "NB-1,Notebook,ana@exemplo.com\n"
+            "NB-2,NOTEBOOK,\n"
+            "NB-1,NOTEBOOK,\n"
+            "NB-3,NOTEBOOK,ninguem@exemplo.com\n"
+        ))
+
+        self.assertEqual(relatorio.inseridas, 2)
+        self.assertEqual(len(relatorio.erros), 2)
+        self.assertEqual(ContadorDispositivo.contagem_real(), {('NOTEBOOK', 'ATIVO'): 1, ('NOTEBOOK', 'DISPONIVEL'): 1})
+        self.assertEqual(
+            dict(ContadorDispositivo.objects.values_list('status', 'quantidade')), {'ATIVO': 1, 'DISPONIVEL': 1}
+        )
+        self.assertEqual(AtribuicaoAtivo.dispositivo_em('NB-1', timezone.now()).funcionario_id, ana.pk)
+
+    def test_erro_ao_gravar_desfaz_so_o_lote(self):
+        linhas = "".join(f"F{i};f{i}@exemplo.com\n" for i in range(5))
+        indexar_lote = importacao.busca.indexar_lote
+        chamadas = []
+
+        def falhar_no_segundo(tipo, objetos, **kwargs):
+            chamadas.append(tipo)
+            if len(chamadas) == 2:
+                raise RuntimeError("falha no meio da importação")
+            return indexar_lote(tipo, objetos, **kwargs)
+
+        with mock.patch.object(importacao.busca, 'indexar_lote', falhar_no_segundo):
+            with self.assertRaises(RuntimeError):
+                self.importar('funcionarios', "nome;email\n" + linhas, tamanho_lote=2)
+
+        # O primeiro lote ficou; o segundo voltou inteiro (funcionários e histórico)
+        self.assertEqual(list(Funcionario.objects.order_by('email').values_list('email', flat=True)),
+                         ['f0@exemplo.com', 'f1@exemplo.com'])
+        self.assertEqual(HistoricoFuncionario.objects.count(), 2)
+
+    def test_equipamentos_soltos_vao_para_o_lote(self):
+        ana = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+
+        relatorio = self.importar('equipamentos', (
+            "nome,tipo_equipamento_aux,email_funcionario\n"
+            "Mouse X,Mouse,\n"
+            "Mouse X,MOUSE,\n"
+            "Mouse X,MOUSE,ana@exemplo.com\n"
+            "Mouse X,Trackball,\n"
+        ))
+
+        self.assertEqual(relatorio.inseridas, 3)
+        self.assertEqual(LoteEstoque.objects.get(nome='Mouse X').quantidade_disponivel, 2)
+        item = EquipamentoAuxiliar.objects.get()
+        self.assertEqual((item.funcionario_id, item.status), (ana.pk, 'ATIVO'))
+        self.assertEqual(AtribuicaoAtivo.objects.filter(tipo_ativo='EQUIPAMENTO', ativo_id=item.pk).count(), 1)
+
+    def test_equipamentos_sem_ids_do_bulk_create_ignoram_inserts_concorrentes(self):
+        ana = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+        bulk_create = EquipamentoAuxiliar.objects.bulk_create
+
+        def com_insert_concorrente(objetos, *args, **kwargs):
+            # Outra requisição grava um item com o mesmo nome no meio do lote
+            EquipamentoAuxiliar.objects.create(nome='Mouse X', tipo_equipamento_aux='MOUSE', funcionario=ana)
+            return bulk_create(objetos, *args, **kwargs)
+
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                mock.patch.object(EquipamentoAuxiliar.objects, 'bulk_create', com_insert_concorrente):
+            self.importar('equipamentos', (
+                "nome,tipo_equipamento_aux,email_funcionario\n"
+                "Mouse X,MOUSE,ana@exemplo.com\n"
+                "Mouse X,MOUSE,ana@exemplo.com\n"
+            ))
+
+        self.assertEqual(EquipamentoAuxiliar.objects.count(), 3)
+        # Cada item tem uma atribuição só e trigramas indexados uma vez
+        for item in EquipamentoAuxiliar.objects.all():
+            self.assertEqual(AtribuicaoAtivo.objects.filter(tipo_ativo='EQUIPAMENTO', ativo_id=item.pk).count(), 1)
+        self.assertEqual(
+            IndiceBusca.objects.filter(tipo='EQUIPAMENTO').count(),
+            IndiceBusca.objects.filter(tipo='EQUIPAMENTO').values('objeto_id', 'trigrama').distinct().count(),
+        )
+
+
+class VersionadoTests(TestCase):
+    def test_versao_sobe_a_cada_save(self):
+        funcionario = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+        self.assertEqual(funcionario.versao, 1)
+
+        funcionario.nome = 'Ana Souza'
+        funcionario.save()
+        funcionario.save(update_fields=['nome'])
+
+        self.assertEqual(funcionario.versao, 3)
+        self.assertEqual(Funcionario.versao_da_linha(funcionario.pk)[0], 3)
+
+    def test_post_save_ve_a_versao_gravada(self):
+        funcionario = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+        vistas = []
+
+        def receiver(sender, instance, **kwargs):
+            vistas.append(instance.versao)
+
+        post_save.connect(receiver, sender=Funcionario)
+        try:
+            funcionario.save()
+        finally:
+            post_save.disconnect(receiver, sender=Funcionario)
+
+        self.assertEqual(vistas, [2])
+
+
+class ConexaoFalsa:
+    def __init__(self, viva=True):
+        self.viva = viva
+        self.fechada = False
+
+    def ping(self, reconnect=True):
+        if not self.viva:
+            raise OSError("conexão caída")
+
+    def close(self):
+        self.fechada = True
+
+
+class PoolTests(SimpleTestCase):
+    def setUp(self):
+        self.abertas = []
+
+    def tearDown(self):
+        for alias in [a for a in pools._pools if a.startswith('teste')]:
+            del pools._pools[alias]
+
+    def criar(self):
+        conexao = ConexaoFalsa()
+        self.abertas.append(conexao)
+        return conexao
+
+    def test_devolvida_e_reaproveitada(self):
+        pool = pools.Pool('teste', self.criar, maximo=2)
+
+        conexao, reaproveitada = pool.emprestar()
+        self.assertFalse(reaproveitada)
+        pool.devolver(conexao)
+        de_novo, reaproveitada = pool.emprestar()
+
+        self.assertIs(de_novo, conexao)
+        self.assertTrue(reaproveitada)
+        self.assertEqual(len(self.abertas), 1)
+
+    def test_ping_descarta_a_que_caiu(self):
+        pool = pools.Pool('teste', self.criar, ping_apos=0)
+        conexao, _ = pool.emprestar()
+        pool.devolver(conexao)
+        conexao.viva = False
+
+        nova, reaproveitada = pool.emprestar()
+
+        self.assertIsNot(nova, conexao)
+        self.assertFalse(reaproveitada)
+        self.assertTrue(conexao.fechada)
+        self.assertEqual(pool.eventos['pings_falhos'], 1)
+
+    def test_esgotado(self):
+        pool = pools.Pool('teste', self.criar, maximo=1, espera=0)
+        pool.emprestar()
+
+        with self.assertRaises(RuntimeError):
+            pool.emprestar()
+        self.assertEqual(pool.estatisticas()['esgotamentos'], 1)
+
+    def test_descartada_apos_erro(self):
+        pool = pools.Pool('teste', self.criar)
+        conexao, _ = pool.emprestar()
+
+        pool.devolver(conexao, descartar=True)
+
+        self.assertTrue(conexao.fechada)
+        self.assertEqual(pool.estatisticas()['ociosas'], 0)
+
+    def test_troca_de_banco_refaz_o_pool(self):
+        producao = pools.do_alias('teste', self.criar, {}, destino=('db', None, 3306, 'app', 'controle'))
+        ociosa, _ = producao.emprestar()
+        em_uso, _ = producao.emprestar()
+        producao.devolver(ociosa)
+
+        # O test runner troca o NAME do alias para o banco de teste
+        teste = pools.do_alias('teste', self.criar, {}, destino=('db', None, 3306, 'app', 'test_controle'))
+
+        self.assertIsNot(teste, producao)
+        self.assertIs(pools.do_alias('teste', None, {}), teste)
+        self.assertTrue(ociosa.fechada)
+        conexao, reaproveitada = teste.emprestar()
+        self.assertFalse(reaproveitada)
+        self.assertNotIn(conexao, (ociosa, em_uso))
+        # A que estava em uso volta para o pool antigo e é fechada, não reaproveitada
+        producao.devolver(em_uso)
+        self.assertTrue(em_uso.fechada)
+        self.assertEqual(producao.estatisticas()['ociosas'], 0)
+
+    def test_mesmo_destino_mesmo_pool(self):
+        destino = ('db', None, 3306, 'app', 'controle')
+
+        self.assertIs(pools.do_alias('teste', self.criar, {}, destino=destino),
+                      pools.do_alias('teste', self.criar, {}, destino=destino))
+
+    def test_backend_separa_os_pools_pelo_nome_do_banco(self):
+        from .db.mysql import base
+
+        wrapper = base.DatabaseWrapper({**connections.settings['default'], 'POOL': {}}, alias='teste_mysql')
+        parametros = {'host': 'db', 'port': 3306, 'user': 'app', 'database': 'controle'}
+
+        with mock.patch.object(base, '_conectar', lambda conn_params: ConexaoFalsa()):
+            producao = wrapper.get_new_connection(parametros)
+            wrapper._pool.devolver(producao)
+            teste = wrapper.get_new_connection({**parametros, 'database': 'test_controle'})
+
+        self.assertIsNot(teste, producao)
+        self.assertEqual(wrapper._pool.destino, ('db', None, 3306, 'app', 'test_controle'))
+        self.assertTrue(producao.fechada)
+
+
+class MetricasTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        configuracao = override_settings(METRICAS_DIR=self.pasta, METRICAS_RETENCAO=0)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def morto(self, pid, valor):
+        caminho = os.path.join(self.pasta, f'metricas-{pid}-1.json')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump({
+                'pid': pid, 'inicio': 1, 'medidores': {},
+                'contadores': {'controle_teste_total': {'[]': valor}},
+                'histogramas': {'controle_teste_segundos': {'[]': {'limites': [1], 'buckets': [valor, 0], 'soma': valor, 'total': valor}}},
+            }, f)
+        return caminho
+
+    def total(self):
+        contadores, histogramas, _ = metricas.agregar()
+        return contadores['controle_teste_total']['[]'], histogramas['controle_teste_segundos']['[]']['total']
+
+    def test_contador_de_processo_morto_nao_diminui(self):
+        with mock.patch.object(metricas, '_vivo', lambda pid, inicio=None: pid == os.getpid()):
+            primeiro = self.morto(999991, 5)
+            self.assertEqual(self.total(), (5, 5))
+            self.assertFalse(os.path.exists(primeiro))
+
+            self.morto(999992, 2)
+            self.assertEqual(self.total(), (7, 7))
+            self.assertEqual(self.total(), (7, 7))
+
+    def test_arquivo_ja_incorporado_nao_soma_de_novo(self):
+        caminho = self.morto(999991, 5)
+        with open(os.path.join(self.pasta, 'acumulado.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'contadores': {'controle_teste_total': {'[]': 5}},
+                'histogramas': {},
+                'incorporados': [os.path.basename(caminho)],
+            }, f)
+
+        with mock.patch.object(metricas, '_vivo', lambda pid, inicio=None: pid == os.getpid()):
+            contadores, _, _ = metricas.agregar()
+
+        self.assertEqual(contadores['controle_teste_total']['[]'], 5)
+        self.assertFalse(os.path.exists(caminho))
+
+    def test_pid_reaproveitado_nao_e_o_mesmo_processo(self):
+        pid, inicio = metricas._identidade()
+        if metricas._inicio(pid) is None:
+            self.skipTest("sem /proc para ler o início do processo")
+
+        self.assertTrue(metricas._vivo(pid, inicio))
+        self.assertFalse(metricas._vivo(pid, inicio - 1))
+
+
+class RecursosExternosTests(SimpleTestCase):
+    def verificar(self, html):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'pagina.html')
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(html)
+            with mock.patch.object(checks, '_templates_do_projeto', lambda: [caminho]):
+                return [erro.id for erro in checks.verificar_recursos_externos(None)]
+
+    def test_todo_recurso_externo_e_avisado(self):
+        self.assertEqual(self.verificar(
+            '<script src="https://code.jquery.com/jquery-3.7.1.min.js"></script>\n'
+            '<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/tom-select@2.2.2/dist/css/tom-select.bootstrap5.min.css">\n'
+            '<link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Inter">\n'
+            '<a href="https://exemplo.com/">link</a>\n'
+        ), ['core.E001', 'core.W001', 'core.W001'])
+
+    def test_static_nao_e_avisado(self):
+        self.assertEqual(self.verificar("<script src=\"{% static 'vendor/jquery-3.7.1/jquery.min.js' %}\"></script>"), [])
+
+
+class EventosDashboardTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user('operador')
+        self.client.force_login(self.usuario)
+        self.url = reverse('eventos_dashboard')
+
+    def test_wsgi_nao_abre_o_stream(self):
+        resposta = self.client.get(self.url, {'canais': 'dispositivos'})
+
+        self.assertEqual(resposta.status_code, 204)
+
+    def test_asgi_abre_o_stream(self):
+        self.async_client.force_login(self.usuario)
+
+        resposta = async_to_sync(self.async_client.get)(self.url, {'canais': 'dispositivos'})
+
+        self.assertTrue(resposta.streaming)
+        self.assertEqual(resposta['Content-Type'], 'text/event-stream')
+
+    def test_polling_em_json_com_etag(self):
+        Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+
+        resposta = self.client.get(self.url, {'canais': 'dispositivos,estoque', 'formato': 'json'})
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['dispositivos']['disponiveis'], 1)
+        self.assertIn('estoque', resposta.json())
+        repetida = self.client.get(self.url, {'canais': 'dispositivos,estoque', 'formato': 'json'},
+                                   HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+    def test_canal_invalido(self):
+        self.assertEqual(self.client.get(self.url, {'canais': 'nada'}).status_code, 400)
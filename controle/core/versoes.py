@@ -0,0 +1,62 @@
+"""
+Versão dos dados de cada model, guardada no cache compartilhado.
+
+Todo post_save/post_delete troca o token do model (ver os signals.py de cada app).
+Quem depende desses dados (stream dos dashboards, ETag do polling) compara o token
+em vez de consultar o banco.
+
+O token é aleatório, e não um contador: com o cache em arquivo, dois processos
+gravando ao mesmo tempo ainda geram um valor diferente do anterior.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+PREFIXO = 'versao:'
+
+
+def _chave(label):
+    return f'{PREFIXO}{label}'
+
+
+def _novo_token():
+    return uuid.uuid4().hex[:16]
+
+
+def invalidar(*labels):
+    """Troca a versão dos models informados (ex.: 'dispositivos.Dispositivo')."""
+    # Só publica depois do commit, senão quem ler a versão nova pode ver os dados antigos
+    transaction.on_commit(
+        lambda: cache.set_many({_chave(label): _novo_token() for label in labels}, timeout=None)
+    )
+
+
+def _completar(labels, valores):
+    tokens = {}
+    for label in labels:
+        token = valores.get(_chave(label))
+        if token is None:
+            # Primeira leitura (ou cache limpo): cria uma versão; add() não sobrescreve outro processo
+            cache.add(_chave(label), _novo_token(), timeout=None)
+            token = cache.get(_chave(label))
+        tokens[label] = token
+    return tokens
+
+
+def obter(*labels):
+    """Tokens atuais: {label: token}."""
+    return _completar(labels, cache.get_many([_chave(label) for label in labels]))
+
+
+async def aobter(*labels):
+    valores = await cache.aget_many([_chave(label) for label in labels])
+    if all(_chave(label) in valores for label in labels):
+        return {label: valores[_chave(label)] for label in labels}
+    return _completar(labels, valores)
+
+
+def combinar(tokens):
+    """Junta os tokens de vários models numa versão única (usada como ETag)."""
+    return '-'.join(tokens[label] for label in sorted(tokens))
+
@@ -1,6 +1,147 @@
+from datetime import timedelta
+
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date
+
+from . import busca, eventos, importacao, metricas, respostas, versoes
+from .condicional import assinatura, condicional
+from .models import SnapshotInventario
+from .replica import somente_leitura
+
+# Período máximo de uma consulta ao histórico do inventário
+HISTORICO_MAXIMO_DIAS = 3 * 366
 
 @login_required
 def home(request):
-    return render(request, 'core/home.html') # ou 'core/home.html' dependendo da sua pasta
\ No newline at end of file
+    return render(request, 'core/home.html') # ou 'core/home.html' dependendo da sua pasta
+
+
+def _canais(request):
+    return [c for c in request.GET.get('canais', '').split(',') if c in eventos.CANAIS]
+
+
+async def _versao_eventos(request):
+    # Só o modo JSON (polling) é condicional; o stream não tem o que comparar
+    canais = _canais(request)
+    if request.GET.get('formato') != 'json' or not canais:
+        return None
+    labels = [label for canal in canais for label in eventos.CANAIS[canal][0]]
+    return assinatura(versoes.combinar(await versoes.aobter(*labels)), canais), None
+
+
+@login_required
+@condicional(_versao_eventos)
+async def eventos_dashboard(request):
+    """
+    Server-Sent Events dos dashboards (?canais=dispositivos,estoque).
+    Precisa rodar sob ASGI (controle/asgi.py): a sessão e o usuário são lidos
+    uma única vez, na abertura da conexão.
+
+    Com ?formato=json devolve os dados completos dos canais uma vez (com ETag/304):
+    é o polling das páginas quando o stream não está disponível.
+    """
+    canais = _canais(request)
+    if not canais:
+        return HttpResponseBadRequest("Informe ao menos um canal válido.")
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(await eventos.snapshot(canais))
+    if not isinstance(request, ASGIRequest):
+        # Sob WSGI o StreamingHttpResponse consumiria o gerador infinito inteiro antes de
+        # responder, prendendo o worker. 204 faz o EventSource desistir; a página volta ao polling
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(eventos.stream(canais), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx não deve segurar os eventos
+    return response
+
+
+@login_required
+def busca_global(request):
+    """
+    API de busca: /api/busca/?q=termo&limite=10&tipos=DISPOSITIVO,FUNCIONARIO
+    Devolve os melhores resultados já ranqueados.
+    """
+    termo = (request.GET.get('q') or '').strip()
+    tipos = [t for t in request.GET.get('tipos', '').split(',') if t in busca.CAMPOS] or None
+    try:
+        limite = min(max(int(request.GET.get('limite', 10)), 1), 50)
+    except ValueError:
+        limite = 10
+
+    return JsonResponse({'termo': termo, 'resultados': busca.buscar(termo, tipos, limite)})
+
+
+def _versao_historico_inventario(request):
+    # Os snapshots só mudam quando o comando roda: a versão vem do cache, sem banco
+    return assinatura(versoes.obter(SnapshotInventario._meta.label), request.GET.urlencode()), None
+
+
+@login_required
+@somente_leitura
+@condicional(_versao_historico_inventario)
+def historico_inventario(request):
+    """
+    Séries diárias do inventário para os gráficos de tendência:
+    /api/inventario/historico/?inicio=2026-01-01&fim=2026-06-30&unidade=ITAPEVI&tipo=NOTEBOOK&status=ATIVO
+    Sem datas, os últimos 90 dias. Lê só os snapshots (python manage.py gerar_snapshots_inventario).
+    """
+    try:
+        fim = parse_date(request.GET['fim']) if request.GET.get('fim') else timezone.localdate()
+        inicio = parse_date(request.GET['inicio']) if request.GET.get('inicio') else fim and fim - timedelta(days=89)
+    except ValueError:  # formato certo, data inexistente (2026-02-30)
+        inicio = fim = None
+    if inicio is None or fim is None:
+        return HttpResponseBadRequest("Datas no formato AAAA-MM-DD.")
+    if inicio > fim or (fim - inicio).days >= HISTORICO_MAXIMO_DIAS:
+        return HttpResponseBadRequest(f"Período inválido: início antes do fim e no máximo {HISTORICO_MAXIMO_DIAS} dias.")
+    filtros = (request.GET.get('unidade'), request.GET.get('tipo'), request.GET.get('status'))
+
+    series = respostas.obter(
+        'historico_inventario', [SnapshotInventario._meta.label], (inicio, fim, *filtros),
+        lambda: SnapshotInventario.series(inicio, fim, *filtros),
+    )
+    return JsonResponse({'inicio': inicio.isoformat(), 'fim': fim.isoformat(), 'series': series})
+
+
+@login_required
+def importar_dados(request):
+    """
+    Tela de importação em massa (CSV/XLSX). Mesma rotina do comando
+    `python manage.py importar_dados`; no fim mostra o relatório por linha.
+    """
+    contexto = {'tipo_atual': request.POST.get('tipo', 'funcionarios')}
+
+    if request.method == "POST":
+        arquivo = request.FILES.get('arquivo')
+        tipo = request.POST.get('tipo')
+        if tipo not in importacao.IMPORTADORES or not arquivo:
+            contexto['erro'] = "Escolha o tipo e o arquivo (.csv ou .xlsx)."
+        else:
+            relatorio = importacao.importar(tipo, arquivo, arquivo.name)
+            contexto.update({
+                'relatorio': relatorio,
+                'erros': relatorio.erros[:200],
+                'relatorio_csv': relatorio.como_csv() if relatorio.erros else '',
+            })
+
+    return render(request, 'core/importar.html', contexto)
+
+
+def metricas_prometheus(request):
+    """
+    /metrics no formato texto do Prometheus. Não usa sessão nem banco: a proteção,
+    se necessária, é o METRICAS_TOKEN (header "Authorization: Bearer <token>").
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+
+    return HttpResponse(metricas.exposicao(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class DispositivosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dispositivos'
+
+    def ready(self):
+        # Registra os receivers (contadores do dashboard e versões)
+        from . import signals  # noqa: F401
+        from core import eventos
+        from .models import ContadorDispositivo
+
+        # Canal do stream do dashboard de notebooks
+        eventos.registrar_canal(
+            'dispositivos',
+            ['dispositivos.Dispositivo'],
+            lambda: ContadorDispositivo.resumo('NOTEBOOK'),
+        )
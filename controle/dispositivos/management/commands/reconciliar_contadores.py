@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from dispositivos.models import ContadorDispositivo
+
+
+class Command(BaseCommand):
+    help = "Recalcula os contadores (tipo, status) dos dispositivos e informa qualquer divergência."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--somente-verificar',
+            action='store_true',
+            help="Apenas mostra as divergências, sem reescrever os contadores.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Trava os contadores para que nenhuma transição aconteça no meio da reconciliação
+            atuais = {
+                (c.tipo_dispositivo, c.status): c.quantidade
+                for c in ContadorDispositivo.objects.select_for_update()
+            }
+            reais = ContadorDispositivo.contagem_real()
+
+            divergencias = []
+            for chave in sorted(set(atuais) | set(reais)):
+                esperado = reais.get(chave, 0)
+                registrado = atuais.get(chave, 0)
+                if esperado != registrado:
+                    divergencias.append((chave, registrado, esperado))
+
+            for (tipo, status), registrado, esperado in divergencias:
+                self.stdout.write(self.style.WARNING(
+                    f"{tipo}/{status}: contador={registrado} real={esperado} (diferença {registrado - esperado:+d})"
+                ))
+
+            if not divergencias:
+                self.stdout.write(self.style.SUCCESS("Contadores conferem com a tabela de dispositivos."))
+                return
+
+            if options['somente_verificar']:
+                self.stdout.write(f"{len(divergencias)} divergência(s) encontrada(s). Nada foi alterado.")
+                return
+
+            ContadorDispositivo.objects.all().delete()
+            ContadorDispositivo.objects.bulk_create([
+                ContadorDispositivo(tipo_dispositivo=tipo, status=status, quantidade=qtd)
+                for (tipo, status), qtd in reais.items()
+            ])
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(divergencias)} divergência(s) corrigida(s). Contadores reconstruídos."
+            ))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+def popular_contadores(apps, schema_editor):
+    Dispositivo = apps.get_model('dispositivos', 'Dispositivo')
+    ContadorDispositivo = apps.get_model('dispositivos', 'ContadorDispositivo')
+
+    linhas = Dispositivo.objects.order_by().values('tipo_dispositivo', 'status').annotate(qtd=models.Count('id'))
+    ContadorDispositivo.objects.bulk_create([
+        ContadorDispositivo(tipo_dispositivo=l['tipo_dispositivo'], status=l['status'], quantidade=l['qtd'])
+        for l in linhas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dispositivos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorDispositivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_dispositivo', models.CharField(choices=[('NOTEBOOK', 'Notebook'), ('COLETOR', 'Coletor'), ('IMPRESSORA', 'Impressora')], max_length=20)),
+                ('status', models.CharField(choices=[('DISPONIVEL', 'Disponível'), ('ATIVO', 'Ativo'), ('MANUTENCAO', 'Em manutenção')], max_length=20)),
+                ('quantidade', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador de Dispositivos',
+                'verbose_name_plural': 'Contadores de Dispositivos',
+                'constraints': [models.UniqueConstraint(fields=('tipo_dispositivo', 'status'), name='contador_tipo_status_unico')],
+            },
+        ),
+        migrations.RunPython(popular_contadores, migrations.RunPython.noop),
+    ]
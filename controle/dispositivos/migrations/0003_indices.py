@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dispositivos', '0002_contadordispositivo'),
+        ('funcionarios', '0005_historico_funcionario_data'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dispositivo',
+            index=models.Index(fields=['status', 'codigo'], name='dispositivo_status_codigo'),
+        ),
+        migrations.AddIndex(
+            model_name='dispositivo',
+            index=models.Index(fields=['tipo_dispositivo', 'status'], name='dispositivo_tipo_status'),
+        ),
+        migrations.AddIndex(
+            model_name='manutencaodispositivo',
+            index=models.Index(fields=['dispositivo', 'data_fim'], name='manutencao_dispositivo_fim'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dispositivos', '0003_indices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dispositivo',
+            name='atualizado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='dispositivo',
+            name='versao',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='manutencaodispositivo',
+            name='atualizado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='manutencaodispositivo',
+            name='versao',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.utils import timezone 
 
+from core.models import Versionado
+
 # As opções permanecem as mesmas
 STATUS_CHOICES = [
     ('DISPONIVEL', 'Disponível'),
@@ -14,7 +17,11 @@ TIPO_DISPOSITIVO_CHOICES = [
     ('IMPRESSORA', 'Impressora'),
 ]
 
-class Dispositivo(models.Model):
+# Marca de "dono não lido do banco" (None é um valor válido: sem dono)
+_NAO_LIDO = object()
+
+
+class Dispositivo(Versionado):
     codigo = models.CharField(max_length=50, unique=True)
     tipo_dispositivo = models.CharField(max_length=20, choices=TIPO_DISPOSITIVO_CHOICES)
     
@@ -33,10 +40,62 @@ class Dispositivo(models.Model):
 
     class Meta:
         ordering = ['codigo']
+        indexes = [
+            # Listagem filtrada por status, já na ordem da paginação (codigo)
+            models.Index(fields=['status', 'codigo'], name='dispositivo_status_codigo'),
+            # Contagem por tipo e status (reconciliação dos contadores, dashboards)
+            models.Index(fields=['tipo_dispositivo', 'status'], name='dispositivo_tipo_status'),
+        ]
 
     def __str__(self):
         return f"{self.codigo} - {self.get_tipo_dispositivo_display()}"
 
+    # ---------------------
+    # CONTADORES DO DASHBOARD
+    # ---------------------
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda a chave (tipo, status) lida do banco para saber qual contador mexer no save()
+        if 'tipo_dispositivo' in field_names and 'status' in field_names:
+            instance._chave_contador = (instance.tipo_dispositivo, instance.status)
+        # E o dono lido, para registrar a troca no livro de atribuições
+        if 'funcionario_id' in field_names:
+            instance._funcionario_lido = instance.funcionario_id
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'funcionario' in fields or 'funcionario_id' in fields:
+            self._funcionario_lido = self.funcionario_id
+
+    def save(self, *args, **kwargs):
+        from funcionarios.models import AtribuicaoAtivo
+
+        chave_antiga = funcionario_antigo = None
+        if not self._state.adding:
+            chave_antiga = getattr(self, '_chave_contador', None)
+            funcionario_antigo = getattr(self, '_funcionario_lido', _NAO_LIDO)
+            if chave_antiga is None or funcionario_antigo is _NAO_LIDO:
+                # Instância carregada com .only()/.defer(): busca o estado atual no banco
+                atual = Dispositivo.objects.filter(pk=self.pk).values_list(
+                    'tipo_dispositivo', 'status', 'funcionario_id'
+                ).first()
+                chave_antiga, funcionario_antigo = (atual[:2], atual[2]) if atual else (None, None)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            chave_nova = (self.tipo_dispositivo, self.status)
+            if chave_antiga != chave_nova:
+                if chave_antiga:
+                    ContadorDispositivo.ajustar(*chave_antiga, -1)
+                ContadorDispositivo.ajustar(*chave_nova, 1)
+            AtribuicaoAtivo.trocar('DISPOSITIVO', self.pk, self.codigo, funcionario_antigo, self.funcionario_id)
+
+        self._chave_contador = chave_nova
+        self._funcionario_lido = self.funcionario_id
+
     # Propriedade para acessar os equipamentos auxiliares deste dispositivo
     # Isso requer que no model EquipamentoAuxiliar o ForeignKey aponte para 'dispositivo'
     @property
@@ -91,15 +150,116 @@ class Dispositivo(models.Model):
                 manut.save()
 
 
-class ManutencaoDispositivo(models.Model):
+class ManutencaoDispositivo(Versionado):
     dispositivo = models.ForeignKey(Dispositivo, on_delete=models.CASCADE)
     data_inicio = models.DateTimeField()
     data_fim = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-data_inicio']
+        indexes = [
+            # Manutenção em aberto de um dispositivo (data_fim nula)
+            models.Index(fields=['dispositivo', 'data_fim'], name='manutencao_dispositivo_fim'),
+        ]
         verbose_name = "Manutenção de Dispositivo"
         verbose_name_plural = "Manutenções de Dispositivos"
 
     def __str__(self):
-        return f"Manutenção {self.dispositivo.codigo} - {self.data_inicio.strftime('%d/%m/%Y %H:%M')}"
\ No newline at end of file
+        return f"Manutenção {self.dispositivo.codigo} - {self.data_inicio.strftime('%d/%m/%Y %H:%M')}"
+
+
+class ContadorDispositivo(models.Model):
+    """
+    Quantidade de dispositivos por (tipo, status), mantida a cada transição.
+    Os dashboards leem daqui em vez de rodar COUNT sobre a tabela inteira.
+    Se houver divergência, rode: python manage.py reconciliar_contadores
+    """
+    tipo_dispositivo = models.CharField(max_length=20, choices=TIPO_DISPOSITIVO_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    quantidade = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tipo_dispositivo', 'status'], name='contador_tipo_status_unico'),
+        ]
+        verbose_name = "Contador de Dispositivos"
+        verbose_name_plural = "Contadores de Dispositivos"
+
+    def __str__(self):
+        return f"{self.tipo_dispositivo}/{self.status}: {self.quantidade}"
+
+    @classmethod
+    def ajustar(cls, tipo_dispositivo, status, delta):
+        """Soma `delta` ao contador com um UPDATE atômico (cria a linha se ainda não existir)."""
+        if not delta:
+            return
+        filtro = cls.objects.filter(tipo_dispositivo=tipo_dispositivo, status=status)
+        if filtro.update(quantidade=F('quantidade') + delta):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(tipo_dispositivo=tipo_dispositivo, status=status, quantidade=delta)
+        except IntegrityError:
+            # Outra requisição criou a linha ao mesmo tempo
+            filtro.update(quantidade=F('quantidade') + delta)
+
+    @classmethod
+    def ajustar_varios(cls, deltas):
+        """Aplica vários ajustes de uma vez: {(tipo, status): delta}."""
+        for (tipo_dispositivo, status), delta in deltas.items():
+            cls.ajustar(tipo_dispositivo, status, delta)
+
+    @classmethod
+    def resumo(cls, tipo_dispositivo):
+        """Totais de um tipo no formato usado pelos dashboards."""
+        por_status = dict(
+            cls.objects.filter(tipo_dispositivo=tipo_dispositivo).values_list('status', 'quantidade')
+        )
+        return cls._resumo(por_status)
+
+    @classmethod
+    async def aresumo(cls, tipo_dispositivo):
+        por_status = {
+            status: quantidade
+            async for status, quantidade in cls.objects.filter(
+                tipo_dispositivo=tipo_dispositivo
+            ).values_list('status', 'quantidade')
+        }
+        return cls._resumo(por_status)
+
+    @staticmethod
+    def _resumo(por_status):
+        dados = {
+            'ativos': por_status.get('ATIVO', 0),
+            'disponiveis': por_status.get('DISPONIVEL', 0),
+            'manutencao': por_status.get('MANUTENCAO', 0),
+        }
+        dados['total'] = sum(por_status.values())
+        return dados
+
+    @classmethod
+    def total(cls, status=None):
+        """Total de dispositivos (opcionalmente de um status) sem contar a tabela."""
+        qs = cls.objects.all()
+        if status:
+            qs = qs.filter(status=status)
+        return qs.aggregate(total=models.Sum('quantidade'))['total'] or 0
+
+    @classmethod
+    def por_tipo(cls):
+        """Total por tipo de dispositivo, do maior para o menor."""
+        totais = {}
+        for tipo, quantidade in cls.objects.values_list('tipo_dispositivo', 'quantidade'):
+            totais[tipo] = totais.get(tipo, 0) + quantidade
+        return sorted(
+            ({'tipo_dispositivo': tipo, 'qtd': qtd} for tipo, qtd in totais.items() if qtd),
+            key=lambda item: -item['qtd']
+        )
+
+    @classmethod
+    def contagem_real(cls):
+        """Recalcula a partir da tabela de dispositivos (usado só na reconciliação)."""
+        linhas = Dispositivo.objects.order_by().values('tipo_dispositivo', 'status').annotate(
+            qtd=models.Count('id')
+        )
+        return {(l['tipo_dispositivo'], l['status']): l['qtd'] for l in linhas}
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import busca, versoes
+from funcionarios.models import AtribuicaoAtivo
+
+from .models import ContadorDispositivo, Dispositivo
+
+
+@receiver(post_delete, sender=Dispositivo)
+def descontar_dispositivo_removido(sender, instance, **kwargs):
+    # Cobre tanto dispositivo.delete() quanto exclusões em lote via queryset
+    chave = getattr(instance, '_chave_contador', None) or (instance.tipo_dispositivo, instance.status)
+    ContadorDispositivo.ajustar(*chave, -1)
+
+
+@receiver([post_save, post_delete], sender=Dispositivo)
+def invalidar_versao_dispositivo(sender, **kwargs):
+    # Avisa o stream dos dashboards (core.eventos) e o ETag do polling
+    versoes.invalidar(sender._meta.label)
+
+
+@receiver(post_save, sender=Dispositivo)
+def indexar_dispositivo(sender, instance, **kwargs):
+    # Mantém o índice de trigramas da busca (core.busca)
+    busca.indexar('DISPOSITIVO', instance)
+
+
+@receiver(post_delete, sender=Dispositivo)
+def remover_dispositivo_do_indice(sender, instance, **kwargs):
+    busca.remover('DISPOSITIVO', instance.pk)
+
+
+@receiver(post_delete, sender=Dispositivo)
+def encerrar_atribuicao_dispositivo(sender, instance, **kwargs):
+    # O livro de atribuições guarda o intervalo mesmo depois que o item deixa de existir
+    if instance.funcionario_id:
+        AtribuicaoAtivo.encerrar('DISPOSITIVO', [instance.pk])
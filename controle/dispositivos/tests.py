@@ -1,3 +1,115 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from funcionarios.models import Funcionario
+
+from .models import ContadorDispositivo, Dispositivo
+
+
+class ContadorDispositivoTests(TestCase):
+    def contador(self, tipo, status):
+        linha = ContadorDispositivo.objects.filter(tipo_dispositivo=tipo, status=status).first()
+        return linha.quantidade if linha else 0
+
+    def test_criar_conta_no_tipo_e_status(self):
+        Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        Dispositivo.objects.create(codigo='NB-2', tipo_dispositivo='NOTEBOOK')
+        Dispositivo.objects.create(codigo='CL-1', tipo_dispositivo='COLETOR')
+
+        self.assertEqual(self.contador('NOTEBOOK', 'DISPONIVEL'), 2)
+        self.assertEqual(self.contador('COLETOR', 'DISPONIVEL'), 1)
+
+    def test_transicoes_movem_o_contador(self):
+        funcionario = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+        dispositivo = Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+
+        dispositivo.vincular(funcionario)
+        self.assertEqual(self.contador('NOTEBOOK', 'DISPONIVEL'), 0)
+        self.assertEqual(self.contador('NOTEBOOK', 'ATIVO'), 1)
+
+        dispositivo.enviar_manutencao()
+        self.assertEqual(self.contador('NOTEBOOK', 'ATIVO'), 0)
+        self.assertEqual(self.contador('NOTEBOOK', 'MANUTENCAO'), 1)
+
+        dispositivo.retornar_da_manutencao()
+        self.assertEqual(self.contador('NOTEBOOK', 'MANUTENCAO'), 0)
+        self.assertEqual(self.contador('NOTEBOOK', 'ATIVO'), 1)
+
+        dispositivo.desvincular()
+        self.assertEqual(self.contador('NOTEBOOK', 'ATIVO'), 0)
+        self.assertEqual(self.contador('NOTEBOOK', 'DISPONIVEL'), 1)
+
+    def test_save_sem_mudanca_nao_mexe_no_contador(self):
+        dispositivo = Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        dispositivo.codigo = 'NB-1A'
+        dispositivo.save()
+
+        self.assertEqual(self.contador('NOTEBOOK', 'DISPONIVEL'), 1)
+
+    def test_instancia_parcial_le_o_estado_do_banco(self):
+        Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        dispositivo = Dispositivo.objects.only('codigo').get(codigo='NB-1')
+        dispositivo.status = 'MANUTENCAO'
+        dispositivo.save()
+
+        self.assertEqual(self.contador('NOTEBOOK', 'DISPONIVEL'), 0)
+        self.assertEqual(self.contador('NOTEBOOK', 'MANUTENCAO'), 1)
+
+    def test_exclusao_desconta(self):
+        Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        Dispositivo.objects.create(codigo='NB-2', tipo_dispositivo='NOTEBOOK')
+
+        Dispositivo.objects.get(codigo='NB-1').delete()
+        self.assertEqual(self.contador('NOTEBOOK', 'DISPONIVEL'), 1)
+
+        # Exclusão em lote também passa pelo post_delete
+        Dispositivo.objects.all().delete()
+        self.assertEqual(self.contador('NOTEBOOK', 'DISPONIVEL'), 0)
+
+    def test_resumo(self):
+        Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        Dispositivo.objects.create(codigo='NB-2', tipo_dispositivo='NOTEBOOK', status='MANUTENCAO')
+
+        self.assertEqual(
+            ContadorDispositivo.resumo('NOTEBOOK'),
+            {'ativos': 0, 'disponiveis': 1, 'manutencao': 1, 'total': 2},
+        )
+
+
+class ReconciliarContadoresTests(TestCase):
+    def reconciliar(self, *args):
+        saida = StringIO()
+        call_command('reconciliar_contadores', *args, stdout=saida)
+        return saida.getvalue()
+
+    def test_sem_divergencia(self):
+        Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+
+        self.assertIn("conferem", self.reconciliar())
+
+    def test_corrige_divergencia(self):
+        Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        # UPDATE em lote não passa pelo save(): o contador fica para trás
+        Dispositivo.objects.update(status='ATIVO')
+
+        saida = self.reconciliar()
+
+        self.assertIn("2 divergência(s) corrigida(s)", saida)
+        self.assertEqual(ContadorDispositivo.contagem_real(), {('NOTEBOOK', 'ATIVO'): 1})
+        self.assertEqual(
+            dict(ContadorDispositivo.objects.filter(quantidade__gt=0).values_list('status', 'quantidade')),
+            {'ATIVO': 1},
+        )
+
+    def test_somente_verificar_nao_altera(self):
+        Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        Dispositivo.objects.update(status='ATIVO')
+
+        saida = self.reconciliar('--somente-verificar')
+
+        self.assertIn("Nada foi alterado", saida)
+        self.assertEqual(
+            ContadorDispositivo.objects.get(tipo_dispositivo='NOTEBOOK', status='DISPONIVEL').quantidade, 1
+        )
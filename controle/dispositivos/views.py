@@ -1,49 +1,82 @@
 import csv
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponse
-from django.db.models import Count, Q 
-from django.core.paginator import Paginator # <--- IMPORTANTE: Import do Paginator adicionado
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core import busca as indice_busca, respostas, versoes
+from core.condicional import assinatura, condicional
+from core.paginacao import paginar_por_cursor
+from core.replica import somente_leitura
 
 # Importa os models locais
-from .models import Dispositivo, STATUS_CHOICES, TIPO_DISPOSITIVO_CHOICES
+from .models import ContadorDispositivo, Dispositivo, STATUS_CHOICES, TIPO_DISPOSITIVO_CHOICES
 
-# Importa o model de Funcionários
-from funcionarios.models import Funcionario
+from equipamentos.models import EquipamentoAuxiliar
 
-@login_required
-def listar_dispositivos(request):
-    # 1. Inicia a busca básica otimizada
-    queryset = Dispositivo.objects.select_related('funcionario').all().order_by('codigo')
-    
-    # 2. LÓGICA DE BUSCA (NOVA)
-    # Pega o termo digitado na URL (ex: ?busca=NB-001)
+# Quantos dispositivos são lidos do banco por vez na exportação em CSV
+EXPORTACAO_TAMANHO_LOTE = 500
+
+def _filtrar_dispositivos(request, queryset):
+    """
+    Aplica os filtros da tela (?busca= e ?status=). Usado pela listagem e pela
+    exportação, para que o CSV traga exatamente o que o operador está vendo.
+    """
     busca = request.GET.get('busca')
     status_filter = request.GET.get('status')
     
-    # Filtra por texto
+    # Filtra por texto (índice de trigramas em vez de LIKE '%termo%')
     if busca:
-        queryset = queryset.filter(
-            Q(codigo__icontains=busca) | 
-            Q(funcionario__nome__icontains=busca)
-        )
+        do_dispositivo = indice_busca.filtro('DISPOSITIVO', busca)
+        if do_dispositivo is None:
+            # Termo curto demais para trigramas: busca por prefixo. Código e funcionário
+            # viram um UNION de ids (cada parte lê o índice da sua coluna) em vez de um
+            # OR entre colunas e através do join, que varreria a tabela
+            do_funcionario = Dispositivo.objects.filter(
+                funcionario__in=indice_busca.prefixo('FUNCIONARIO', busca)
+            ).order_by().values('pk')
+            queryset = queryset.filter(pk__in=indice_busca.prefixo('DISPOSITIVO', busca).union(do_funcionario))
+        else:
+            queryset = queryset.filter(do_dispositivo | indice_busca.filtro('FUNCIONARIO', busca, 'funcionario__'))
     
     # Filtra por status
     if status_filter:
         queryset = queryset.filter(status=status_filter)
+
+    return queryset, busca, status_filter
+
+@login_required
+@somente_leitura
+def listar_dispositivos(request):
+    # 1. Inicia a busca básica otimizada
+    queryset = Dispositivo.objects.select_related('funcionario').all().order_by('codigo')
+
+    # Quantidade de equipamentos auxiliares de cada linha (subquery correlacionada, sem GROUP BY na listagem)
+    qtd_itens = EquipamentoAuxiliar.objects.filter(dispositivo=OuterRef('pk')).order_by().values(
+        'dispositivo'
+    ).annotate(qtd=Count('id')).values('qtd')
+    queryset = queryset.annotate(qtd_itens=Coalesce(Subquery(qtd_itens, output_field=IntegerField()), 0))
     
-    # 3. Paginação (Aplica o paginator SOBRE o resultado filtrado)
-    paginator = Paginator(queryset, 20) 
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # 2. LÓGICA DE BUSCA
+    # Pega o termo digitado na URL (ex: ?busca=NB-001)
+    queryset, busca, status_filter = _filtrar_dispositivos(request, queryset)
     
-    funcionarios = Funcionario.objects.filter(status='ATIVO').order_by('nome')
+    # 3. Paginação por cursor (sem COUNT nem OFFSET): cada página é uma leitura no índice de 'codigo'
+    # O total só é exibido quando sai de graça dos contadores (sem busca por texto)
+    total = None if busca else ContadorDispositivo.total(status_filter)
+    page_obj = paginar_por_cursor(
+        queryset, ('codigo',), cursor=request.GET.get('cursor'), tamanho=20, total=total
+    )
 
+    # Os seletores de funcionário dos modais buscam as opções sob demanda (funcionarios:autocompletar_funcionarios)
     return render(request, 'dispositivos/listar_dispositivos.html', {
         'dispositivos': page_obj,
         'tipos': TIPO_DISPOSITIVO_CHOICES,
-        'funcionarios': funcionarios,
         'status': STATUS_CHOICES,
         'busca_atual': busca,
         'status_atual': status_filter
@@ -79,19 +112,31 @@ def criar_dispositivo(request):
     messages.success(request, "Dispositivo cadastrado com sucesso.")
     return redirect('dispositivos:listar_dispositivos')
 
-@login_required
-def editar_dispositivo(request, id):
-    dispositivo = get_object_or_404(Dispositivo, id=id)
+async def _versao_dispositivo(request, id):
+    linha = await Dispositivo.aversao_da_linha(id)
+    return linha and (assinatura('dispositivo', id, *linha), linha[1])
 
-    # SE FOR GET: Retorna os dados para preencher o Modal (AJAX)
+@login_required
+@condicional(_versao_dispositivo)
+async def editar_dispositivo(request, id):
+    # SE FOR GET: Retorna os dados para preencher o Modal (AJAX), do cache enquanto o dispositivo não mudar
+    # (e 304, sem nem consultar o cache, se o navegador já tem a versão atual da linha)
     if request.method == "GET":
-        return JsonResponse({
-            "id": dispositivo.id,
-            "codigo": dispositivo.codigo,
-            "tipo_dispositivo": dispositivo.tipo_dispositivo,
-            "funcionario_id": dispositivo.funcionario.id if dispositivo.funcionario else "",
-            "status": dispositivo.status,
-        })
+        dados = await respostas.aobter(
+            'editar_dispositivo', ['dispositivos.Dispositivo'], (id,),
+            lambda: Dispositivo.objects.filter(id=id).values(
+                "id", "codigo", "tipo_dispositivo", "funcionario_id", "status"
+            ).afirst(),
+        )
+        if dados is None:
+            raise Http404("Dispositivo não encontrado.")
+        return JsonResponse({**dados, "funcionario_id": dados["funcionario_id"] or ""})
+
+    # A gravação continua síncrona: save() dispara os signals (contadores, busca, versões)
+    return await sync_to_async(_salvar_dispositivo)(request, id)
+
+def _salvar_dispositivo(request, id):
+    dispositivo = get_object_or_404(Dispositivo, id=id)
 
     # SE FOR POST: Salva as alterações
     if request.method == "POST":
@@ -151,58 +196,95 @@ def desvincular_dispositivo(request, id):
     messages.info(request, f"Dispositivo {dispositivo.codigo} desvinculado e devolvido ao estoque.")
     return redirect('dispositivos:listar_dispositivos')
 
-@login_required
-def exportar_dispositivos_csv(request):
+class _Eco:
+    """Pseudo-buffer: o csv.writer escreve aqui e recebemos a linha pronta de volta."""
+    def write(self, value):
+        return value
+
+
+def _cabecalho_csv():
+    writer = csv.writer(_Eco(), delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+    return u'\ufeff' + writer.writerow(['Código', 'Tipo', 'Status', 'Funcionário Responsável', 'Equipamentos Auxiliares'])
+
+
+def _lote_csv(queryset, ultimo_codigo, tamanho_lote):
     """
-    Gera e baixa um arquivo CSV com a lista de dispositivos E seus equipamentos auxiliares.
+    (texto do lote, último código) dos `tamanho_lote` dispositivos depois de
+    `ultimo_codigo`, ou (None, None) no fim. Paginação por chave (codigo > último):
+    cada lote é uma leitura de índice, e os equipamentos auxiliares são buscados
+    só para os dispositivos do lote.
     """
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="lista_dispositivos_completa.csv"'
-    
-    response.write(u'\ufeff'.encode('utf8'))
-    
-    writer = csv.writer(response, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-    
-    writer.writerow(['Código', 'Tipo', 'Status', 'Funcionário Responsável', 'Equipamentos Auxiliares'])
-    
-    
-    dispositivos = Dispositivo.objects.all().select_related('funcionario').prefetch_related('equipamentoauxiliar_set').order_by('codigo')
-    
-    for d in dispositivos:
+    writer = csv.writer(_Eco(), delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+    if ultimo_codigo is not None:
+        queryset = queryset.filter(codigo__gt=ultimo_codigo)
+    lote = list(queryset[:tamanho_lote])
+    if not lote:
+        return None, None
+
+    linhas = []
+    for d in lote:
         nome_func = d.funcionario.nome if d.funcionario else 'Não atribuído'
-        
-        #
-        lista_equipamentos = [str(eq) for eq in d.equipamentoauxiliar_set.all()] 
-        
-        
+        lista_equipamentos = [str(eq) for eq in d.equipamentoauxiliar_set.all()]
         equipamentos_str = " | ".join(lista_equipamentos) if lista_equipamentos else "Nenhum"
-        
-        writer.writerow([
+
+        linhas.append(writer.writerow([
             d.codigo,
             d.get_tipo_dispositivo_display(),
             d.get_status_display(),
             nome_func,
             equipamentos_str 
-        ])
-        
+        ]))
+    return ''.join(linhas), lote[-1].codigo
+
+
+def _linhas_csv(queryset, tamanho_lote):
+    yield _cabecalho_csv()
+    texto, ultimo_codigo = _lote_csv(queryset, None, tamanho_lote)
+    while texto is not None:
+        yield texto
+        texto, ultimo_codigo = _lote_csv(queryset, ultimo_codigo, tamanho_lote)
+
+
+async def _alinhas_csv(queryset, tamanho_lote):
+    """_linhas_csv para o ASGI: o servidor consome o corpo no event loop, e cada lote vem de uma thread."""
+    yield _cabecalho_csv()
+    proximo = sync_to_async(_lote_csv)
+    texto, ultimo_codigo = await proximo(queryset, None, tamanho_lote)
+    while texto is not None:
+        yield texto
+        texto, ultimo_codigo = await proximo(queryset, ultimo_codigo, tamanho_lote)
+
+
+@login_required
+@somente_leitura
+def exportar_dispositivos_csv(request):
+    """
+    Gera e baixa um arquivo CSV com a lista de dispositivos E seus equipamentos auxiliares.
+    Aceita os mesmos filtros da listagem (?busca= e ?status=).
+    As linhas são enviadas aos poucos, em lotes, sem montar o arquivo inteiro na memória.
+    """
+    queryset = Dispositivo.objects.select_related('funcionario').prefetch_related(
+        'equipamentoauxiliar_set'
+    ).order_by('codigo')
+    queryset, _, _ = _filtrar_dispositivos(request, queryset)
+
+    # Sob ASGI um iterador síncrono seria lido inteiro para a memória antes do envio
+    linhas = _alinhas_csv if isinstance(request, ASGIRequest) else _linhas_csv
+    response = StreamingHttpResponse(
+        linhas(queryset, EXPORTACAO_TAMANHO_LOTE),
+        content_type='text/csv; charset=utf-8'
+    )
+    response['Content-Disposition'] = 'attachment; filename="lista_dispositivos_completa.csv"'
     return response
 
 @login_required
+@somente_leitura
 def dashboard_dispositivos(request):
     # FILTRA SOMENTE NOTEBOOKS
-    queryset = Dispositivo.objects.filter(tipo_dispositivo='NOTEBOOK')
+    # Os números vêm dos contadores mantidos a cada transição (sem COUNT na tabela inteira)
+    dados_gerais = ContadorDispositivo.resumo('NOTEBOOK')
 
-    dados_gerais = queryset.aggregate(
-        total=Count('id'),
-        ativos=Count('id', filter=Q(status='ATIVO')),
-        disponiveis=Count('id', filter=Q(status='DISPONIVEL')),
-        manutencao=Count('id', filter=Q(status='MANUTENCAO'))
-    )
-
-    por_tipo = Dispositivo.objects.values('tipo_dispositivo').annotate(
-        qtd=Count('id')
-    ).order_by('-qtd')
+    por_tipo = ContadorDispositivo.por_tipo()
 
     return render(request, 'dispositivos/dashboard.html', {
         'dados': dados_gerais,
@@ -210,18 +292,23 @@ def dashboard_dispositivos(request):
     })
 
 
+async def _versao_dashboard(request):
+    return versoes.combinar(await versoes.aobter('dispositivos.Dispositivo')), None
+
 @login_required
-def api_dados_dashboard(request):
+@condicional(_versao_dashboard)
+async def api_dados_dashboard(request):
     """
     Retorna apenas os números em formato JSON para atualização via AJAX.
+    Fallback do stream de eventos: com If-None-Match responde 304 sem tocar no banco.
     """
     # FILTRA SOMENTE NOTEBOOKS
-    queryset = Dispositivo.objects.filter(tipo_dispositivo='NOTEBOOK')
+    resumo = await ContadorDispositivo.aresumo('NOTEBOOK')
 
-    dados = queryset.aggregate(
-        ativos=Count('id', filter=Q(status='ATIVO')),
-        disponiveis=Count('id', filter=Q(status='DISPONIVEL')),
-        manutencao=Count('id', filter=Q(status='MANUTENCAO'))
-    )
+    dados = {
+        'ativos': resumo['ativos'],
+        'disponiveis': resumo['disponiveis'],
+        'manutencao': resumo['manutencao'],
+    }
     
     return JsonResponse(dados)
\ No newline at end of file
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class EquipamentosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'equipamentos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from core import eventos
+        from .models import EquipamentoAuxiliar
+
+        # Canal do stream do dashboard de estoque
+        eventos.registrar_canal(
+            'estoque',
+            ['equipamentos.EquipamentoAuxiliar', 'equipamentos.LoteEstoque'],
+            EquipamentoAuxiliar.metricas_planas,
+        )
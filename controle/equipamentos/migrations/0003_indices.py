@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dispositivos', '0003_indices'),
+        ('equipamentos', '0002_alter_equipamentoauxiliar_tipo_equipamento_aux'),
+        ('funcionarios', '0005_historico_funcionario_data'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipamentoauxiliar',
+            index=models.Index(fields=['tipo_equipamento_aux', 'status', 'nome'], name='equip_tipo_status_nome'),
+        ),
+        migrations.AddIndex(
+            model_name='equipamentoauxiliar',
+            index=models.Index(fields=['status', 'nome'], name='equip_status_nome'),
+        ),
+    ]
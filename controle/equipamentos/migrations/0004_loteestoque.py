@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+def agrupar_estoque(apps, schema_editor):
+    """Itens sem dono nem dispositivo viram um lote por (tipo, nome)."""
+    EquipamentoAuxiliar = apps.get_model('equipamentos', 'EquipamentoAuxiliar')
+    LoteEstoque = apps.get_model('equipamentos', 'LoteEstoque')
+    IndiceBusca = apps.get_model('core', 'IndiceBusca')
+
+    soltos = EquipamentoAuxiliar.objects.filter(funcionario__isnull=True, dispositivo__isnull=True)
+    lotes = {}
+    for linha in soltos.order_by().values('tipo_equipamento_aux', 'nome', 'status').annotate(qtd=models.Count('id')):
+        lote = lotes.setdefault((linha['tipo_equipamento_aux'], linha['nome']), [0, 0])
+        # ATIVO sem vínculo sobra de dispositivo/funcionário apagado (SET_NULL): está livre
+        lote[1 if linha['status'] == 'MANUTENCAO' else 0] += linha['qtd']
+    LoteEstoque.objects.bulk_create([
+        LoteEstoque(tipo_equipamento_aux=tipo, nome=nome, quantidade_disponivel=livres, quantidade_manutencao=manutencao)
+        for (tipo, nome), (livres, manutencao) in lotes.items()
+    ])
+
+    while ids := list(soltos.values_list('id', flat=True)[:1000]):
+        IndiceBusca.objects.filter(tipo='EQUIPAMENTO', objeto_id__in=ids).delete()
+        EquipamentoAuxiliar.objects.filter(id__in=ids).delete()
+
+
+def desagrupar_estoque(apps, schema_editor):
+    """Volta a ter uma linha por unidade (rode reindexar_busca depois)."""
+    EquipamentoAuxiliar = apps.get_model('equipamentos', 'EquipamentoAuxiliar')
+    LoteEstoque = apps.get_model('equipamentos', 'LoteEstoque')
+
+    for lote in LoteEstoque.objects.iterator():
+        for status, quantidade in (('DISPONIVEL', lote.quantidade_disponivel), ('MANUTENCAO', lote.quantidade_manutencao)):
+            EquipamentoAuxiliar.objects.bulk_create(
+                [EquipamentoAuxiliar(nome=lote.nome, tipo_equipamento_aux=lote.tipo_equipamento_aux, status=status)
+                 for _ in range(quantidade)],
+                batch_size=1000,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('equipamentos', '0003_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_equipamento_aux', models.CharField(choices=[('MOUSE', 'Mouse'), ('TECLADO', 'Teclado'), ('HEADSET', 'Headset'), ('MONITOR', 'Monitor')], max_length=20)),
+                ('nome', models.CharField(max_length=100)),
+                ('quantidade_disponivel', models.PositiveIntegerField(default=0)),
+                ('quantidade_manutencao', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Lote de Estoque',
+                'verbose_name_plural': 'Lotes de Estoque',
+                'ordering': ['tipo_equipamento_aux', 'nome'],
+                'constraints': [models.UniqueConstraint(fields=('tipo_equipamento_aux', 'nome'), name='lote_tipo_nome_unico')],
+            },
+        ),
+        migrations.RunPython(agrupar_estoque, desagrupar_estoque),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipamentos', '0004_loteestoque'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipamentoauxiliar',
+            name='atualizado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='equipamentoauxiliar',
+            name='versao',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipamentos', '0005_versao_da_linha'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipamentoauxiliar',
+            index=models.Index(fields=['nome'], name='equip_nome'),
+        ),
+    ]
@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import F
 # Importamos as opções de status do app de dispositivos para manter consistência
+from core.models import Versionado
 from dispositivos.models import STATUS_CHOICES
 
 TIPO_EQUIPAMENTO_AUX_CHOICES = [
@@ -9,7 +11,11 @@ TIPO_EQUIPAMENTO_AUX_CHOICES = [
     ('MONITOR', 'Monitor'),
 ]
 
-class EquipamentoAuxiliar(models.Model):
+# Marca de "dono não lido do banco" (None é um valor válido: sem dono)
+_NAO_LIDO = object()
+
+
+class EquipamentoAuxiliar(Versionado):
     nome = models.CharField(max_length=100)
     tipo_equipamento_aux = models.CharField(max_length=20, choices=TIPO_EQUIPAMENTO_AUX_CHOICES)
     
@@ -36,18 +42,80 @@ class EquipamentoAuxiliar(models.Model):
 
     class Meta:
         ordering = ['nome']
+        indexes = [
+            # Lista por tipo (ordenada por status, nome) e agregação do dashboard do estoque
+            models.Index(fields=['tipo_equipamento_aux', 'status', 'nome'], name='equip_tipo_status_nome'),
+            # Seletor de itens disponíveis no estoque, em ordem alfabética
+            models.Index(fields=['status', 'nome'], name='equip_status_nome'),
+            # Busca por prefixo do nome (core.busca)
+            models.Index(fields=['nome'], name='equip_nome'),
+        ]
         verbose_name = "Equipamento Auxiliar"
         verbose_name_plural = "Equipamentos Auxiliares"
 
     def __str__(self):
         return f"{self.nome} ({self.get_tipo_equipamento_aux_display()})"
 
+    # -----------------------
+    # MÉTRICAS DO ESTOQUE
+    # -----------------------
+
+    @classmethod
+    def metricas_por_tipo(cls):
+        """
+        Totais por tipo. Livres e em manutenção vêm dos lotes (uma linha por modelo);
+        só os itens em uso são contados, pelo índice (tipo, status, nome).
+        """
+        por_tipo = {}
+
+        def linha(tipo):
+            return por_tipo.setdefault(tipo, {
+                'tipo_equipamento_aux': tipo, 'total': 0, 'disponiveis': 0, 'ativos': 0, 'manutencao': 0,
+            })
+
+        for lote in LoteEstoque.totais_por_tipo():
+            dados = linha(lote['tipo_equipamento_aux'])
+            dados['disponiveis'] += lote['disponiveis'] or 0
+            dados['manutencao'] += lote['manutencao'] or 0
+        for item in cls.objects.filter(status='ATIVO').order_by().values('tipo_equipamento_aux').annotate(
+            qtd=models.Count('id')
+        ):
+            linha(item['tipo_equipamento_aux'])['ativos'] += item['qtd']
+
+        for dados in por_tipo.values():
+            dados['total'] = dados['disponiveis'] + dados['ativos'] + dados['manutencao']
+        return [por_tipo[tipo] for tipo in sorted(por_tipo)]
+
+    @classmethod
+    def metricas_planas(cls):
+        """Mesmas métricas num dict plano ('MOUSE.disponiveis': 10), usado pelo stream do dashboard."""
+        dados = {}
+        for item in cls.metricas_por_tipo():
+            tipo = item['tipo_equipamento_aux']
+            for campo in ('total', 'disponiveis', 'ativos', 'manutencao'):
+                dados[f"{tipo}.{campo}"] = item[campo]
+        return dados
+
     # -----------------------
     # REGRAS DE STATUS
     # -----------------------
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Dono lido do banco, para registrar a troca no livro de atribuições
+        if 'funcionario_id' in field_names:
+            instance._funcionario_lido = instance.funcionario_id
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'funcionario' in fields or 'funcionario_id' in fields:
+            self._funcionario_lido = self.funcionario_id
+
     def save(self, *args, **kwargs):
-        
+        from funcionarios.models import AtribuicaoAtivo
+
         if self.status == 'MANUTENCAO':
             
             self.funcionario = None
@@ -57,8 +125,21 @@ class EquipamentoAuxiliar(models.Model):
             self.status = "ATIVO"
         else:
             self.status = "DISPONIVEL"
-            
-        super().save(*args, **kwargs)
+
+        anterior = None
+        if not self._state.adding:
+            anterior = getattr(self, '_funcionario_lido', _NAO_LIDO)
+            if anterior is _NAO_LIDO:
+                # Instância carregada com .only()/.defer(): busca o dono atual no banco
+                anterior = EquipamentoAuxiliar.objects.filter(pk=self.pk).values_list('funcionario_id', flat=True).first()
+        if not AtribuicaoAtivo.mudou(anterior, self.funcionario_id):
+            super().save(*args, **kwargs)
+        else:
+            # savepoint=False: dentro de outra transação (alocar) não custa um SAVEPOINT
+            with transaction.atomic(savepoint=False):
+                super().save(*args, **kwargs)
+                AtribuicaoAtivo.trocar('EQUIPAMENTO', self.pk, self.nome, anterior, self.funcionario_id)
+        self._funcionario_lido = self.funcionario_id
 
     def vincular(self, funcionario=None, dispositivo=None):
         if funcionario:
@@ -70,7 +151,170 @@ class EquipamentoAuxiliar(models.Model):
         self.save()
 
     def desvincular(self):
-        self.funcionario = None
-        self.dispositivo = None
-        # O save() já cuida de atualizar o status para DISPONIVEL
-        self.save()
\ No newline at end of file
+        """Devolve o item ao estoque: volta a ser uma unidade do lote do seu modelo."""
+        with transaction.atomic():
+            LoteEstoque.ajustar(self.tipo_equipamento_aux, self.nome, disponivel=1)
+            self.delete()
+
+    def enviar_para_manutencao(self):
+        """Tira o item de quem estava com ele e conta como unidade em manutenção do lote."""
+        with transaction.atomic():
+            LoteEstoque.ajustar(self.tipo_equipamento_aux, self.nome, manutencao=1)
+            self.delete()
+
+
+class EstoqueInsuficiente(Exception):
+    pass
+
+
+class LoteEstoque(models.Model):
+    """
+    Estoque de periféricos intercambiáveis: um contador por (tipo, modelo) em vez
+    de uma linha por unidade. A unidade só vira um EquipamentoAuxiliar quando é
+    entregue a alguém (retirar) e volta a ser só um número quando é devolvida.
+    """
+    tipo_equipamento_aux = models.CharField(max_length=20, choices=TIPO_EQUIPAMENTO_AUX_CHOICES)
+    nome = models.CharField(max_length=100)
+    quantidade_disponivel = models.PositiveIntegerField(default=0)
+    quantidade_manutencao = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['tipo_equipamento_aux', 'nome']
+        constraints = [
+            models.UniqueConstraint(fields=['tipo_equipamento_aux', 'nome'], name='lote_tipo_nome_unico'),
+        ]
+        verbose_name = "Lote de Estoque"
+        verbose_name_plural = "Lotes de Estoque"
+
+    def __str__(self):
+        return f"{self.nome} ({self.get_tipo_equipamento_aux_display()}): {self.quantidade_disponivel} livres"
+
+    @classmethod
+    def ajustar(cls, tipo_equipamento_aux, nome, disponivel=0, manutencao=0):
+        """Soma as quantidades ao lote (cria o lote se ainda não existir)."""
+        cls.ajustar_varios({(tipo_equipamento_aux, nome): (disponivel, manutencao)})
+
+    @classmethod
+    def ajustar_varios(cls, deltas):
+        """
+        Vários ajustes de uma vez: {(tipo, nome): (disponivel, manutencao)}.
+        Um único INSERT ... ON CONFLICT/ON DUPLICATE KEY soma nos lotes que existem e
+        cria os que faltam: uma query, exista o lote ou não, e sem corrida entre
+        duas requisições criando o mesmo lote.
+        """
+        from core import versoes
+
+        # Em ordem: duas requisições com os mesmos lotes travam as linhas na mesma sequência
+        linhas = sorted(
+            (tipo, nome, disponivel, manutencao)
+            for (tipo, nome), (disponivel, manutencao) in deltas.items() if disponivel or manutencao
+        )
+        if not linhas:
+            return
+        opts, q = cls._meta, connection.ops.quote_name
+        tabela = q(opts.db_table)
+        tipo, nome, disponivel, manutencao = (
+            q(opts.get_field(campo).column)
+            for campo in ('tipo_equipamento_aux', 'nome', 'quantidade_disponivel', 'quantidade_manutencao')
+        )
+        if connection.vendor == 'mysql':
+            somar = f"ON DUPLICATE KEY UPDATE {disponivel} = {disponivel} + VALUES({disponivel}), " \
+                    f"{manutencao} = {manutencao} + VALUES({manutencao})"
+        else:
+            # SQLite e PostgreSQL; o alvo é a constraint lote_tipo_nome_unico
+            somar = f"ON CONFLICT ({tipo}, {nome}) DO UPDATE SET " \
+                    f"{disponivel} = {tabela}.{disponivel} + EXCLUDED.{disponivel}, " \
+                    f"{manutencao} = {tabela}.{manutencao} + EXCLUDED.{manutencao}"
+        valores = ", ".join(["(%s, %s, %s, %s)"] * len(linhas))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {tabela} ({tipo}, {nome}, {disponivel}, {manutencao}) VALUES {valores} {somar}",
+                [valor for linha in linhas for valor in linha],
+            )
+        # SQL direto não dispara signals
+        versoes.invalidar(cls._meta.label)
+
+    @classmethod
+    def totais_por_tipo(cls):
+        return cls.objects.order_by('tipo_equipamento_aux').values('tipo_equipamento_aux').annotate(
+            disponiveis=models.Sum('quantidade_disponivel'),
+            manutencao=models.Sum('quantidade_manutencao'),
+        )
+
+    def _mover(self, quantidade, origem, destino=None):
+        """
+        Tira `quantidade` de `origem` (e soma em `destino`) só se houver saldo:
+        o filtro no UPDATE impede que duas retiradas simultâneas deixem o lote negativo.
+        """
+        from core import versoes
+
+        mudancas = {origem: F(origem) - quantidade}
+        if destino:
+            mudancas[destino] = F(destino) + quantidade
+        if not LoteEstoque.objects.filter(pk=self.pk, **{f'{origem}__gte': quantidade}).update(**mudancas):
+            raise EstoqueInsuficiente(f"Não há {quantidade} unidade(s) de {self.nome} para movimentar.")
+        versoes.invalidar(LoteEstoque._meta.label)
+        self.refresh_from_db(fields=['quantidade_disponivel', 'quantidade_manutencao'])
+
+    def _entregar(self, funcionario, dispositivo):
+        """A unidade reservada passa a existir como EquipamentoAuxiliar vinculado."""
+        item = EquipamentoAuxiliar(nome=self.nome, tipo_equipamento_aux=self.tipo_equipamento_aux)
+        item.vincular(funcionario=funcionario, dispositivo=dispositivo)
+        return item
+
+    @classmethod
+    def _reservar_unidade(cls, tipo_equipamento_aux):
+        """
+        Desconta uma unidade de qualquer lote do tipo que tenha saldo e devolve o lote.
+        Precisa rodar dentro de uma transação.
+
+        Limitação: o estoque tem um lote por modelo (tipo, nome), e depois da migração
+        0004 um tipo costuma ter um modelo só. Aí todas as alocações do tipo disputam a
+        mesma linha: o SKIP LOCKED não tem outro lote para pular e a segunda alocação
+        cai no UPDATE condicional, que espera o commit da primeira. As alocações de um
+        mesmo tipo ficam em fila (a trava dura só a transação de alocar, poucos ms); só
+        com vários modelos do tipo em estoque elas andam em paralelo.
+        """
+        candidatos = cls.objects.filter(
+            tipo_equipamento_aux=tipo_equipamento_aux, quantidade_disponivel__gt=0
+        ).order_by('-quantidade_disponivel', 'id')
+
+        if connection.features.has_select_for_update_skip_locked:
+            # Lotes travados por outra alocação em andamento são pulados, não esperados
+            lote = candidatos.select_for_update(skip_locked=True).first()
+            if lote is not None:
+                cls.objects.filter(pk=lote.pk).update(quantidade_disponivel=F('quantidade_disponivel') - 1)
+                return lote
+
+        # SQLite (sem FOR UPDATE) ou todos os lotes travados: o UPDATE condicional
+        # garante que a unidade só é descontada uma vez, mesmo com dois operadores juntos
+        for lote in candidatos[:20]:
+            if cls.objects.filter(pk=lote.pk, quantidade_disponivel__gt=0).update(
+                quantidade_disponivel=F('quantidade_disponivel') - 1
+            ):
+                return lote
+        return None
+
+    @classmethod
+    def alocar(cls, tipo_equipamento_aux, funcionario=None, dispositivo=None):
+        """
+        Entrega uma unidade qualquer do tipo (o operador não escolhe a unidade):
+        reserva no lote e cria o item vinculado na mesma transação.
+        """
+        from core import versoes
+
+        if funcionario is None and dispositivo is None:
+            raise ValueError("Informe o funcionário ou o dispositivo que vai receber o item.")
+        with transaction.atomic():
+            lote = cls._reservar_unidade(tipo_equipamento_aux)
+            if lote is None:
+                nome_tipo = dict(TIPO_EQUIPAMENTO_AUX_CHOICES).get(tipo_equipamento_aux, tipo_equipamento_aux)
+                raise EstoqueInsuficiente(f"Não há {nome_tipo} disponível no estoque.")
+            versoes.invalidar(cls._meta.label)
+            return lote._entregar(funcionario, dispositivo)
+
+    def enviar_para_manutencao(self, quantidade=1):
+        self._mover(quantidade, 'quantidade_disponivel', 'quantidade_manutencao')
+
+    def retornar_da_manutencao(self, quantidade=1):
+        self._mover(quantidade, 'quantidade_manutencao', 'quantidade_disponivel')
\ No newline at end of file
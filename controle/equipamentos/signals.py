@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import busca, versoes
+from funcionarios.models import AtribuicaoAtivo
+
+from .models import EquipamentoAuxiliar, LoteEstoque
+
+
+@receiver([post_save, post_delete], sender=EquipamentoAuxiliar)
+@receiver([post_save, post_delete], sender=LoteEstoque)
+def invalidar_versao_equipamento(sender, **kwargs):
+    versoes.invalidar(sender._meta.label)
+
+
+@receiver(post_save, sender=EquipamentoAuxiliar)
+def indexar_equipamento(sender, instance, **kwargs):
+    # Mantém o índice de trigramas da busca (core.busca)
+    busca.indexar('EQUIPAMENTO', instance)
+
+
+@receiver(post_delete, sender=EquipamentoAuxiliar)
+def remover_equipamento_do_indice(sender, instance, **kwargs):
+    busca.remover('EQUIPAMENTO', instance.pk)
+
+
+@receiver(post_delete, sender=EquipamentoAuxiliar)
+def encerrar_atribuicao_equipamento(sender, instance, **kwargs):
+    # Devolução ao estoque (desvincular) e ida para manutenção apagam o item
+    if instance.funcionario_id:
+        AtribuicaoAtivo.encerrar('EQUIPAMENTO', [instance.pk])
@@ -1,3 +1,144 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from funcionarios.models import AtribuicaoAtivo, Funcionario
+
+from .models import EquipamentoAuxiliar, EstoqueInsuficiente, LoteEstoque
+
+
+class LoteEstoqueAjustarTests(TestCase):
+    def lote(self, nome='Mouse X'):
+        lote = LoteEstoque.objects.get(tipo_equipamento_aux='MOUSE', nome=nome)
+        return lote.quantidade_disponivel, lote.quantidade_manutencao
+
+    def test_cria_e_depois_soma(self):
+        with self.assertNumQueries(1):
+            LoteEstoque.ajustar('MOUSE', 'Mouse X', disponivel=5)
+        with self.assertNumQueries(1):
+            LoteEstoque.ajustar('MOUSE', 'Mouse X', disponivel=2, manutencao=1)
+
+        self.assertEqual(self.lote(), (7, 1))
+        self.assertEqual(LoteEstoque.objects.count(), 1)
+
+    def test_sem_quantidade_nao_faz_nada(self):
+        with self.assertNumQueries(0):
+            LoteEstoque.ajustar('MOUSE', 'Mouse X')
+
+        self.assertFalse(LoteEstoque.objects.exists())
+
+    def test_varios_lotes_numa_query(self):
+        LoteEstoque.ajustar('MOUSE', 'Mouse X', disponivel=1)
+
+        with self.assertNumQueries(1):
+            LoteEstoque.ajustar_varios({
+                ('MOUSE', 'Mouse X'): (3, 0),
+                ('MOUSE', 'Mouse Y'): (0, 2),
+                ('TECLADO', 'Teclado Z'): (0, 0),
+            })
+
+        self.assertEqual(self.lote('Mouse X'), (4, 0))
+        self.assertEqual(self.lote('Mouse Y'), (0, 2))
+        self.assertFalse(LoteEstoque.objects.filter(tipo_equipamento_aux='TECLADO').exists())
+
+    def test_mover_entre_livres_e_manutencao(self):
+        LoteEstoque.ajustar('MOUSE', 'Mouse X', disponivel=3)
+        lote = LoteEstoque.objects.get()
+
+        lote.enviar_para_manutencao(2)
+        self.assertEqual((lote.quantidade_disponivel, lote.quantidade_manutencao), (1, 2))
+        lote.retornar_da_manutencao()
+        self.assertEqual((lote.quantidade_disponivel, lote.quantidade_manutencao), (2, 1))
+
+        with self.assertRaises(EstoqueInsuficiente):
+            lote.enviar_para_manutencao(3)
+        self.assertEqual(self.lote(), (2, 1))
+
+    def test_devolver_e_enviar_item_para_manutencao(self):
+        ana = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+        devolvido = EquipamentoAuxiliar.objects.create(nome='Mouse X', tipo_equipamento_aux='MOUSE', funcionario=ana)
+        quebrado = EquipamentoAuxiliar.objects.create(nome='Mouse X', tipo_equipamento_aux='MOUSE', funcionario=ana)
+
+        devolvido.desvincular()
+        quebrado.enviar_para_manutencao()
+
+        self.assertEqual(self.lote(), (1, 1))
+        self.assertFalse(EquipamentoAuxiliar.objects.exists())
+        self.assertFalse(AtribuicaoAtivo.objects.filter(fim__isnull=True).exists())
+
+
+class ManutencaoViewsTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('operador'))
+        LoteEstoque.ajustar('MOUSE', 'Mouse X', disponivel=2)
+        self.lote = LoteEstoque.objects.get()
+
+    def test_item_vai_e_volta_da_manutencao(self):
+        ana = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+        item = EquipamentoAuxiliar.objects.create(nome='Mouse X', tipo_equipamento_aux='MOUSE', funcionario=ana)
+        parado = EquipamentoAuxiliar.objects.create(nome='Mouse X', tipo_equipamento_aux='MOUSE', status='MANUTENCAO')
+
+        self.client.get(reverse('equipamentos:acao_manutencao', args=[item.pk]))
+        self.lote.refresh_from_db()
+        self.assertEqual((self.lote.quantidade_disponivel, self.lote.quantidade_manutencao), (2, 1))
+
+        self.client.get(reverse('equipamentos:acao_manutencao', args=[parado.pk]))
+        self.lote.refresh_from_db()
+        self.assertEqual((self.lote.quantidade_disponivel, self.lote.quantidade_manutencao), (3, 1))
+        self.assertFalse(EquipamentoAuxiliar.objects.exists())
+
+    def test_acoes_do_lote_exigem_post(self):
+        enviar = reverse('equipamentos:acao_manutencao_lote', args=[self.lote.pk, 'enviar'])
+        deletar = reverse('equipamentos:deletar_lote', args=[self.lote.pk])
+
+        self.assertEqual(self.client.get(enviar).status_code, 405)
+        self.assertEqual(self.client.get(deletar).status_code, 405)
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.quantidade_manutencao, 0)
+
+        self.client.post(enviar, {'quantidade': 2})
+        self.lote.refresh_from_db()
+        self.assertEqual((self.lote.quantidade_disponivel, self.lote.quantidade_manutencao), (0, 2))
+
+        self.client.post(deletar)
+        self.assertFalse(LoteEstoque.objects.exists())
+
+
+class AlocarTests(TestCase):
+    def setUp(self):
+        self.ana = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+
+    def test_entrega_uma_unidade_do_lote_com_mais_saldo(self):
+        LoteEstoque.ajustar('MOUSE', 'Mouse X', disponivel=1)
+        LoteEstoque.ajustar('MOUSE', 'Mouse Y', disponivel=3)
+
+        item = LoteEstoque.alocar('MOUSE', funcionario=self.ana)
+
+        self.assertEqual((item.nome, item.funcionario_id, item.status), ('Mouse Y', self.ana.pk, 'ATIVO'))
+        self.assertEqual(LoteEstoque.objects.get(nome='Mouse Y').quantidade_disponivel, 2)
+        self.assertEqual(LoteEstoque.objects.get(nome='Mouse X').quantidade_disponivel, 1)
+        self.assertEqual(AtribuicaoAtivo.responsavel_em('EQUIPAMENTO', item.pk, timezone.now()).funcionario_id, self.ana.pk)
+
+    def test_pula_lotes_sem_saldo_e_outros_tipos(self):
+        LoteEstoque.ajustar('MOUSE', 'Mouse X', manutencao=4)
+        LoteEstoque.ajustar('TECLADO', 'Teclado Z', disponivel=5)
+        LoteEstoque.ajustar('MOUSE', 'Mouse Y', disponivel=1)
+
+        self.assertEqual(LoteEstoque.alocar('MOUSE', funcionario=self.ana).nome, 'Mouse Y')
+
+    def test_sem_estoque(self):
+        LoteEstoque.ajustar('MOUSE', 'Mouse X', disponivel=1)
+        LoteEstoque.alocar('MOUSE', funcionario=self.ana)
+
+        with self.assertRaises(EstoqueInsuficiente):
+            LoteEstoque.alocar('MOUSE', funcionario=self.ana)
+        self.assertEqual(EquipamentoAuxiliar.objects.count(), 1)
+        self.assertEqual(LoteEstoque.objects.get().quantidade_disponivel, 0)
+
+    def test_exige_destino(self):
+        LoteEstoque.ajustar('MOUSE', 'Mouse X', disponivel=1)
+
+        with self.assertRaises(ValueError):
+            LoteEstoque.alocar('MOUSE')
+        self.assertEqual(LoteEstoque.objects.get().quantidade_disponivel, 1)
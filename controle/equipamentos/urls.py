@@ -12,10 +12,14 @@ urlpatterns = [
     # Essas rotas são obrigatórias para o botão "Gerenciar" do Dashboard funcionar
     path('lista/<str:tipo_codigo>/', views.listar_equipamentos_por_tipo, name='listar_por_tipo'),
     path('manutencao/<int:id>/', views.acao_manutencao_equipamento, name='acao_manutencao'),
+    path('lote/<int:id>/manutencao/<str:acao>/', views.acao_manutencao_lote, name='acao_manutencao_lote'),
+    path('lote/<int:id>/deletar/', views.deletar_lote, name='deletar_lote'),
 
     # --- ROTAS DE VÍNCULO E CRUD (ANTIGAS) ---
     path('funcionario/<int:funcionario_id>/', views.equipamentos_funcionario, name='equipamentos_funcionario'),
     path('dispositivo/<int:dispositivo_id>/', views.equipamentos_dispositivo, name='equipamentos_dispositivo'),
+    path('api/por-dispositivos/', views.itens_por_dispositivo, name='itens_por_dispositivo'),
+    path('api/alocar/', views.alocar_equipamento, name='alocar_equipamento'),
     path('editar/<int:id>/', views.editar_equipamento, name='editar_equipamento'),
     path('deletar/<int:id>/', views.deletar_equipamento, name='deletar_equipamento'),
     path('desvincular/<int:id>/', views.desvincular_equipamento, name='desvincular_equipamento'),
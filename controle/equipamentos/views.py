@@ -1,9 +1,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from django.urls import reverse
 
-from .models import EquipamentoAuxiliar, TIPO_EQUIPAMENTO_AUX_CHOICES
+from .models import EquipamentoAuxiliar, EstoqueInsuficiente, LoteEstoque, TIPO_EQUIPAMENTO_AUX_CHOICES
+from core import respostas
+from core.condicional import assinatura, condicional
+from core.replica import somente_leitura
 from dispositivos.models import STATUS_CHOICES, Dispositivo
 from funcionarios.models import Funcionario
 
@@ -42,29 +46,27 @@ def equipamentos_dispositivo(request, dispositivo_id):
 
     # 1. PROCESSAMENTO DO VÍNCULO (POST)
     if request.method == "POST":
-        item_id = request.POST.get("item_id")
-        
-        if item_id:
-            # Pega o item do estoque
-            item = get_object_or_404(EquipamentoAuxiliar, id=item_id)
-            
-            # Vincula ao dispositivo
-            item.dispositivo = dispositivo
-            if dispositivo.funcionario:
-                item.funcionario = dispositivo.funcionario
-            
-            item.save() 
-            # messages.success(request, f"{item.nome} vinculado com sucesso!")
-        
-        # O else foi removido pois estava vazio (apenas comentários) e causava erro
-            
+        tipo = request.POST.get("tipo_equipamento_aux")
+
+        if tipo:
+            # O operador escolhe só o tipo; a unidade é reservada no estoque na hora
+            try:
+                item = LoteEstoque.alocar(tipo, funcionario=dispositivo.funcionario, dispositivo=dispositivo)
+                messages.success(request, f"{item.nome} vinculado com sucesso!")
+            except EstoqueInsuficiente as erro:
+                messages.error(request, str(erro))
+
         return redirect('dispositivos:listar_dispositivos')
 
     # 2. PREPARAÇÃO DOS DADOS (GET)
     equipamentos_vinculados = EquipamentoAuxiliar.objects.filter(dispositivo_id=dispositivo_id)
-    
-    # IMPORTANTE: Busca itens DISPONÍVEIS para preencher o select do modal
-    estoque_disponivel = EquipamentoAuxiliar.objects.filter(status='DISPONIVEL').order_by('nome')
+
+    # Select do modal: só os tipos com saldo (e quantos livres), sem listar o estoque
+    livres = {t['tipo_equipamento_aux']: t['disponiveis'] for t in LoteEstoque.totais_por_tipo()}
+    estoque_disponivel = [
+        {'tipo': codigo, 'nome': nome, 'livres': livres[codigo]}
+        for codigo, nome in TIPO_EQUIPAMENTO_AUX_CHOICES if livres.get(codigo)
+    ]
 
     return render(request, "equipamentos/por_dispositivo.html", {
         "dispositivo": dispositivo,
@@ -72,6 +74,84 @@ def equipamentos_dispositivo(request, dispositivo_id):
         "estoque": estoque_disponivel, 
     })
 
+# Máximo de dispositivos por chamada (a listagem mostra 20 por página)
+LIMITE_DISPOSITIVOS_POR_CONSULTA = 100
+
+def _ids_da_consulta(request):
+    ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.strip().isdigit()]
+    return ids[:LIMITE_DISPOSITIVOS_POR_CONSULTA]
+
+def _versao_itens_por_dispositivo(request):
+    ids = _ids_da_consulta(request)
+    qtd, ultima = EquipamentoAuxiliar.versao_do_conjunto(EquipamentoAuxiliar.objects.filter(dispositivo_id__in=ids))
+    return assinatura(ids, qtd, ultima), ultima
+
+@login_required
+@condicional(_versao_itens_por_dispositivo)
+def itens_por_dispositivo(request):
+    """
+    API: equipamentos auxiliares de vários dispositivos numa única query, agrupados por dispositivo.
+    /equipamentos/api/por-dispositivos/?ids=1,2,3  ->  {"itens": {"1": [...], "2": [], "3": [...]}}
+    A listagem de dispositivos busca assim os itens da página inteira de uma vez.
+    Com If-None-Match responde 304 se nenhum item desses dispositivos mudou.
+    """
+    ids = _ids_da_consulta(request)
+
+    nomes_tipo = dict(TIPO_EQUIPAMENTO_AUX_CHOICES)
+    itens = {str(i): [] for i in ids}
+    consulta = EquipamentoAuxiliar.objects.filter(dispositivo_id__in=ids).order_by('dispositivo_id', 'nome').values(
+        'id', 'nome', 'tipo_equipamento_aux', 'status', 'dispositivo_id'
+    )
+    for item in consulta:
+        itens[str(item['dispositivo_id'])].append({
+            'id': item['id'],
+            'nome': item['nome'],
+            'tipo': item['tipo_equipamento_aux'],
+            'tipo_display': nomes_tipo.get(item['tipo_equipamento_aux'], item['tipo_equipamento_aux']),
+            'status': item['status'],
+            'url_desvincular': reverse('equipamentos:desvincular_equipamento', args=[item['id']]),
+        })
+
+    return JsonResponse({'itens': itens})
+
+@login_required
+def alocar_equipamento(request):
+    """
+    API: entrega uma unidade qualquer do tipo a um dispositivo e/ou funcionário.
+    POST tipo_equipamento_aux=MOUSE&dispositivo_id=10  ->  {"item": {...}}  (409 se não houver estoque)
+    Dois operadores ao mesmo tempo nunca recebem a mesma unidade (ver LoteEstoque.alocar).
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    tipo = request.POST.get("tipo_equipamento_aux")
+    if tipo not in dict(TIPO_EQUIPAMENTO_AUX_CHOICES):
+        return JsonResponse({'erro': "Tipo de equipamento inválido."}, status=400)
+
+    dispositivo = funcionario = None
+    if request.POST.get("dispositivo_id"):
+        dispositivo = get_object_or_404(Dispositivo.objects.select_related('funcionario'), id=request.POST["dispositivo_id"])
+        # Como no vínculo pela tela: o item acompanha o dono do dispositivo
+        funcionario = dispositivo.funcionario
+    if request.POST.get("funcionario_id"):
+        funcionario = get_object_or_404(Funcionario, id=request.POST["funcionario_id"], status="ATIVO")
+    if dispositivo is None and funcionario is None:
+        return JsonResponse({'erro': "Informe dispositivo_id ou funcionario_id."}, status=400)
+
+    try:
+        item = LoteEstoque.alocar(tipo, funcionario=funcionario, dispositivo=dispositivo)
+    except EstoqueInsuficiente as erro:
+        return JsonResponse({'erro': str(erro)}, status=409)
+
+    return JsonResponse({'item': {
+        'id': item.id,
+        'nome': item.nome,
+        'tipo': item.tipo_equipamento_aux,
+        'status': item.status,
+        'dispositivo_id': item.dispositivo_id,
+        'funcionario_id': item.funcionario_id,
+    }}, status=201)
+
 @login_required
 def editar_equipamento(request, id):
     equipamento = get_object_or_404(EquipamentoAuxiliar, id=id)
@@ -105,11 +185,10 @@ def deletar_equipamento(request, id):
 def desvincular_equipamento(request, id):
     equipamento = get_object_or_404(EquipamentoAuxiliar, id=id)
     redirect_func_id = equipamento.funcionario.id if equipamento.funcionario else None
-    
-    equipamento.funcionario = None
-    equipamento.dispositivo = None
-    equipamento.save()
-    
+
+    # O item volta a ser uma unidade do lote do seu modelo
+    equipamento.desvincular()
+
     # messages.success(request, "Equipamento desvinculado e devolvido ao estoque.")
     
     if redirect_func_id:
@@ -119,13 +198,12 @@ def desvincular_equipamento(request, id):
 # --- DASHBOARD E ESTOQUE ---
 
 @login_required
+@somente_leitura
 def dashboard_estoque(request):
-    metricas = EquipamentoAuxiliar.objects.values('tipo_equipamento_aux').annotate(
-        total=Count('id'),
-        disponiveis=Count('id', filter=Q(status='DISPONIVEL')),
-        ativos=Count('id', filter=Q(status='ATIVO')),
-        manutencao=Count('id', filter=Q(status='MANUTENCAO'))
-    ).order_by('tipo_equipamento_aux')
+    metricas = respostas.obter(
+        'dashboard_estoque', ['equipamentos.EquipamentoAuxiliar', 'equipamentos.LoteEstoque'], (),
+        EquipamentoAuxiliar.metricas_por_tipo,
+    )
 
     return render(request, 'equipamentos/dashboard.html', {
         'metricas': metricas,
@@ -137,29 +215,15 @@ def entrada_estoque(request):
     if request.method == "POST":
         tipo = request.POST.get('tipo_equipamento_aux')
         quantidade = int(request.POST.get('quantidade') or 0)
-        prefixo_nome = request.POST.get('prefixo_nome') or "Item de Estoque"
+        prefixo_nome = (request.POST.get('prefixo_nome') or "").strip() or "Item de Estoque"
 
-        if quantidade < 1:
+        if quantidade < 1 or tipo not in dict(TIPO_EQUIPAMENTO_AUX_CHOICES):
             # messages.error(request, "A quantidade deve ser maior que zero.")
             return redirect('equipamentos:dashboard_estoque')
 
-        novos_itens = []
-        for i in range(quantidade):
-            # --- MUDANÇA AQUI ---
-            # Antes estava: nome_final = f"{prefixo_nome} - {i+1}"
-            # Agora usamos apenas o nome puro:
-            nome_final = prefixo_nome 
-            
-            novos_itens.append(EquipamentoAuxiliar(
-                nome=nome_final,
-                tipo_equipamento_aux=tipo,
-                status='DISPONIVEL',
-                funcionario=None,
-                dispositivo=None
-            ))
-        
-        EquipamentoAuxiliar.objects.bulk_create(novos_itens)
-        
+        # Unidades iguais só somam no lote do modelo: 5.000 mouses são um UPDATE, não 5.000 linhas
+        LoteEstoque.ajustar(tipo, prefixo_nome, disponivel=quantidade)
+
         # messages.success(request, f"{quantidade} novos itens adicionados!")
         return redirect('equipamentos:dashboard_estoque')
 
@@ -169,10 +233,25 @@ def entrada_estoque(request):
 
 @login_required
 def listar_equipamentos_por_tipo(request, tipo_codigo):
-    itens = EquipamentoAuxiliar.objects.filter(tipo_equipamento_aux=tipo_codigo).order_by('status', 'nome')
+    def calcular():
+        # Estoque (livre e em manutenção): uma linha por modelo
+        lotes = LoteEstoque.objects.filter(tipo_equipamento_aux=tipo_codigo).order_by('nome')
+        # Itens em uso: o template mostra o funcionário/dispositivo de cada linha, busca tudo no mesmo JOIN
+        itens = EquipamentoAuxiliar.objects.filter(tipo_equipamento_aux=tipo_codigo).select_related(
+            'funcionario', 'dispositivo'
+        ).order_by('status', 'nome')
+        return list(lotes), list(itens)
+
+    # O nome do funcionário e o código do dispositivo aparecem na tela: dependem deles também
+    lotes, itens = respostas.obter(
+        'listar_por_tipo',
+        ['equipamentos.EquipamentoAuxiliar', 'equipamentos.LoteEstoque', 'funcionarios.Funcionario', 'dispositivos.Dispositivo'],
+        (tipo_codigo,), calcular,
+    )
     nome_tipo = dict(TIPO_EQUIPAMENTO_AUX_CHOICES).get(tipo_codigo, tipo_codigo)
 
     return render(request, 'equipamentos/lista_por_tipo.html', {
+        'lotes': lotes,
         'itens': itens,
         'tipo_codigo': tipo_codigo,
         'nome_tipo': nome_tipo
@@ -181,13 +260,44 @@ def listar_equipamentos_por_tipo(request, tipo_codigo):
 @login_required
 def acao_manutencao_equipamento(request, id):
     item = get_object_or_404(EquipamentoAuxiliar, id=id)
-    
+
     if item.status == 'MANUTENCAO':
-        item.status = 'DISPONIVEL'
+        # Volta ao estoque: vira uma unidade livre do lote do seu modelo
+        item.desvincular()
         # messages.success(request, f"{item.nome} retornou da manutenção.")
     else:
-        item.status = 'MANUTENCAO'
+        # Sai de quem estava com ele e passa a contar como unidade em manutenção do lote
+        item.enviar_para_manutencao()
         # messages.warning(request, f"{item.nome} enviado para manutenção.")
-    
-    item.save()
-    return redirect('equipamentos:listar_por_tipo', tipo_codigo=item.tipo_equipamento_aux)
\ No newline at end of file
+
+    return redirect('equipamentos:listar_por_tipo', tipo_codigo=item.tipo_equipamento_aux)
+
+@login_required
+def acao_manutencao_lote(request, id, acao):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    if acao not in ('enviar', 'retornar'):
+        raise Http404("Ação inválida.")
+    lote = get_object_or_404(LoteEstoque, id=id)
+    try:
+        quantidade = max(int(request.POST.get('quantidade') or 1), 1)
+    except ValueError:
+        quantidade = 1
+
+    try:
+        if acao == 'enviar':
+            lote.enviar_para_manutencao(quantidade)
+        else:
+            lote.retornar_da_manutencao(quantidade)
+    except EstoqueInsuficiente as erro:
+        messages.error(request, str(erro))
+
+    return redirect('equipamentos:listar_por_tipo', tipo_codigo=lote.tipo_equipamento_aux)
+
+@login_required
+def deletar_lote(request, id):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    lote = get_object_or_404(LoteEstoque, id=id)
+    lote.delete()
+    return redirect('equipamentos:listar_por_tipo', tipo_codigo=lote.tipo_equipamento_aux)
\ No newline at end of file
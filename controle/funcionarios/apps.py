@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class FuncionariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'funcionarios'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from core import eventos
+        from .models import Funcionario
+
+        # Canal do stream com o total de ativos/demitidos
+        eventos.registrar_canal(
+            'funcionarios',
+            ['funcionarios.Funcionario'],
+            Funcionario.totais_por_status,
+        )
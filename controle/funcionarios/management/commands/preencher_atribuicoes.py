@@ -0,0 +1,95 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from dispositivos.models import Dispositivo
+from equipamentos.models import EquipamentoAuxiliar
+from funcionarios.models import AtribuicaoAtivo
+
+
+class Command(BaseCommand):
+    help = (
+        "Acerta o livro de atribuições (AtribuicaoAtivo) com quem está com cada dispositivo e "
+        "equipamento agora: abre as atribuições que faltam e fecha as que não valem mais. "
+        "Pode rodar quantas vezes quiser; na segunda não há nada a fazer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help="Início (AAAA-MM-DD ou data/hora ISO) das atribuições que nunca foram registradas. "
+                 "Padrão: a última alteração do item (atualizado_em), a data mais antiga que se pode afirmar.",
+        )
+        parser.add_argument('--lote', type=int, default=2000, help="Linhas lidas/gravadas por vez.")
+        parser.add_argument(
+            '--somente-verificar',
+            action='store_true',
+            help="Apenas mostra o que seria aberto e fechado, sem gravar.",
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            desde = parse_datetime(options['desde'])
+            if desde is None and parse_date(options['desde']):
+                desde = datetime.combine(parse_date(options['desde']), time.min)
+            if desde is None:
+                raise CommandError(f"Data inválida em --desde: {options['desde']}")
+            if timezone.is_naive(desde):
+                desde = timezone.make_aware(desde)
+
+        agora = timezone.now()
+        for tipo, model, identificacao in (
+            ('DISPOSITIVO', Dispositivo, 'codigo'),
+            ('EQUIPAMENTO', EquipamentoAuxiliar, 'nome'),
+        ):
+            with transaction.atomic():
+                abrir, fechar, trocadas = self._comparar(tipo, model, identificacao, desde, agora, options['lote'])
+                self.stdout.write(
+                    f"{tipo}: {len(abrir) - trocadas} sem registro, {trocadas} com outro dono no livro, "
+                    f"{len(fechar) - trocadas} abertas de itens que já não estão com ninguém."
+                )
+                if options['somente_verificar'] or not (abrir or fechar):
+                    continue
+                for i in range(0, len(fechar), options['lote']):
+                    AtribuicaoAtivo.objects.filter(pk__in=fechar[i:i + options['lote']]).update(fim=agora)
+                AtribuicaoAtivo.objects.bulk_create(abrir, batch_size=options['lote'])
+
+        if options['somente_verificar']:
+            self.stdout.write("Nada foi alterado.")
+        else:
+            self.stdout.write(self.style.SUCCESS("Livro de atribuições conferido com o estado atual."))
+
+    def _comparar(self, tipo, model, identificacao, desde, agora, lote):
+        """(atribuições a criar, pks a fechar, quantas trocaram de dono sem passar pelo livro)."""
+        # Uma atribuição aberta por item com dono: cabe na memória mesmo com o livro enorme
+        abertas = {
+            ativo_id: (pk, funcionario_id)
+            for pk, ativo_id, funcionario_id in AtribuicaoAtivo.objects.filter(
+                tipo_ativo=tipo, fim__isnull=True
+            ).values_list('pk', 'ativo_id', 'funcionario_id').iterator(chunk_size=lote)
+        }
+        abrir, fechar, trocadas = [], [], 0
+        itens = model.objects.filter(funcionario__isnull=False).order_by().values_list(
+            'id', identificacao, 'funcionario_id', 'atualizado_em'
+        )
+        for ativo_id, nome, funcionario_id, atualizado_em in itens.iterator(chunk_size=lote):
+            aberta = abertas.pop(ativo_id, None)
+            if aberta is not None and aberta[1] == funcionario_id:
+                continue
+            inicio = desde or atualizado_em
+            if aberta is not None:
+                # Trocou de dono sem registro: não se sabe quando, então a troca fica para agora
+                fechar.append(aberta[0])
+                trocadas += 1
+                inicio = agora
+            abrir.append(AtribuicaoAtivo(
+                tipo_ativo=tipo, ativo_id=ativo_id, identificacao=nome,
+                funcionario_id=funcionario_id, inicio=inicio,
+            ))
+        # O que sobrou está aberto no livro, mas o item está sem dono ou foi apagado
+        fechar.extend(pk for pk, _ in abertas.values())
+        return abrir, fechar, trocadas
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0003_alter_funcionario_unidade_trabalho'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='funcionario',
+            index=models.Index(fields=['status', 'nome'], name='funcionario_status_nome'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0004_funcionario_status_nome'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historicofuncionario',
+            index=models.Index(fields=['funcionario', '-data'], name='historico_funcionario_data'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0005_historico_funcionario_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='funcionario',
+            name='atualizado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='funcionario',
+            name='versao',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0006_versao_da_linha'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AtribuicaoAtivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_ativo', models.CharField(choices=[('DISPOSITIVO', 'Dispositivo'), ('EQUIPAMENTO', 'Equipamento auxiliar')], max_length=12)),
+                ('ativo_id', models.PositiveBigIntegerField()),
+                ('identificacao', models.CharField(max_length=100)),
+                ('inicio', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fim', models.DateTimeField(blank=True, null=True)),
+                ('funcionario', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='atribuicoes', to='funcionarios.funcionario')),
+            ],
+            options={
+                'verbose_name': 'Atribuição de Ativo',
+                'verbose_name_plural': 'Atribuições de Ativos',
+                'ordering': ['-inicio'],
+                'indexes': [models.Index(fields=['tipo_ativo', 'ativo_id', '-inicio'], name='atribuicao_ativo_inicio'), models.Index(fields=['funcionario', '-inicio'], name='atribuicao_funcionario_inicio')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('funcionarios', '0007_atribuicao_ativo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='funcionario',
+            index=models.Index(fields=['nome'], name='funcionario_nome'),
+        ),
+    ]
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count
 from django.utils import timezone
 
-class Funcionario(models.Model):
+from core.models import Versionado
+
+class Funcionario(Versionado):
     STATUS_CHOICES = [
         ("ATIVO", "Ativo"),
         ("DEMITIDO", "Demitido"),
@@ -37,12 +40,25 @@ class Funcionario(models.Model):
 
     class Meta:
         ordering = ["nome"]
+        indexes = [
+            # Listagem paginada por (nome, id) dentro de cada status
+            models.Index(fields=["status", "nome"], name="funcionario_status_nome"),
+            # Busca por prefixo do nome (core.busca, termos curtos da listagem de dispositivos)
+            models.Index(fields=["nome"], name="funcionario_nome"),
+        ]
         verbose_name = "Funcionário"
         verbose_name_plural = "Funcionários"
 
     def __str__(self):
         return self.nome
 
+    @classmethod
+    def totais_por_status(cls):
+        totais = dict(
+            cls.objects.order_by().values('status').annotate(qtd=models.Count('id')).values_list('status', 'qtd')
+        )
+        return {'ativos': totais.get('ATIVO', 0), 'demitidos': totais.get('DEMITIDO', 0)}
+
     def demitir(self):
         """Marca funcionário como demitido e registra no histórico"""
         self.status = "DEMITIDO"
@@ -56,6 +72,77 @@ class Funcionario(models.Model):
             descricao=f"{self.nome} foi demitido."
         )
 
+    @classmethod
+    def demitir_em_lote(cls, ids):
+        """
+        Demite vários funcionários de uma vez e devolve todos os itens deles ao estoque.
+        Tudo numa transação e com UPDATEs por conjunto: o número de queries não
+        depende de quantos funcionários, dispositivos ou equipamentos existem.
+        Devolve a lista dos funcionários demitidos (os já demitidos são ignorados).
+        """
+        from core import busca, versoes
+        from dispositivos.models import ContadorDispositivo, Dispositivo
+        from equipamentos.models import EquipamentoAuxiliar, LoteEstoque
+
+        agora = timezone.now()
+        with transaction.atomic():
+            demitidos = list(
+                cls.objects.select_for_update().filter(pk__in=ids, status="ATIVO").only("id", "nome")
+            )
+            ids = [f.pk for f in demitidos]
+            if not ids:
+                return []
+
+            # Dispositivos: voltam como DISPONIVEL (os contadores do dashboard acompanham)
+            dispositivos = Dispositivo.objects.filter(funcionario_id__in=ids)
+            deltas = {}
+            for linha in dispositivos.order_by().values("tipo_dispositivo", "status").annotate(qtd=Count("id")):
+                if linha["status"] == "DISPONIVEL":
+                    continue
+                tipo = linha["tipo_dispositivo"]
+                deltas[(tipo, linha["status"])] = deltas.get((tipo, linha["status"]), 0) - linha["qtd"]
+                deltas[(tipo, "DISPONIVEL")] = deltas.get((tipo, "DISPONIVEL"), 0) + linha["qtd"]
+            # Fecha no livro de atribuições tudo o que estava com eles (dispositivos e equipamentos)
+            AtribuicaoAtivo.encerrar_do_funcionario(ids, agora)
+            dispositivos.update(funcionario=None, status="DISPONIVEL", **Versionado.alteracao())
+            ContadorDispositivo.ajustar_varios(deltas)
+
+            # Equipamentos presos a um dispositivo continuam nele (ATIVO); os soltos voltam
+            # a ser unidades do lote do seu modelo, como no EquipamentoAuxiliar.desvincular()
+            equipamentos = EquipamentoAuxiliar.objects.filter(funcionario_id__in=ids)
+            soltos = equipamentos.filter(dispositivo__isnull=True)
+            LoteEstoque.ajustar_varios({
+                (linha["tipo_equipamento_aux"], linha["nome"]): (linha["qtd"], 0)
+                for linha in soltos.order_by().values("tipo_equipamento_aux", "nome").annotate(qtd=Count("id"))
+            })
+            # delete() dispararia um post_delete (e um DELETE no índice de busca) por item.
+            # _raw_delete: nada referencia EquipamentoAuxiliar por FK, então não há cascata
+            # a fazer, e o índice e o livro de atribuições já foram tratados acima.
+            # Em fatias, como no índice de busca: um IN com todos os ids estouraria o
+            # limite de variáveis do SQLite e o max_allowed_packet do MySQL
+            ids_soltos = list(soltos.values_list("id", flat=True))
+            busca.remover_lote("EQUIPAMENTO", ids_soltos)
+            for i in range(0, len(ids_soltos), busca.LOTE_IDS):
+                fatia = EquipamentoAuxiliar.objects.filter(pk__in=ids_soltos[i:i + busca.LOTE_IDS])
+                fatia._raw_delete(fatia.db)
+            equipamentos.update(funcionario=None, status="ATIVO", **Versionado.alteracao())
+
+            cls.objects.filter(pk__in=ids).update(status="DEMITIDO", data_demissao=agora.date(), **Versionado.alteracao())
+            HistoricoFuncionario.objects.bulk_create([
+                HistoricoFuncionario(
+                    funcionario=f, acao="DEMITIDO", data=agora, descricao=f"{f.nome} foi demitido."
+                )
+                for f in demitidos
+            ])
+
+            # UPDATE em lote não dispara signals: avisa os dashboards manualmente
+            versoes.invalidar(
+                "dispositivos.Dispositivo", "equipamentos.EquipamentoAuxiliar",
+                "funcionarios.Funcionario", "funcionarios.HistoricoFuncionario",
+            )
+
+        return demitidos
+
     def reativar(self):
         """Reativa funcionário anteriormente demitido"""
         self.status = "ATIVO"
@@ -84,8 +171,128 @@ class HistoricoFuncionario(models.Model):
 
     class Meta:
         ordering = ["-data"]
+        indexes = [
+            # Histórico de um funcionário, do mais recente para o mais antigo
+            models.Index(fields=["funcionario", "-data"], name="historico_funcionario_data"),
+        ]
         verbose_name = "Histórico do Funcionário"
         verbose_name_plural = "Históricos dos Funcionários"
 
     def __str__(self):
-        return f"{self.funcionario.nome} - {self.get_acao_display()}"
\ No newline at end of file
+        return f"{self.funcionario.nome} - {self.get_acao_display()}"
+
+
+class AtribuicaoAtivo(models.Model):
+    """
+    Livro das atribuições: com qual funcionário cada dispositivo ou equipamento
+    esteve, de `inicio` até `fim` (nulo enquanto continua com ele).
+
+    Só cresce. Uma linha nasce aberta quando o item é entregue e recebe o `fim`
+    uma única vez, quando sai do funcionário; nada é apagado nem reescrito, nem
+    quando o item ou o funcionário deixam de existir (por isso sem FK para o
+    item e sem constraint para o funcionário).
+
+    Quem escreve: o save() de Dispositivo e EquipamentoAuxiliar, os receivers de
+    exclusão e os caminhos em lote (demitir_em_lote, importação). Para acertar
+    com o estado atual: python manage.py preencher_atribuicoes
+    """
+    TIPOS = [
+        ("DISPOSITIVO", "Dispositivo"),
+        ("EQUIPAMENTO", "Equipamento auxiliar"),
+    ]
+
+    tipo_ativo = models.CharField(max_length=12, choices=TIPOS)
+    ativo_id = models.PositiveBigIntegerField()
+    # Código do dispositivo / nome do equipamento na época da entrega
+    identificacao = models.CharField(max_length=100)
+    # Sem índice próprio: o (funcionario, inicio) abaixo já cobre
+    funcionario = models.ForeignKey(
+        Funcionario, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name="atribuicoes"
+    )
+    inicio = models.DateTimeField(default=timezone.now)
+    fim = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-inicio"]
+        indexes = [
+            # Com quem estava o item numa data: a última atribuição com inicio <= data (um seek + LIMIT 1);
+            # o prefixo (tipo, item) também acha a atribuição aberta a fechar
+            models.Index(fields=["tipo_ativo", "ativo_id", "-inicio"], name="atribuicao_ativo_inicio"),
+            # O que estava com um funcionário numa data ou período
+            models.Index(fields=["funcionario", "-inicio"], name="atribuicao_funcionario_inicio"),
+        ]
+        verbose_name = "Atribuição de Ativo"
+        verbose_name_plural = "Atribuições de Ativos"
+
+    def __str__(self):
+        return f"{self.identificacao} -> {self.funcionario_id} ({self.inicio:%d/%m/%Y} - {self.fim or '...'})"
+
+    @staticmethod
+    def mudou(anterior_id, novo_id):
+        # O formulário manda o id como texto; o banco devolve int
+        return (int(anterior_id) if anterior_id else None) != (int(novo_id) if novo_id else None)
+
+    @classmethod
+    def trocar(cls, tipo_ativo, ativo_id, identificacao, anterior_id, novo_id, quando=None):
+        """Fecha a atribuição aberta do item e abre a do novo funcionário (nada, se o dono não mudou)."""
+        if not cls.mudou(anterior_id, novo_id):
+            return
+        quando = quando or timezone.now()
+        if anterior_id:
+            cls.encerrar(tipo_ativo, [ativo_id], quando)
+        if novo_id:
+            cls.objects.create(
+                tipo_ativo=tipo_ativo, ativo_id=ativo_id, identificacao=identificacao,
+                funcionario_id=novo_id, inicio=quando,
+            )
+
+    @classmethod
+    def abrir_varios(cls, tipo_ativo, itens, quando=None):
+        """Caminhos em lote: [(ativo_id, identificacao, funcionario_id)], ignorando os sem funcionário."""
+        quando = quando or timezone.now()
+        cls.objects.bulk_create([
+            cls(tipo_ativo=tipo_ativo, ativo_id=ativo_id, identificacao=identificacao,
+                funcionario_id=funcionario_id, inicio=quando)
+            for ativo_id, identificacao, funcionario_id in itens if funcionario_id
+        ])
+
+    @classmethod
+    def encerrar(cls, tipo_ativo, ativo_ids, quando=None):
+        return cls.objects.filter(tipo_ativo=tipo_ativo, ativo_id__in=ativo_ids, fim__isnull=True).update(
+            fim=quando or timezone.now()
+        )
+
+    @classmethod
+    def encerrar_do_funcionario(cls, funcionario_ids, quando=None):
+        """Tudo que estava com esses funcionários sai deles (demissão, exclusão)."""
+        return cls.objects.filter(funcionario_id__in=funcionario_ids, fim__isnull=True).update(
+            fim=quando or timezone.now()
+        )
+
+    @classmethod
+    def responsavel_em(cls, tipo_ativo, ativo_id, quando):
+        """A atribuição vigente do item no instante `quando`, ou None se estava sem dono."""
+        atribuicao = cls.objects.filter(
+            tipo_ativo=tipo_ativo, ativo_id=ativo_id, inicio__lte=quando
+        ).order_by("-inicio", "-id").first()
+        if atribuicao is None or (atribuicao.fim is not None and atribuicao.fim <= quando):
+            return None
+        return atribuicao
+
+    @classmethod
+    def dispositivo_em(cls, codigo, quando):
+        """Com quem estava o dispositivo de código `codigo` no instante `quando`."""
+        from dispositivos.models import Dispositivo
+
+        ativo_id = Dispositivo.objects.filter(codigo=codigo).values_list("id", flat=True).first()
+        if ativo_id is None:
+            return None
+        return cls.responsavel_em("DISPOSITIVO", ativo_id, quando)
+
+    @classmethod
+    def do_funcionario(cls, funcionario_id, inicio, fim=None):
+        """Atribuições do funcionário que se sobrepõem ao período [inicio, fim] (fim nulo = até agora)."""
+        return cls.objects.filter(
+            funcionario_id=funcionario_id, inicio__lte=fim or timezone.now()
+        ).filter(models.Q(fim__isnull=True) | models.Q(fim__gt=inicio))
+
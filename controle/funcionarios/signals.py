@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core import busca, versoes
+from core.models import Versionado
+
+from .models import AtribuicaoAtivo, Funcionario, HistoricoFuncionario
+
+
+@receiver([post_save, post_delete], sender=Funcionario)
+@receiver([post_save, post_delete], sender=HistoricoFuncionario)
+def invalidar_versao_funcionario(sender, **kwargs):
+    versoes.invalidar(sender._meta.label)
+
+
+@receiver(post_save, sender=Funcionario)
+def indexar_funcionario(sender, instance, **kwargs):
+    # Mantém o índice de trigramas da busca (core.busca)
+    busca.indexar('FUNCIONARIO', instance)
+
+
+@receiver(post_delete, sender=Funcionario)
+def remover_funcionario_do_indice(sender, instance, **kwargs):
+    busca.remover('FUNCIONARIO', instance.pk)
+
+
+@receiver(post_delete, sender=Funcionario)
+def encerrar_atribuicoes_funcionario(sender, instance, **kwargs):
+    # O SET_NULL nos itens é um UPDATE direto, sem passar pelo save()
+    AtribuicaoAtivo.encerrar_do_funcionario([instance.pk])
+
+
+@receiver(pre_delete, sender=Funcionario)
+def versionar_itens_do_funcionario(sender, instance, **kwargs):
+    # O SET_NULL que vem em seguida também é um UPDATE direto: sem passar pelos signals
+    # de Dispositivo e EquipamentoAuxiliar, respostas em cache e ETags por linha
+    # continuariam mostrando o funcionário excluído. Aqui a versão das linhas sobe
+    # (ainda dá para achá-las pelo funcionario_id) e, depois do commit, a dos models.
+    from dispositivos.models import Dispositivo
+    from equipamentos.models import EquipamentoAuxiliar
+
+    Dispositivo.objects.filter(funcionario_id=instance.pk).update(**Versionado.alteracao())
+    EquipamentoAuxiliar.objects.filter(funcionario_id=instance.pk).update(**Versionado.alteracao())
+    versoes.invalidar('dispositivos.Dispositivo', 'equipamentos.EquipamentoAuxiliar')
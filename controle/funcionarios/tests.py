@@ -1,3 +1,241 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import busca
+from core.models import IndiceBusca
+from dispositivos.models import ContadorDispositivo, Dispositivo
+from equipamentos.models import EquipamentoAuxiliar, LoteEstoque
+
+from .models import AtribuicaoAtivo, Funcionario, HistoricoFuncionario
+
+
+class DemitirEmLoteTests(TestCase):
+    def setUp(self):
+        self.ana = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+        self.bruno = Funcionario.objects.create(nome='Bruno', email='bruno@exemplo.com')
+        self.carla = Funcionario.objects.create(nome='Carla', email='carla@exemplo.com')
+
+        self.notebook = Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        self.notebook.vincular(self.ana)
+        Dispositivo.objects.create(codigo='CL-1', tipo_dispositivo='COLETOR').vincular(self.bruno)
+        Dispositivo.objects.create(codigo='NB-2', tipo_dispositivo='NOTEBOOK').vincular(self.carla)
+
+        self.mouse = EquipamentoAuxiliar.objects.create(nome='Mouse X', tipo_equipamento_aux='MOUSE')
+        self.mouse.vincular(funcionario=self.ana)
+        # Preso ao notebook: continua nele depois da demissão
+        self.teclado = EquipamentoAuxiliar.objects.create(nome='Teclado Y', tipo_equipamento_aux='TECLADO')
+        self.teclado.vincular(funcionario=self.ana, dispositivo=self.notebook)
+
+    def contador(self, tipo, status):
+        linha = ContadorDispositivo.objects.filter(tipo_dispositivo=tipo, status=status).first()
+        return linha.quantidade if linha else 0
+
+    def test_devolve_tudo_e_acerta_os_contadores(self):
+        demitidos = Funcionario.demitir_em_lote([self.ana.pk, self.bruno.pk])
+
+        self.assertEqual({f.pk for f in demitidos}, {self.ana.pk, self.bruno.pk})
+        self.assertEqual(
+            set(Funcionario.objects.filter(status='DEMITIDO').values_list('nome', flat=True)), {'Ana', 'Bruno'}
+        )
+        self.assertFalse(Dispositivo.objects.filter(funcionario__in=[self.ana, self.bruno]).exists())
+        self.assertEqual(
+            set(Dispositivo.objects.filter(status='DISPONIVEL').values_list('codigo', flat=True)), {'NB-1', 'CL-1'}
+        )
+        self.assertEqual(self.contador('NOTEBOOK', 'DISPONIVEL'), 1)
+        self.assertEqual(self.contador('NOTEBOOK', 'ATIVO'), 1)
+        self.assertEqual(self.contador('COLETOR', 'ATIVO'), 0)
+        self.assertEqual(self.contador('COLETOR', 'DISPONIVEL'), 1)
+        self.assertEqual(ContadorDispositivo.contagem_real(), {
+            ('NOTEBOOK', 'DISPONIVEL'): 1, ('NOTEBOOK', 'ATIVO'): 1, ('COLETOR', 'DISPONIVEL'): 1,
+        })
+
+    def test_equipamentos_soltos_voltam_ao_lote(self):
+        Funcionario.demitir_em_lote([self.ana.pk])
+
+        self.assertFalse(EquipamentoAuxiliar.objects.filter(pk=self.mouse.pk).exists())
+        self.assertEqual(LoteEstoque.objects.get(tipo_equipamento_aux='MOUSE', nome='Mouse X').quantidade_disponivel, 1)
+        teclado = EquipamentoAuxiliar.objects.get(pk=self.teclado.pk)
+        self.assertIsNone(teclado.funcionario_id)
+        self.assertEqual(teclado.dispositivo_id, self.notebook.pk)
+        self.assertEqual(teclado.status, 'ATIVO')
+
+    def test_exclusao_em_fatias(self):
+        for _ in range(4):
+            EquipamentoAuxiliar.objects.create(nome='Mouse X', tipo_equipamento_aux='MOUSE').vincular(funcionario=self.ana)
+
+        with mock.patch.object(busca, 'LOTE_IDS', 2):
+            Funcionario.demitir_em_lote([self.ana.pk])
+
+        self.assertEqual(list(EquipamentoAuxiliar.objects.values_list('pk', flat=True)), [self.teclado.pk])
+        self.assertEqual(LoteEstoque.objects.get(tipo_equipamento_aux='MOUSE', nome='Mouse X').quantidade_disponivel, 5)
+        self.assertEqual(
+            set(IndiceBusca.objects.filter(tipo='EQUIPAMENTO').values_list('objeto_id', flat=True)), {self.teclado.pk}
+        )
+
+    def test_registra_historico_e_fecha_atribuicoes(self):
+        Funcionario.demitir_em_lote([self.ana.pk])
+
+        historico = HistoricoFuncionario.objects.get(funcionario=self.ana)
+        self.assertEqual(historico.acao, 'DEMITIDO')
+        self.assertEqual(historico.descricao, 'Ana foi demitido.')
+        self.assertFalse(AtribuicaoAtivo.objects.filter(funcionario=self.ana, fim__isnull=True).exists())
+        self.assertEqual(AtribuicaoAtivo.objects.filter(funcionario=self.ana).count(), 3)
+        self.assertTrue(AtribuicaoAtivo.objects.filter(funcionario=self.carla, fim__isnull=True).exists())
+
+    def test_ja_demitido_e_ignorado(self):
+        Funcionario.demitir_em_lote([self.ana.pk])
+
+        self.assertEqual(Funcionario.demitir_em_lote([self.ana.pk]), [])
+        self.assertEqual(HistoricoFuncionario.objects.filter(funcionario=self.ana).count(), 1)
+
+    def test_queries_nao_dependem_da_quantidade(self):
+        # Lote já existente: a comparação não mede a criação dele
+        LoteEstoque.ajustar('MOUSE', 'Mouse X', disponivel=1)
+
+        def demitir(prefixo, quantos):
+            ids = []
+            for i in range(quantos):
+                funcionario = Funcionario.objects.create(nome=f'{prefixo} {i}', email=f'{prefixo}{i}@exemplo.com')
+                Dispositivo.objects.create(codigo=f'{prefixo}-{i}', tipo_dispositivo='NOTEBOOK').vincular(funcionario)
+                EquipamentoAuxiliar.objects.create(nome='Mouse X', tipo_equipamento_aux='MOUSE').vincular(funcionario=funcionario)
+                ids.append(funcionario.pk)
+            with CaptureQueriesContext(connection) as queries:
+                Funcionario.demitir_em_lote(ids)
+            return len(queries)
+
+        self.assertEqual(demitir('um', 1), demitir('varios', 10))
+
+
+class DemitirEmLoteViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('operador'))
+        Funcionario.objects.create(nome='Ana', email='Ana.Souza@Exemplo.com')
+        Funcionario.objects.create(nome='Bruno', email='bruno@exemplo.com')
+
+    def test_csv_ignora_maiusculas(self):
+        arquivo = SimpleUploadedFile('demitir.csv', b'email\nana.souza@exemplo.com\nBRUNO@EXEMPLO.COM\nninguem@exemplo.com\n')
+
+        resposta = self.client.post(reverse('funcionarios:demitir_em_lote'), {'arquivo': arquivo})
+
+        self.assertEqual(Funcionario.objects.filter(status='DEMITIDO').count(), 2)
+        mensagens = [str(m) for m in get_messages(resposta.wsgi_request)]
+        self.assertIn('Emails não encontrados: ninguem@exemplo.com', mensagens)
+
+
+class AtribuicaoAtivoTests(TestCase):
+    def setUp(self):
+        self.ana = Funcionario.objects.create(nome='Ana', email='ana@exemplo.com')
+        self.bruno = Funcionario.objects.create(nome='Bruno', email='bruno@exemplo.com')
+        self.inicio = timezone.now() - timedelta(days=10)
+
+    def dia(self, n):
+        return self.inicio + timedelta(days=n)
+
+    def test_trocar_fecha_e_abre(self):
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', None, self.ana.pk, self.dia(0))
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', self.ana.pk, str(self.ana.pk), self.dia(1))
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', self.ana.pk, self.bruno.pk, self.dia(2))
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', self.bruno.pk, None, self.dia(3))
+
+        self.assertEqual(
+            list(AtribuicaoAtivo.objects.order_by('inicio').values_list('funcionario_id', 'inicio', 'fim')),
+            [(self.ana.pk, self.dia(0), self.dia(2)), (self.bruno.pk, self.dia(2), self.dia(3))],
+        )
+
+    def test_responsavel_em(self):
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', None, self.ana.pk, self.dia(0))
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', self.ana.pk, None, self.dia(2))
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', None, self.bruno.pk, self.dia(4))
+
+        def dono(n):
+            atribuicao = AtribuicaoAtivo.responsavel_em('DISPOSITIVO', 1, self.dia(n))
+            return atribuicao and atribuicao.funcionario_id
+
+        self.assertIsNone(dono(-1))
+        self.assertEqual(dono(0), self.ana.pk)
+        self.assertEqual(dono(1), self.ana.pk)
+        # O fim é exclusivo: no instante da devolução o item já está sem dono
+        self.assertIsNone(dono(2))
+        self.assertIsNone(dono(3))
+        self.assertEqual(dono(4), self.bruno.pk)
+        self.assertEqual(dono(9), self.bruno.pk)
+        self.assertIsNone(AtribuicaoAtivo.responsavel_em('EQUIPAMENTO', 1, self.dia(1)))
+
+    def test_save_do_dispositivo_registra(self):
+        dispositivo = Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        self.assertFalse(AtribuicaoAtivo.objects.exists())
+
+        dispositivo.vincular(self.ana)
+        entregue = timezone.now()
+        dispositivo.desvincular()
+
+        self.assertEqual(AtribuicaoAtivo.dispositivo_em('NB-1', entregue).funcionario_id, self.ana.pk)
+        self.assertIsNone(AtribuicaoAtivo.dispositivo_em('NB-1', timezone.now()))
+        self.assertIsNone(AtribuicaoAtivo.dispositivo_em('NADA', entregue))
+        self.assertEqual(AtribuicaoAtivo.objects.get().identificacao, 'NB-1')
+
+    def test_do_funcionario_por_periodo(self):
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', None, self.ana.pk, self.dia(0))
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', self.ana.pk, None, self.dia(2))
+        AtribuicaoAtivo.trocar('EQUIPAMENTO', 7, 'Mouse X', None, self.ana.pk, self.dia(5))
+
+        def identificacoes(inicio, fim=None):
+            return sorted(AtribuicaoAtivo.do_funcionario(self.ana.pk, inicio, fim).values_list('identificacao', flat=True))
+
+        self.assertEqual(identificacoes(self.dia(1), self.dia(3)), ['NB-1'])
+        self.assertEqual(identificacoes(self.dia(3), self.dia(4)), [])
+        self.assertEqual(identificacoes(self.dia(3)), ['Mouse X'])
+        self.assertEqual(identificacoes(self.dia(-5), self.dia(9)), ['Mouse X', 'NB-1'])
+
+    def test_encerrar_do_funcionario(self):
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 1, 'NB-1', None, self.ana.pk, self.dia(0))
+        AtribuicaoAtivo.trocar('EQUIPAMENTO', 7, 'Mouse X', None, self.ana.pk, self.dia(0))
+        AtribuicaoAtivo.trocar('DISPOSITIVO', 2, 'NB-2', None, self.bruno.pk, self.dia(0))
+
+        self.assertEqual(AtribuicaoAtivo.encerrar_do_funcionario([self.ana.pk], self.dia(1)), 2)
+        # Já fechadas não são reescritas
+        self.assertEqual(AtribuicaoAtivo.encerrar_do_funcionario([self.ana.pk], self.dia(5)), 0)
+        self.assertEqual(set(AtribuicaoAtivo.objects.filter(funcionario=self.ana).values_list('fim', flat=True)), {self.dia(1)})
+        self.assertIsNone(AtribuicaoAtivo.objects.get(funcionario=self.bruno).fim)
+
+
+class ExcluirFuncionarioTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('operador'))
+        self.ana = Funcionario.objects.create(nome='Ana Exclusão', email='ana@exemplo.com')
+        self.notebook = Dispositivo.objects.create(codigo='NB-1', tipo_dispositivo='NOTEBOOK')
+        self.notebook.vincular(self.ana)
+        EquipamentoAuxiliar.objects.create(nome='Mouse X', tipo_equipamento_aux='MOUSE').vincular(funcionario=self.ana)
+
+    def excluir(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ana.delete()
+
+    def test_cache_do_dispositivo_nao_mostra_o_excluido(self):
+        url = reverse('dispositivos:editar_dispositivo', args=[self.notebook.pk])
+        antes = self.client.get(url)
+        self.assertEqual(antes.json()['funcionario_id'], self.ana.pk)
+
+        self.excluir()
+
+        # Nem 304 pelo ETag antigo nem o JSON guardado em cache
+        depois = self.client.get(url, HTTP_IF_NONE_MATCH=antes['ETag'])
+        self.assertEqual(depois.status_code, 200)
+        self.assertEqual(depois.json()['funcionario_id'], '')
+
+    def test_listagem_de_equipamentos_nao_mostra_o_excluido(self):
+        url = reverse('equipamentos:listar_por_tipo', args=['MOUSE'])
+        self.assertContains(self.client.get(url), 'Ana Exclusão')
+
+        self.excluir()
 
-# Create your tests here.
+        self.assertNotContains(self.client.get(url), 'Ana Exclusão')
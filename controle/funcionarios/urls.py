@@ -6,11 +6,13 @@ app_name = 'funcionarios'
 urlpatterns = [
     # Listagem principal
     path("", views.listar_funcionarios, name="listar_funcionarios"),
+    path("demitidos/", views.listar_demitidos, name="listar_demitidos"),
     
     # Ações do CRUD
     path("novo/", views.criar_funcionario, name="criar_funcionario"),
     path("editar/<int:id>/", views.editar_funcionario, name="editar_funcionario"),
     path("demitir/<int:id>/", views.demitir_funcionario, name="demitir_funcionario"),
+    path("demitir-lote/", views.demitir_em_lote, name="demitir_em_lote"),
     path("reativar/<int:id>/", views.reativar_funcionario, name="reativar_funcionario"),
     
     # --- ROTAS DE API (AJAX) ---
@@ -18,5 +20,8 @@ urlpatterns = [
     # 1. Busca dados para preencher o modal de Edição (ESSA ESTAVA FALTANDO)
     path("api/get/<int:id>/", views.get_funcionario_json, name="get_funcionario_json"),
 
-    # 2. Busca o HTML do histórico
+    # 2. Sugestões dos seletores de funcionário (autocomplete)
+    path("api/autocompletar/", views.autocompletar_funcionarios, name="autocompletar_funcionarios"),
+
+    # 3. Busca o HTML do histórico
     path('historico/<int:id>/', views.historico_funcionario, name='historico_funcionario'),]
\ No newline at end of file
@@ -1,26 +1,82 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import csv
+import io
+
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.template.loader import render_to_string
+
+from core import busca as indice_busca
+from core import respostas
+from core.condicional import assinatura, condicional, ultima_alteracao
+from core.paginacao import paginar_por_cursor
+from core.replica import somente_leitura
 
 from .models import Funcionario, HistoricoFuncionario
 
 from dispositivos.models import Dispositivo
 from equipamentos.models import EquipamentoAuxiliar
 
+# Funcionários por página (ativos) e por lote ("Carregar mais" dos demitidos)
+TAMANHO_PAGINA = 25
+
+def _filtrar_funcionarios(request, queryset):
+    """Filtros da tela: ?busca= (nome ou email) e ?unidade=."""
+    busca = (request.GET.get('busca') or '').strip()
+    unidade = request.GET.get('unidade') or ''
+
+    if busca:
+        condicao = indice_busca.filtro('FUNCIONARIO', busca)
+        if condicao is None:
+            # Termo curto: prefixo, que usa os índices de nome e email
+            queryset = queryset.filter(Q(nome__istartswith=busca) | Q(email__istartswith=busca))
+        else:
+            queryset = queryset.filter(condicao)
+
+    if unidade:
+        queryset = queryset.filter(unidade_trabalho=unidade)
+
+    return queryset, busca, unidade
+
 @login_required
+@somente_leitura
 def listar_funcionarios(request):
-    ativos = Funcionario.objects.filter(status="ATIVO").order_by("nome")
-    demitidos = Funcionario.objects.filter(status="DEMITIDO").order_by("nome")
-    
+    # Só os ativos são renderizados aqui; os demitidos carregam sob demanda (listar_demitidos)
+    busca = (request.GET.get('busca') or '').strip()
+    unidade = request.GET.get('unidade') or ''
+    cursor = request.GET.get('cursor')
+
+    def calcular():
+        ativos, _, _ = _filtrar_funcionarios(request, Funcionario.objects.filter(status="ATIVO"))
+        return paginar_por_cursor(ativos, ('nome', 'id'), cursor=cursor, tamanho=TAMANHO_PAGINA)
+
+    # A mesma página (filtros + cursor) só é consultada de novo depois que algum funcionário mudar
+    pagina = respostas.obter('listar_funcionarios', ['funcionarios.Funcionario'], (busca, unidade, cursor), calcular)
+
     unidades = Funcionario.UNIDADE_CHOICES
 
     return render(request, "funcionarios/funcionarios.html", {
-        "ativos": ativos,
-        "demitidos": demitidos,
+        "ativos": pagina,
         "unidades": unidades,
+        "busca_atual": busca,
+        "unidade_atual": unidade,
     })
 
+@login_required
+def listar_demitidos(request):
+    """
+    Aba "Histórico / Demitidos": devolve as linhas já renderizadas (fragmento HTML)
+    e o cursor do próximo lote. Só é chamada quando alguém abre a aba.
+    """
+    demitidos, _, _ = _filtrar_funcionarios(request, Funcionario.objects.filter(status="DEMITIDO"))
+    pagina = paginar_por_cursor(demitidos, ('nome', 'id'), cursor=request.GET.get('cursor'), tamanho=TAMANHO_PAGINA)
+
+    html = render_to_string("funcionarios/partials/linhas_demitidos.html", {"demitidos": pagina}, request=request)
+    return JsonResponse({"html": html, "proximo": pagina.next_cursor})
+
 @login_required
 def criar_funcionario(request):
     if request.method != "POST":
@@ -54,16 +110,59 @@ def criar_funcionario(request):
     messages.success(request, "Funcionário contratado com sucesso.")
     return redirect("funcionarios:listar_funcionarios")
 
+# Sugestões devolvidas pelo autocomplete e por quanto tempo ficam no cache
+AUTOCOMPLETAR_LIMITE = 20
+AUTOCOMPLETAR_CACHE_SEGUNDOS = 60
+
 @login_required
-def get_funcionario_json(request, id):
+def autocompletar_funcionarios(request):
+    """
+    API dos seletores de funcionário: ativos cujo nome ou email começa com ?q=.
+    /funcionarios/api/autocompletar/?q=ana  ->  {"resultados": [{"id": 1, "texto": "Ana - ana@..."}]}
+    Prefixo (e não "contém") para cada consulta ser uma leitura de intervalo nos índices
+    de (status, nome) e de email; o resultado fica alguns segundos no cache.
+    """
+    termo = (request.GET.get('q') or '').strip()
+    try:
+        limite = min(max(int(request.GET.get('limite') or AUTOCOMPLETAR_LIMITE), 1), AUTOCOMPLETAR_LIMITE)
+    except ValueError:
+        limite = AUTOCOMPLETAR_LIMITE
+    if not termo:
+        return JsonResponse({'resultados': []})
+
+    def calcular():
+        ativos = Funcionario.objects.filter(status="ATIVO").order_by('nome', 'id')
+        campos = ('id', 'nome', 'email')
+        encontrados = {}
+        for filtro in (Q(nome__istartswith=termo), Q(email__istartswith=termo)):
+            for f in ativos.filter(filtro).values(*campos)[:limite]:
+                encontrados.setdefault(f['id'], f)
+        ordenados = sorted(encontrados.values(), key=lambda f: (f['nome'].lower(), f['id']))[:limite]
+        return [{'id': f['id'], 'texto': f"{f['nome']} - {f['email']}"} for f in ordenados]
+
+    resultados = respostas.obter(
+        'autocompletar_funcionarios', ['funcionarios.Funcionario'], (termo.lower(), limite), calcular,
+        timeout=AUTOCOMPLETAR_CACHE_SEGUNDOS,
+    )
+    response = JsonResponse({'resultados': resultados})
+    response['Cache-Control'] = f'private, max-age={AUTOCOMPLETAR_CACHE_SEGUNDOS // 2}'
+    return response
+
+async def _versao_funcionario(request, id):
+    linha = await Funcionario.aversao_da_linha(id)
+    return linha and (assinatura('funcionario', id, *linha), linha[1])
+
+@login_required
+@condicional(_versao_funcionario)
+async def get_funcionario_json(request, id):
     """API para preencher o modal de edição"""
-    func = get_object_or_404(Funcionario, id=id)
-    return JsonResponse({
-        "id": func.id,
-        "nome": func.nome,
-        "email": func.email,
-        "unidade_trabalho": func.unidade_trabalho 
-    })
+    dados = await respostas.aobter(
+        'get_funcionario_json', ['funcionarios.Funcionario'], (id,),
+        lambda: Funcionario.objects.filter(id=id).values("id", "nome", "email", "unidade_trabalho").afirst(),
+    )
+    if dados is None:
+        raise Http404("Funcionário não encontrado.")
+    return JsonResponse(dados)
 
 @login_required
 def editar_funcionario(request, id):
@@ -83,21 +182,61 @@ def editar_funcionario(request, id):
 def demitir_funcionario(request, id):
     func = get_object_or_404(Funcionario, id=id)
 
-    dispositivos = Dispositivo.objects.filter(funcionario=func)
-    for d in dispositivos:
-        d.funcionario = None
-        d.status = 'DISPONIVEL' 
-        d.save()
+    # Libera dispositivos e equipamentos e registra o histórico numa única transação
+    Funcionario.demitir_em_lote([func.id])
 
-    equipamentos = EquipamentoAuxiliar.objects.filter(funcionario=func)
-    for e in equipamentos:
-        e.funcionario = None
-        e.status = 'DISPONIVEL'
-        e.save()
+    messages.warning(request, f"{func.nome} foi demitido. Todos os itens foram devolvidos ao estoque.")
+    return redirect("funcionarios:listar_funcionarios")
 
-    func.demitir()
+def _emails_do_csv(arquivo):
+    """Lê qualquer célula com '@' de um CSV (uma coluna de emails, com ou sem cabeçalho)."""
+    conteudo = arquivo.read().decode("utf-8-sig", errors="ignore")
+    amostra = conteudo[:2048]
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+    except csv.Error:
+        dialeto = csv.excel
+    emails = set()
+    for linha in csv.reader(io.StringIO(conteudo), dialeto):
+        for celula in linha:
+            celula = celula.strip().lower()
+            if "@" in celula:
+                emails.add(celula)
+    return emails
 
-    messages.warning(request, f"{func.nome} foi demitido. Todos os itens foram devolvidos ao estoque.")
+@login_required
+def demitir_em_lote(request):
+    """
+    Demissão em lote: recebe ids marcados (?ids=) e/ou um CSV com os emails.
+    O custo em queries é o mesmo para 1 ou 1000 funcionários.
+    """
+    if request.method != "POST":
+        return redirect("funcionarios:listar_funcionarios")
+
+    ids = {int(i) for i in request.POST.getlist("ids") if i.isdigit()}
+    emails = _emails_do_csv(request.FILES["arquivo"]) if request.FILES.get("arquivo") else set()
+
+    nao_encontrados = set()
+    if emails:
+        # Normaliza os dois lados: o resultado não depende da collation da coluna
+        por_email = dict(
+            Funcionario.objects.annotate(email_normalizado=Lower("email"))
+            .filter(email_normalizado__in=emails)
+            .values_list("email_normalizado", "id")
+        )
+        encontrados = set(por_email)
+        nao_encontrados = emails - encontrados
+        ids |= set(por_email.values())
+
+    if not ids:
+        messages.error(request, "Nenhum funcionário informado para demissão.")
+        return redirect("funcionarios:listar_funcionarios")
+
+    demitidos = Funcionario.demitir_em_lote(ids)
+
+    messages.warning(request, f"{len(demitidos)} funcionário(s) demitido(s). Todos os itens foram devolvidos ao estoque.")
+    if nao_encontrados:
+        messages.error(request, f"Emails não encontrados: {', '.join(sorted(nao_encontrados))}")
     return redirect("funcionarios:listar_funcionarios")
 
 @login_required
@@ -108,16 +247,30 @@ def reativar_funcionario(request, id):
     return redirect("funcionarios:listar_funcionarios")
 
 
+async def _versao_historico(request, id):
+    """O funcionário e os conjuntos de dispositivos e periféricos que estão com ele."""
+    linha = await Funcionario.aversao_da_linha(id)
+    if linha is None:
+        return None
+    dispositivos = await Dispositivo.aversao_do_conjunto(Dispositivo.objects.filter(funcionario_id=id))
+    perifericos = await EquipamentoAuxiliar.aversao_do_conjunto(EquipamentoAuxiliar.objects.filter(funcionario_id=id))
+    return (
+        assinatura('historico', id, *linha, *dispositivos, *perifericos),
+        ultima_alteracao(linha[1], dispositivos[1], perifericos[1]),
+    )
+
 @login_required
-def historico_funcionario(request, id):
-    funcionario = get_object_or_404(Funcionario, id=id)
+@somente_leitura
+@condicional(_versao_historico)
+async def historico_funcionario(request, id):
+    funcionario = await aget_object_or_404(Funcionario, id=id)
     
     dispositivos = Dispositivo.objects.filter(funcionario=funcionario)
     perifericos = EquipamentoAuxiliar.objects.filter(funcionario=funcionario)
     
     lista_itens = []
 
-    for d in dispositivos:
+    async for d in dispositivos:
         lista_itens.append({
             'categoria': 'Principal',
             'nome': d.codigo, 
@@ -126,7 +279,7 @@ def historico_funcionario(request, id):
             'cor': 'text-primary'
         })
 
-    for p in perifericos:
+    async for p in perifericos:
         lista_itens.append({
             'categoria': 'Acessório',
             'nome': p.nome,